@@ -41,8 +41,13 @@ you want to update and then click the appropriate button on the UI.
 
 import maya.cmds as cmds
 import maya.OpenMaya as oM
+import maya.OpenMayaAnim as oMA
 import maya.OpenMayaMPx as OpenMayaMPx
+import maya.api.OpenMaya as om2
+import maya.api.OpenMayaAnim as om2A
 from functools import partial
+import array
+import re
 import sys
 # import pickle
 from os.path import exists, split
@@ -51,7 +56,8 @@ import logging
 # try to load any necessary Maya plugins here:
 plugins = [
     'mde_poseblends_driver',
-    'mde_py_poseblends_driver'
+    'mde_py_poseblends_driver',
+    'mde_py_poseblends_crowd_driver'
 ]
 for plugin in plugins:
     if cmds.pluginInfo(plugin, query=True, loaded=True):
@@ -63,6 +69,15 @@ for plugin in plugins:
         print(e)
         continue
 
+# The batch solver of the Python mde_py_poseblends_driver
+# (mde_py_poseblends_driver/lib_mde_poseblends_batch.py), if its directory
+# is on sys.path(eg once that plugin is loaded).  Without it:  bakes are
+# solved by the pure-Python loop in bake_ops.solve():
+try:
+    import lib_mde_poseblends_batch as mlpbb
+except ImportError:
+    mlpbb = None
+
 VERSION = '1.0.6'
 SCRIPT_NAME = 'SMPL_maya_plugin'
 
@@ -542,6 +557,174 @@ def get_SMPL_blendShape_weight_attr_alias(
     return result
 
 
+class blendShape_weight_plugs:
+    """
+    A blendShape's weight plugs, by alias:  alias -> logical index of blendShape.weight -> MPlug(maya.OpenMaya).
+
+    Going through the alias name(eg setAttr('blendShape1.Pose042', ...)) has Maya look it up again on every
+    call.  Instead, get() builds the table once per blendShape and keeps it until the blendShape's target list
+    changes, ie a weight element is added or removed, or an attribute is renamed/(re)aliased(see
+    on_attribute_changed()), or the blendShape node is deleted or renamed.
+    """
+    # blendShape node name -> blendShape_weight_plugs:
+    cache = {}
+
+    def __init__(
+            self,
+            blendShape_node
+    ):
+        """
+        :param blendShape_node:  the name of a blendShape node.
+        """
+        selection = oM.MSelectionList()
+        selection.add(blendShape_node)
+        node = oM.MObject()
+        selection.getDependNode(0, node)
+
+        self.blendShape_node = blendShape_node
+        self.node_handle = oM.MObjectHandle(node)
+        self.is_valid = True
+
+        node_fn = oM.MFnDependencyNode(node)
+        weight_plug = node_fn.findPlug('weight', False)
+        self.weight_attribute = weight_plug.attribute()
+
+        # alias -> (logical index, MPlug):
+        self.weights = {}
+        aliases = oM.MStringArray()
+        node_fn.getAliasList(aliases)
+        # aliases is a flat list of (alias, attribute name) pairs:
+        for ii in range(0, aliases.length() - 1, 2):
+            match = re.match(r'^(weight|w)\[(\d+)\]$', aliases[ii + 1])
+            if match is None:
+                continue
+            logical_index = int(match.group(2))
+            self.weights[aliases[ii]] = (logical_index, weight_plug.elementByLogicalIndex(logical_index))
+
+        self.callback_id = oM.MNodeMessage.addAttributeChangedCallback(
+            node,
+            blendShape_weight_plugs.on_attribute_changed,
+            self
+        )
+
+    @staticmethod
+    def on_attribute_changed(
+            message,
+            plug,
+            other_plug,
+            client_data
+    ):
+        """
+        MNodeMessage attribute changed callback:  invalidates the table(client_data) if the target list changed.
+        """
+        if message & (oM.MNodeMessage.kAttributeArrayAdded | oM.MNodeMessage.kAttributeArrayRemoved):
+            if plug.attribute() == client_data.weight_attribute:
+                client_data.is_valid = False
+        elif message & (oM.MNodeMessage.kAttributeRenamed | oM.MNodeMessage.kAttributeAdded | oM.MNodeMessage.kAttributeRemoved):
+            client_data.is_valid = False
+
+    @staticmethod
+    def get(
+            blendShape_node
+    ):
+        """
+        :param blendShape_node:  the name of a blendShape node.
+        :return: the blendShape_weight_plugs of blendShape_node, (re)building it if needed.
+        """
+        result = blendShape_weight_plugs.cache.get(blendShape_node, None)
+        if result is not None:
+            if(
+                result.is_valid
+                and result.node_handle.isValid()
+                and oM.MFnDependencyNode(result.node_handle.object()).name() == blendShape_node
+            ):
+                return result
+            result.release()
+
+        result = blendShape_weight_plugs(blendShape_node)
+        blendShape_weight_plugs.cache[blendShape_node] = result
+
+        return result
+
+    @staticmethod
+    def clear_cache():
+        """
+        Drop all the tables, and their callbacks(eg when the plugin is unloaded).
+        :return: None
+        """
+        for table in blendShape_weight_plugs.cache.values():
+            table.release()
+        blendShape_weight_plugs.cache = {}
+
+    def release(
+            self
+    ):
+        """
+        Remove this table's callback.
+        :return: None
+        """
+        if self.callback_id is not None:
+            oM.MMessage.removeCallback(self.callback_id)
+            self.callback_id = None
+        self.is_valid = False
+
+    def get_logical_index(
+            self,
+            alias
+    ):
+        """
+        :param alias:  the alias of one of the blendShape's weights, eg get_SMPL_blendShape_weight_attr_alias().
+        :return: the logical index of the alias in the blendShape's weight array.
+        """
+        return self.get_weight(alias)[0]
+
+    def get_plug(
+            self,
+            alias
+    ):
+        """
+        :return: the MPlug of alias.
+        """
+        return self.get_weight(alias)[1]
+
+    def get_obj_attr(
+            self,
+            alias
+    ):
+        """
+        :return: '<blendShape node>.weight[<logical index of alias>]', for maya.cmds:  unlike the alias, Maya
+        doesn't need to look it up.
+        """
+        return '%s.weight[%d]' % (self.blendShape_node, self.get_logical_index(alias))
+
+    def get_source_obj_attr(
+            self,
+            alias
+    ):
+        """
+        :return: the name of the plug connected to alias's weight, or None if there isn't one.
+        """
+        sources = oM.MPlugArray()
+        self.get_plug(alias).connectedTo(sources, True, False)
+        if sources.length() == 0:
+            return None
+
+        return sources[0].name()
+
+    def get_weight(
+            self,
+            alias
+    ):
+        """
+        :return: (logical index, MPlug) of alias.
+        """
+        result = self.weights.get(alias, None)
+        if result is None:
+            raise RuntimeError('%s has no weight named %s' % (self.blendShape_node, alias))
+
+        return result
+
+
 class mde_poseblends_driver_ops:
 
     @staticmethod
@@ -650,6 +833,8 @@ class mde_poseblends_driver_ops:
             # STAR:
             weights_per_joint = 4
 
+        weight_plugs = blendShape_weight_plugs.get(blendShape_node)
+
         source_dest_attr_pairs = []
 
         # fill source/dest attrs:
@@ -674,12 +859,11 @@ class mde_poseblends_driver_ops:
             dest_attr = source_dest_attr_pairs[ii]['dest']
 
             source_obj_attr = base_source_obj_attr + '.' + source_attr
-            dest_obj_attr = blendShape_node + '.' + dest_attr
+            dest_obj_attr = weight_plugs.get_obj_attr(dest_attr)
 
-            existing_source_obj_attr = cmds.listConnections(dest_obj_attr, p = True, source = True, destination = False)
+            existing_source_obj_attr = weight_plugs.get_source_obj_attr(dest_attr)
 
-            if(existing_source_obj_attr and len(existing_source_obj_attr) > 0):
-                existing_source_obj_attr = existing_source_obj_attr[0]
+            if(existing_source_obj_attr):
                 cmds.disconnectAttr(
                     existing_source_obj_attr,
                     dest_obj_attr
@@ -691,6 +875,73 @@ class mde_poseblends_driver_ops:
                 force=True
             )
 
+    @staticmethod
+    def replace_input_connection(
+            source_obj_attr,
+            dest_obj_attr
+    ):
+        """
+        source_obj_attr -> dest_obj_attr, disconnecting whatever was driving dest_obj_attr first.
+        :return: None
+        """
+        existing_source_obj_attr = cmds.listConnections(dest_obj_attr, p = True, source = True, destination = False)
+
+        if(existing_source_obj_attr and len(existing_source_obj_attr) > 0):
+            cmds.disconnectAttr(
+                existing_source_obj_attr[0],
+                dest_obj_attr
+            )
+
+        cmds.connectAttr(
+            source_obj_attr,
+            dest_obj_attr,
+            force=True
+        )
+
+    @staticmethod
+    def connect_output_attrs_packed(
+            mde_poseblends_driver_node,
+            joint_indices,
+            blendShape_node,
+            MODEL_TYPE = 'SMPL'
+    ):
+        """
+        mde_poseblends_driver_node.outputWeight[*] -> Maya blendShape_node's weights
+
+        outputWeight is flat, with the same layout as the pose blendShape targets:  outputWeight[k] drives
+        blendShape weight k.  So:  each weight is a single connection from the node, without going through
+        a compound outputJoint element.  Maya's blendShape has no input that takes a whole array of weights
+        (eg outputPackedWeights), so one connection per weight is as few as it gets.
+
+        :param mde_poseblends_driver_node:  a mde_py_poseblends_driver node.
+        :param joint_indices:  the inputJoint indices of the joints whose weights to connect.
+        :param blendShape_node:  the blendShape node whose input weights to drive.
+        :return: None
+        """
+        weights_per_joint = None
+        if('SMPL' in MODEL_TYPE):
+            weights_per_joint = 9
+        else:
+            # STAR:
+            weights_per_joint = 4
+
+        weight_plugs = blendShape_weight_plugs.get(blendShape_node)
+
+        for joint_index in joint_indices:
+            start_weight_index = weights_per_joint * joint_index
+            for ii in range(0, weights_per_joint):
+                source_obj_attr = mde_poseblends_driver_node + '.' + 'outputWeight' + '[' + str(start_weight_index + ii) + ']'
+                dest_obj_attr = weight_plugs.get_obj_attr(
+                    get_SMPL_blendShape_weight_attr_alias(
+                        start_weight_index,
+                        ii
+                    )
+                )
+                mde_poseblends_driver_ops.replace_input_connection(
+                    source_obj_attr,
+                    dest_obj_attr
+                )
+
     @staticmethod
     def connect_input_and_output_attrs_joint_single(
             mde_poseblends_driver_node,
@@ -796,6 +1047,9 @@ class mde_poseblends_driver_ops:
                 mode, because it leaves the parallel-ization to the Maya evaluation graph, and that will make it
                 where if only one joint changes, only that related mde_poseblends_driver node will be re-evaluated.
                 The rest will just return whatever value is cached on their outputs.
+            2:  like 0, but drive the blendShape weights from the node's flat outputWeight attribute
+                (see connect_output_attrs_packed()).  Only the Python version of the node has outputWeight,
+                so this falls back to 0 for the C++ one.
         :return: None
         """
         mpbd_node_type = mde_poseblends_driver_ops.get_node_type_to_use()
@@ -806,9 +1060,13 @@ class mde_poseblends_driver_ops:
         
         num_joints = len(joints)
 
+        if(mode == 2 and mpbd_node_type != 'mde_py_poseblends_driver'):
+            logging.warning(mpbd_node_type + ' has no outputWeight attribute.  Using mode 0 instead of 2.')
+            mode = 0
+
         num_nodes_to_create = 0
         mde_poseblends_driver = []
-        if(mode == 0):
+        if(mode == 0 or mode == 2):
             num_nodes_to_create = 1
         else:
             num_nodes_to_create = num_joints
@@ -831,7 +1089,26 @@ class mde_poseblends_driver_ops:
             # to generate blendShape weight drivers:
             weights_per_joint = 4
             
-        if(mode == 0):
+        if(mode == 2):
+            logging.debug(':  in if(mode == 2) block:  ')
+            # connect all the joints to a single mde_poseblends_driver node,
+            # and its outputWeight to the blendShape weights:
+            current_node = mde_poseblends_driver[0]
+            for ii in range(0, num_joints):
+                mde_poseblends_driver_ops.connect_input_attrs_joint_single(
+                    current_node,
+                    joints[ii],
+                    joint_indices[ii],
+                    MODEL_TYPE = MODEL_TYPE
+                )
+
+            mde_poseblends_driver_ops.connect_output_attrs_packed(
+                current_node,
+                joint_indices,
+                blendShape_node,
+                MODEL_TYPE = MODEL_TYPE
+            )
+        elif(mode == 0):
             logging.debug(':  in if(mode == 0) block:  ')
             # connect all the joints to a single mde_poseblends_driver node:
             current_node = mde_poseblends_driver[0]
@@ -864,6 +1141,684 @@ class mde_poseblends_driver_ops:
                     MODEL_TYPE
                 )
 
+    @staticmethod
+    def create_and_connect_crowd(
+        characters,
+        MODEL_TYPE = 'SMPL',
+        crowd_node = None
+    ):
+        """
+        Drive the blendShape weights of many characters with a single mde_py_poseblends_crowd_driver node,
+        which solves all of the characters' joints in one batch.
+
+        :param characters:  a list with one dictionary per character:
+            'joints':  the names of the character's joints(Maya transform nodes).
+            'joint_indices':  the pose blendShape joint index of each of those joints(see create_and_connect()).
+            'blendShape_node':  the character's blendShape node, whose weights to drive.
+        :param MODEL_TYPE:  'SMPL'(and SMPLH, SMPLX) or 'STAR'.  All the characters have to be the same model type.
+        :param crowd_node:  an existing mde_py_poseblends_crowd_driver node to add the characters to.  None:  create one.
+        :return: the mde_py_poseblends_crowd_driver node, or None if its plugin isn't loaded.
+        """
+        crowd_node_type = 'mde_py_poseblends_crowd_driver'
+        if not cmds.pluginInfo(crowd_node_type, q = True, loaded = True):
+            logging.error('the mde_py_poseblends_crowd_driver plugin is not loaded.  Returning now without doing anything.')
+            return None
+
+        if not crowd_node:
+            crowd_node = cmds.createNode(crowd_node_type, name = crowd_node_type + "#")
+
+        weights_per_joint = None
+        model_type_value = None
+        if('SMPL' in MODEL_TYPE):
+            weights_per_joint = 9
+            model_type_value = 0
+        else:
+            # STAR:
+            weights_per_joint = 4
+            model_type_value = 1
+
+        cmds.setAttr(
+            crowd_node + '.' + 'inputModelType',
+            model_type_value
+        )
+
+        # append the characters after any already connected to crowd_node:
+        existing_character_indices = cmds.getAttr(crowd_node + '.' + 'inputCharacter', multiIndices = True) or []
+        character_index = 0
+        if(len(existing_character_indices) > 0):
+            character_index = max(existing_character_indices) + 1
+
+        for character in characters:
+            base_dest_obj_attr = crowd_node + '.' + 'inputCharacter' + '[' + str(character_index) + ']'
+            base_source_obj_attr = crowd_node + '.' + 'outputCharacter' + '[' + str(character_index) + ']'
+            weight_plugs = blendShape_weight_plugs.get(character['blendShape_node'])
+
+            for joint, joint_index in zip(character['joints'], character['joint_indices']):
+                # joint's local matrix -> inputCharacter[character_index].inputCharacterJointMatrix[joint_index]:
+                cmds.connectAttr(
+                    joint + '.' + 'matrix',
+                    base_dest_obj_attr + '.' + 'inputCharacterJointMatrix' + '[' + str(joint_index) + ']',
+                    force = True
+                )
+
+                # outputCharacter[character_index].outputCharacterWeight[weights_per_joint * joint_index + ii]
+                # -> blendShape_node's weights:
+                start_weight_index = weights_per_joint * joint_index
+                for ii in range(0, weights_per_joint):
+                    source_obj_attr = base_source_obj_attr + '.' + 'outputCharacterWeight' + '[' + str(start_weight_index + ii) + ']'
+                    dest_obj_attr = weight_plugs.get_obj_attr(
+                        get_SMPL_blendShape_weight_attr_alias(
+                            start_weight_index,
+                            ii
+                        )
+                    )
+                    mde_poseblends_driver_ops.replace_input_connection(
+                        source_obj_attr,
+                        dest_obj_attr
+                    )
+
+            character_index += 1
+
+        return crowd_node
+
+
+class keyframe_writer:
+    """
+    Key whole arrays of values in one go:  each attribute's anim curve gets all of its keys from a single
+    MFnAnimCurve.addKeys() call, instead of one cmds.setKeyframe() per value.
+
+    The keys are written by the SMPL_maya_plugin_set_keys command(see setKeysCommand), so that one write()
+    is one undoable step.  Since a command can't take arrays as arguments, write() leaves them in pending for
+    the command to pick up.
+    """
+    pending = None
+
+    @staticmethod
+    def write(
+            plugs,
+            frames,
+            values
+    ):
+        """
+        Key each of plugs at all of frames.  Anim curves are created for the plugs that have none, and any
+        existing keys between the first and last of frames are replaced.
+        :param plugs:  a list of maya.OpenMaya MPlugs, eg from blendShape_weight_plugs.get_plug().
+        :param frames:  a list of frame numbers, in the current time unit, in increasing order.
+        :param values:  values[ii][ff] is the value of plugs[ii] at frames[ff].
+        :return: None
+        """
+        if len(plugs) == 0 or len(frames) == 0:
+            return
+
+        keyframe_writer.pending = (plugs, frames, values)
+        try:
+            getattr(cmds, kSetKeysCmdName)()
+        finally:
+            keyframe_writer.pending = None
+
+    @staticmethod
+    def get_anim_curve(
+            plug
+    ):
+        """
+        :param plug:  a maya.OpenMaya MPlug.
+        :return: the MObject of the anim curve driving plug, a null MObject if nothing is connected to plug, or
+        None if something other than an anim curve is.
+        """
+        sources = oM.MPlugArray()
+        plug.connectedTo(sources, True, False)
+        if sources.length() == 0:
+            return oM.MObject()
+
+        source_node = sources[0].node()
+        if not source_node.hasFn(oM.MFn.kAnimCurve):
+            return None
+
+        return source_node
+
+    @staticmethod
+    def replace_keys(
+            anim_curve_fn,
+            times,
+            values,
+            anim_curve_change
+    ):
+        """
+        Remove anim_curve_fn's keys from times[0] to times[-1], then add the new ones in one addKeys() call.
+        :param times:  an MTimeArray, in increasing order.
+        :param values:  an MDoubleArray, the same length as times.
+        :param anim_curve_change:  the MAnimCurveChange recording the edits, for undo.
+        :return: None
+        """
+        start_time = times[0]
+        end_time = times[times.length() - 1]
+
+        for kk in range(anim_curve_fn.numKeys() - 1, -1, -1):
+            key_time = anim_curve_fn.time(kk)
+            if key_time < start_time:
+                break
+            if key_time <= end_time:
+                anim_curve_fn.remove(kk, anim_curve_change)
+
+        anim_curve_fn.addKeys(
+            times,
+            values,
+            oMA.MFnAnimCurve.kTangentGlobal,
+            oMA.MFnAnimCurve.kTangentGlobal,
+            True,
+            anim_curve_change
+        )
+
+
+class bake_ops:
+    """
+    Baking pose blendShape weights over a range of frames.
+
+    The joints' local rotations are evaluated for every frame straight from their anim curves where possible,
+    otherwise read through a DG context(so the current time is never changed, and nothing else in the scene is
+    evaluated or redrawn), all the frames are solved in one go, and only then are the weights written.
+    """
+    MATRIX_SIZE = 16
+    NUM_WEIGHTS = 9 # the bake always writes SMPL-style weights, one per element of the 3x3 rotation block
+    WINDOW_SIZE = 1000 # the number of frames bake_in_windows() reads, solves and writes at a time
+
+    @staticmethod
+    def get_plugs(
+            obj_attrs
+    ):
+        """
+        :param obj_attrs:  a list of '<node>.<attr>' strings.
+        :return: a list of the matching maya.api.OpenMaya MPlugs.
+        """
+        selection = om2.MSelectionList()
+        for obj_attr in obj_attrs:
+            selection.add(obj_attr)
+
+        result = [selection.getPlug(ii) for ii in range(0, len(obj_attrs))]
+
+        return result
+
+    @staticmethod
+    def read_local_matrices(
+            joints,
+            frames
+    ):
+        """
+        Read the local matrix(ie what cmds.xform(joint, query=True, matrix=True) returns) of each of joints at
+        each of frames, evaluating them in a DG context for that frame instead of moving the current time.
+        :param joints:  a list of joint names.
+        :param frames:  a list of frame numbers, in the current time unit.
+        :return: an array('d') of len(frames) * len(joints) row-major 4x4 matrices, frame major:  the matrix of
+        joints[jj] at frames[ff] starts at MATRIX_SIZE * (ff * len(joints) + jj).
+        """
+        plugs = bake_ops.get_plugs(['%s.matrix' % joint for joint in joints])
+        time_unit = om2.MTime.uiUnit()
+
+        result = array.array('d')
+        for frame in frames:
+            context = om2.MDGContext(om2.MTime(frame, time_unit))
+            with om2.MDGContextGuard(context):
+                for plug in plugs:
+                    result.extend(om2.MFnMatrixData(plug.asMObject()).matrix())
+
+        return result
+
+    @staticmethod
+    def is_static(
+            plug
+    ):
+        """
+        :param plug:  a maya.api.OpenMaya MPlug.
+        :return: True if neither plug nor any of its children is driven by a connection.
+        """
+        if plug.isDestination:
+            return False
+
+        if plug.isCompound:
+            for ii in range(0, plug.numChildren()):
+                if plug.child(ii).isDestination:
+                    return False
+
+        return True
+
+    @staticmethod
+    def get_rotation_source(
+            plug
+    ):
+        """
+        :param plug:  the maya.api.OpenMaya MPlug of one of a joint's rotate children(eg rotateX).
+        :return: the angle(radians) if plug isn't driven, an om2A.MFnAnimCurve if it is driven straight by an
+        animCurveTA that has no input of its own, or None if it is driven by anything else(eg a constraint,
+        an expression, a pairBlend, an anim layer...)
+        """
+        if not plug.isDestination:
+            return plug.asMAngle().asRadians()
+
+        source_node = plug.source().node()
+        if not source_node.hasFn(om2.MFn.kAnimCurveTimeToAngular):
+            return None
+
+        anim_curve_fn = om2A.MFnAnimCurve(source_node)
+        if anim_curve_fn.findPlug('input', False).isDestination:
+            return None
+
+        return anim_curve_fn
+
+    @staticmethod
+    def get_rotation_data(
+            joint,
+            tol = 1.0e-6
+    ):
+        """
+        Check whether joint's local rotation can be evaluated from its anim curves alone, ie:
+        *its rotateX/Y/Z are either static, or driven straight by anim curves(see get_rotation_source()).
+        *its rotateOrder, rotateAxis, jointOrient, scale and shear are static, with a scale of 1 and no shear.
+        *its inverseScale is 1, and if it's connected, it's to a static scale(eg the parent joint's).
+        :param joint:  a joint(or transform) name.
+        :return: None if joint has to be evaluated in the DG(see read_local_matrices()), otherwise a tuple:
+        (the 3 rotation sources of get_rotation_source(), rotateOrder, [rotateAxis(radians)], [jointOrient(radians)])
+        """
+        selection = om2.MSelectionList()
+        selection.add(joint)
+        node_fn = om2.MFnDependencyNode(selection.getDependNode(0))
+
+        rotate_plug = node_fn.findPlug('rotate', False)
+        if rotate_plug.isDestination:
+            return None
+
+        rotation_sources = []
+        for ii in range(0, 3):
+            rotation_source = bake_ops.get_rotation_source(rotate_plug.child(ii))
+            if rotation_source is None:
+                return None
+            rotation_sources.append(rotation_source)
+
+        for attr in ('rotateOrder', 'rotateAxis', 'jointOrient', 'scale', 'shear'):
+            if node_fn.hasAttribute(attr) and not bake_ops.is_static(node_fn.findPlug(attr, False)):
+                return None
+
+        values = {}
+        for attr in ('rotateAxis', 'jointOrient'):
+            values[attr] = [0.0, 0.0, 0.0]
+            if node_fn.hasAttribute(attr):
+                plug = node_fn.findPlug(attr, False)
+                values[attr] = [plug.child(ii).asMAngle().asRadians() for ii in range(0, 3)]
+
+        scale_plug = node_fn.findPlug('scale', False)
+        shear_plug = node_fn.findPlug('shear', False)
+        for ii in range(0, 3):
+            if abs(scale_plug.child(ii).asDouble() - 1.0) > tol or abs(shear_plug.child(ii).asDouble()) > tol:
+                return None
+
+        if node_fn.hasAttribute('inverseScale'):
+            inverse_scale_plug = node_fn.findPlug('inverseScale', False)
+            if inverse_scale_plug.isDestination:
+                inverse_scale_source = inverse_scale_plug.source()
+                if(
+                    inverse_scale_source.partialName(useLongNames=True) != 'scale'
+                    or not bake_ops.is_static(inverse_scale_source)
+                ):
+                    return None
+            elif not bake_ops.is_static(inverse_scale_plug):
+                return None
+
+            for ii in range(0, 3):
+                if abs(inverse_scale_plug.child(ii).asDouble() - 1.0) > tol:
+                    return None
+
+        result = (
+            rotation_sources,
+            node_fn.findPlug('rotateOrder', False).asInt(),
+            values['rotateAxis'],
+            values['jointOrient']
+        )
+
+        return result
+
+    @staticmethod
+    def get_joints_rotation_data(
+            joints
+    ):
+        """
+        :param joints:  a list of joint names.
+        :return: the get_rotation_data() of each of joints, all None if local_rotation_batch isn't available(ie
+        every joint has to be evaluated in the DG).
+        """
+        if mlpbb is None:
+            return [None] * len(joints)
+
+        result = [bake_ops.get_rotation_data(joint) for joint in joints]
+
+        return result
+
+    @staticmethod
+    def read_local_rotations(
+            joints,
+            frames,
+            joints_rotation_data = None
+    ):
+        """
+        read_local_matrices(), but the joints that only rotate, by static values or anim curves(see
+        get_rotation_data()), don't go through the DG:  their anim curves are evaluated for all of frames, and
+        their rotation matrices are built all at once(see lib_mde_poseblends_batch.local_rotation_batch).  The
+        other joints(eg constrained, or driven by expressions) are read by read_local_matrices().
+        The translation of the fast joints' matrices is left at zero:  only their 3x3 rotation blocks are
+        meant to be used(ie by solve()).
+        :param joints_rotation_data:  the get_joints_rotation_data() of joints, eg found once for all the windows
+        of bake_in_windows().  None:  find it here.
+        :return: the same layout as read_local_matrices().
+        """
+        num_frames = len(frames)
+        num_joints = len(joints)
+
+        if joints_rotation_data is None:
+            joints_rotation_data = bake_ops.get_joints_rotation_data(joints)
+
+        fast_joint_indices = []
+        fast_joints_data = []
+        for jj in range(0, num_joints):
+            rotation_data = joints_rotation_data[jj]
+            if rotation_data is not None:
+                fast_joint_indices.append(jj)
+                fast_joints_data.append(rotation_data)
+        slow_joint_indices = [jj for jj in range(0, num_joints) if jj not in fast_joint_indices]
+        if len(slow_joint_indices) > 0:
+            logging.debug("bake_ops::read_local_rotations():  evaluating in the DG:  " + str([joints[jj] for jj in slow_joint_indices]))
+
+        if len(fast_joint_indices) == 0:
+            return bake_ops.read_local_matrices(
+                joints,
+                frames
+            )
+
+        # evaluate each anim curve once for all of frames:
+        time_unit = om2.MTime.uiUnit()
+        times = [om2.MTime(frame, time_unit) for frame in frames]
+        num_fast_joints = len(fast_joint_indices)
+        rotations = array.array('d', [0.0]) * (3 * num_frames * num_fast_joints)
+        for kk in range(0, num_fast_joints):
+            rotation_sources = fast_joints_data[kk][0]
+            for ii in range(0, 3):
+                rotation_source = rotation_sources[ii]
+                if isinstance(rotation_source, om2A.MFnAnimCurve):
+                    values = array.array('d', [rotation_source.evaluate(t) for t in times])
+                else:
+                    values = array.array('d', [rotation_source]) * num_frames
+                rotations[3 * kk + ii::3 * num_fast_joints] = values
+
+        fast_matrices = mlpbb.local_rotation_batch.calculate(
+            rotations,
+            [x[1] for x in fast_joints_data],
+            rotate_axes=[y for x in fast_joints_data for y in x[2]],
+            joint_orients=[y for x in fast_joints_data for y in x[3]]
+        )
+        if len(slow_joint_indices) == 0:
+            return fast_matrices
+
+        slow_matrices = bake_ops.read_local_matrices(
+            [joints[jj] for jj in slow_joint_indices],
+            frames
+        )
+
+        # interleave both, in the order of joints:
+        result = array.array('d', [0.0]) * (bake_ops.MATRIX_SIZE * num_frames * num_joints)
+        for joint_indices, matrices in ((fast_joint_indices, fast_matrices), (slow_joint_indices, slow_matrices)):
+            num_matrices_joints = len(joint_indices)
+            for ff in range(0, num_frames):
+                for kk in range(0, num_matrices_joints):
+                    offset = bake_ops.MATRIX_SIZE * (ff * num_joints + joint_indices[kk])
+                    matrices_offset = bake_ops.MATRIX_SIZE * (ff * num_matrices_joints + kk)
+                    result[offset:offset + bake_ops.MATRIX_SIZE] = matrices[matrices_offset:matrices_offset + bake_ops.MATRIX_SIZE]
+
+        return result
+
+    @staticmethod
+    def solve(
+            matrix_values,
+            num_frames,
+            num_joints,
+            scale = 1.0
+    ):
+        """
+        Solve the weights of a whole block of local joint matrices at once.
+        Weight ii of a joint is scale * (the transposed 3x3 rotation block - the identity)[ii // 3][ii % 3], like
+        joint_io.calculate_SMPL() of the mde_py_poseblends_driver.
+        :param matrix_values:  the result of read_local_matrices().
+        :param scale:  the scale applied to every weight(eg scale_up).
+        :return: an array('d') of num_frames * num_joints * NUM_WEIGHTS weights, frame major.
+        """
+        if(mlpbb is not None and mlpbb.HAS_NUMPY):
+            np = mlpbb.np
+            local_matrices = np.frombuffer(matrix_values, dtype=np.float64).reshape(num_frames, num_joints, 4, 4)
+            weights = mlpbb.poseblends_batch_solver.calculate(
+                local_matrices,
+                model_type=mlpbb.poseblends_batch_solver.MODEL_T.kSMPL,
+                scale=scale,
+                use_numpy=True
+            )
+            result = array.array('d')
+            result.frombytes(np.ascontiguousarray(weights, dtype=np.float64).tobytes())
+
+            return result
+
+        result = array.array('d', [0.0]) * (num_frames * num_joints * bake_ops.NUM_WEIGHTS)
+        weights_offset = 0
+        for offset in range(0, len(matrix_values), bake_ops.MATRIX_SIZE):
+            for ii in range(0, 3):
+                for jj in range(0, 3):
+                    # row ii of the transposed block is column ii of the matrix:
+                    value = matrix_values[offset + 4 * jj + ii]
+                    if ii == jj:
+                        value -= 1.0
+                    result[weights_offset] = scale * value
+                    weights_offset += 1
+
+        return result
+
+    @staticmethod
+    def write_weights(
+            blendShape_node,
+            joint_indices,
+            frames,
+            weights,
+            rekey
+    ):
+        """
+        Write the weights of solve() to blendShape_node.
+        :param joint_indices:  the pose blendShape joint index of each joint, ie joint jj drives the
+        NUM_WEIGHTS targets from NUM_WEIGHTS * joint_indices[jj].
+        :param rekey:  True:  key every weight at every frame(replacing its keys in the range, see
+        keyframe_writer).  False:  only set the weights, to their values at
+        the current frame.  If it isn't one of frames, the weights are left alone(with a warning), so
+        they never disagree with the pose shown at the current frame.
+        :return: None
+        """
+        num_joints = len(joint_indices)
+        num_weights = bake_ops.NUM_WEIGHTS
+        num_frames = len(frames)
+
+        weight_plugs = blendShape_weight_plugs.get(blendShape_node)
+
+        aliases = []
+        weights_offsets = []
+        for jj in range(0, num_joints):
+            start_weight_index = num_weights * joint_indices[jj]
+            for ww in range(0, num_weights):
+                aliases.append(
+                    get_SMPL_blendShape_weight_attr_alias(
+                        start_weight_index,
+                        ww
+                    )
+                )
+                weights_offsets.append(num_weights * jj + ww)
+
+        frame_size = num_weights * num_joints
+        if rekey:
+            # all the frames of each weight, keyed in one go(see keyframe_writer):
+            values = [
+                weights[weights_offset:weights_offset + frame_size * num_frames:frame_size]
+                for weights_offset in weights_offsets
+            ]
+            keyframe_writer.write(
+                [weight_plugs.get_plug(x) for x in aliases],
+                frames,
+                values
+            )
+            return
+
+        current_frame = cmds.currentTime(query=True)
+        if current_frame not in frames:
+            logging.warning('bake_ops::write_weights():  the current frame %s is not one of the %s frames solved:  the weights are left alone' % (current_frame, num_frames))
+            return
+
+        ff = frames.index(current_frame)
+        for ii in range(0, len(aliases)):
+            cmds.setAttr(
+                weight_plugs.get_obj_attr(aliases[ii]),
+                weights[ff * frame_size + weights_offsets[ii]]
+            )
+
+    @staticmethod
+    def bake(
+            joints,
+            joint_indices,
+            blendShape_node,
+            frames,
+            rekey = True,
+            joints_rotation_data = None
+    ):
+        """
+        Read, solve and write the pose blendShape weights of joints for all of frames(see bake_ops).
+        :param joints:  a list of joint names.
+        :param joint_indices:  see write_weights().
+        :param blendShape_node:  the blendShape node with the pose targets.
+        :param frames:  a list of frame numbers, in the current time unit.
+        :param rekey:  see write_weights().
+        :param joints_rotation_data:  see read_local_rotations().
+        :return: None
+        """
+        if len(frames) == 0 or len(joints) == 0:
+            return
+
+        matrix_values = bake_ops.read_local_rotations(
+            joints,
+            frames,
+            joints_rotation_data=joints_rotation_data
+        )
+
+        weights = bake_ops.solve(
+            matrix_values,
+            len(frames),
+            len(joints),
+            scale=scale_up
+        )
+
+        bake_ops.write_weights(
+            blendShape_node,
+            joint_indices,
+            frames,
+            weights,
+            rekey
+        )
+
+    @staticmethod
+    def bake_in_windows(
+            joints,
+            joint_indices,
+            blendShape_node,
+            frames,
+            rekey = True,
+            window_size = WINDOW_SIZE,
+            undoable = None
+    ):
+        """
+        bake() for long takes:  frames are baked window_size at a time, so only one window's matrices and
+        weights are ever in memory, with the viewport refresh suspended and a progress window that can cancel
+        the bake between windows.
+        :param frames:  a list of frame numbers, in the current time unit, in increasing order.
+        :param rekey:  see write_weights().  If False, only the current frame is baked, and nothing is if
+        it isn't one of frames.
+        :param window_size:  the number of frames per window.
+        :param undoable:  True:  each window is one undo chunk, so the undo queue grows with the number of
+        frames.  False:  undo is off during the bake(and the undo queue is kept), so memory stays flat however
+        many frames there are, but the bake can't be undone.  None:  True if frames fit in one window, False
+        otherwise.
+        :return: the number of frames baked, less than len(frames) if the bake was cancelled.
+        """
+        if len(frames) == 0 or len(joints) == 0:
+            return 0
+
+        if not rekey:
+            current_frame = cmds.currentTime(query=True)
+            if current_frame not in frames:
+                logging.warning('bake_ops::bake_in_windows():  the current frame %s is outside the frames to bake:  the weights are left alone' % current_frame)
+                return 0
+
+            frames = [current_frame]
+
+        window_size = max(1, int(window_size))
+        num_windows = (len(frames) + window_size - 1) // window_size
+        if undoable is None:
+            undoable = (num_windows <= 1)
+
+        # which joints' anim curves can be evaluated directly(and those curves) is found once, for all the
+        # windows:
+        joints_rotation_data = bake_ops.get_joints_rotation_data(joints)
+        show_progress = not cmds.about(batch=True)
+
+        undo_state = cmds.undoInfo(query=True, state=True)
+        if not undoable:
+            cmds.undoInfo(stateWithoutFlush=False)
+        cmds.refresh(suspend=True)
+        if show_progress:
+            cmds.progressWindow(
+                title='Baking pose blend shapes',
+                status='%s:  frame %s of %s' % (blendShape_node, 0, len(frames)),
+                progress=0,
+                maxValue=num_windows,
+                isInterruptable=True
+            )
+
+        result = 0
+        try:
+            for ww in range(0, num_windows):
+                if show_progress and cmds.progressWindow(query=True, isCancelled=True):
+                    logging.warning('bake_ops::bake_in_windows():  cancelled after %s of %s frames' % (result, len(frames)))
+                    break
+
+                window_frames = frames[ww * window_size:(ww + 1) * window_size]
+
+                if undoable:
+                    cmds.undoInfo(openChunk=True, chunkName='bake_ops.bake_in_windows')
+                try:
+                    bake_ops.bake(
+                        joints,
+                        joint_indices,
+                        blendShape_node,
+                        window_frames,
+                        rekey=rekey,
+                        joints_rotation_data=joints_rotation_data
+                    )
+                finally:
+                    if undoable:
+                        cmds.undoInfo(closeChunk=True)
+
+                result += len(window_frames)
+                if show_progress:
+                    cmds.progressWindow(
+                        edit=True,
+                        progress=ww + 1,
+                        status='%s:  frame %s of %s' % (blendShape_node, result, len(frames))
+                    )
+        finally:
+            if show_progress:
+                cmds.progressWindow(endProgress=True)
+            cmds.refresh(suspend=False)
+            if not undoable:
+                cmds.undoInfo(stateWithoutFlush=undo_state)
+
+        return result
+
 
 class ui:
     def __init__(self, winName='SMPL_model_maya_script'):
@@ -891,6 +1846,24 @@ class ui:
 
         return maya_mesh
 
+    @staticmethod
+    def get_maya_meshes_from_selection():
+        ## Get all the selected meshes(or the meshes under the selected transforms):
+        maya_meshes = []
+        for selected in cmds.ls(selection=True) or []:
+            if cmds.nodeType(selected) == 'mesh':
+                maya_meshes.append(selected)
+                continue
+
+            meshes = cmds.listRelatives(selected, type='mesh')
+            if meshes:
+                maya_meshes.append(meshes[0])
+
+        if len(maya_meshes) == 0:
+            print("\nError: Please select one or more mesh objects")
+
+        return maya_meshes
+
     def create(self):
         if cmds.window(self.winName, exists=True):
             cmds.deleteUI(self.winName)
@@ -916,8 +1889,9 @@ class ui:
         cmds.rowLayout(numberOfColumns=1, columnAttach=[(1, 'both', -30)])
         self.framesField = cmds.intFieldGrp(numberOfFields=2, label='Frame Range', value1=0, value2=10)
         cmds.setParent('..')
-        cmds.rowLayout(numberOfColumns=2, columnAttach=[(1, 'left', 20), (2, 'both', 10)])
+        cmds.rowLayout(numberOfColumns=3, columnAttach=[(1, 'left', 20), (2, 'left', 5), (3, 'both', 10)])
         self.range_checkbox = cmds.checkBox(label=' Reset \n Keyframes', align='center', value=True)
+        self.range_undo_checkbox = cmds.checkBox(label=' Undo', align='center', value=False)
         #range_frame_func = partial(ui.applyBlendshapes, self, use_timeline=True)
         range_frame_func = lambda *args: self.applyBlendshapes(use_timeline=True)
         self.bttn_blend_range = cmds.button(label='Apply Pose Blend Shapes to\n Frames in above Range ',
@@ -931,6 +1905,11 @@ class ui:
         self.bttn_mde_poseblends_driver = cmds.button(label='Make Pose Blend Shapes fire\n interactively ',
             c=create_driver_func, width=170, height=50)
         cmds.setParent('..')
+        cmds.rowLayout(numberOfColumns=1, columnAttach=[(1, 'both', 70)])
+        create_crowd_driver_func = lambda *args: self.create_mde_poseblends_crowd_driver()
+        self.bttn_mde_poseblends_crowd_driver = cmds.button(label='Make Pose Blend Shapes fire\n interactively (all selected) ',
+            c=create_crowd_driver_func, width=170, height=50)
+        cmds.setParent('..')
         cmds.separator(height=10, style='in')
 
         # ## RECOMPUTE SKELETON
@@ -989,26 +1968,30 @@ class ui:
 #                blendShape_weight_obj_attr = '%s.%s' % (blendShape_node, blendShape_weight_attr)
 #                cmds.setAttr(blendShape_weight_obj_attr, 0.0)
 
-    def create_mde_poseblends_driver(
+    def get_driver_setup(
             self,
-            mode = 1
+            maya_mesh
     ):
-        maya_mesh = ui.get_maya_mesh_from_selection()
-
+        """
+        Find what the mde_poseblends_driver nodes of maya_mesh need to be connected to.
+        :param maya_mesh:  a SMPL or STAR mesh.
+        :return: a dictionary with 'joints', 'joint_indices', 'blendShape_node' and 'MODEL_TYPE'(see
+        mde_poseblends_driver_ops.create_and_connect()), or None if maya_mesh can't be driven.
+        """
         if(not maya_mesh or cmds.objExists(maya_mesh) == False):
             print('\nError: Please select a SMPL or STAR mesh.')
-            return
+            return None
 
         ## Get skinning node & return if missing
         is_not_skinned, lbs_cluster = maya_ops.is_not_skinned(maya_mesh)
         if is_not_skinned:
-            print('\nError: Selected object has no Skin Cluster node (skeleton is not attached)')
-            return
+            print('\nError: %s has no Skin Cluster node (skeleton is not attached)' % maya_mesh)
+            return None
 
         has_no_blendShape, blendShape_node = maya_ops.has_no_blendShape(maya_mesh)
         if has_no_blendShape:
-            print('\nError: Selected object has no blendShape node')
-            return
+            print('\nError: %s has no blendShape node' % maya_mesh)
+            return None
 
         # Backward compatibility with v1.0.3
         jointPrefix, MODEL_TYPE = self.joint_setup(
@@ -1036,15 +2019,61 @@ class ui:
 
         logging.debug(':  joints:  ' + str(joints))
 
+        result = {}
+        result.update({'joints':joints})
+        result.update({'joint_indices':joint_indices})
+        result.update({'blendShape_node':blendShape_node})
+        result.update({'MODEL_TYPE':MODEL_TYPE})
+
+        return result
+
+    def create_mde_poseblends_driver(
+            self,
+            mode = 1
+    ):
+        maya_mesh = ui.get_maya_mesh_from_selection()
+
+        driver_setup = self.get_driver_setup(maya_mesh)
+        if not driver_setup:
+            return
+
         logging.debug('):  mode(before create_and_connect() call):  ' + str(mode))
         mde_poseblends_driver_ops.create_and_connect(
-            joints,
-            joint_indices,
-            blendShape_node,
+            driver_setup['joints'],
+            driver_setup['joint_indices'],
+            driver_setup['blendShape_node'],
             mode = mode,
-            MODEL_TYPE = MODEL_TYPE
+            MODEL_TYPE = driver_setup['MODEL_TYPE']
         )
 
+    def create_mde_poseblends_crowd_driver(
+            self
+    ):
+        """
+        Drive all the selected SMPL/STAR meshes with one mde_py_poseblends_crowd_driver node
+        per model type, instead of 1 or 21 mde_poseblends_driver nodes per mesh.
+        :return: the created mde_py_poseblends_crowd_driver nodes.
+        """
+        # MODEL_TYPE -> the characters of that model type:
+        characters = {}
+        for maya_mesh in ui.get_maya_meshes_from_selection():
+            driver_setup = self.get_driver_setup(maya_mesh)
+            if not driver_setup:
+                continue
+
+            characters.setdefault(driver_setup['MODEL_TYPE'], []).append(driver_setup)
+
+        result = []
+        for MODEL_TYPE, model_characters in characters.items():
+            crowd_node = mde_poseblends_driver_ops.create_and_connect_crowd(
+                model_characters,
+                MODEL_TYPE = MODEL_TYPE
+            )
+            if crowd_node:
+                result.append(crowd_node)
+
+        return result
+
 
     def applyBlendshapes(
             self,
@@ -1101,62 +2130,36 @@ class ui:
             frame_range = [currentTime, currentTime + 1]
         print('frame_range: ', frame_range)
 
-        weights_per_joint = 9
-        ## get all bones attached to skin (that excludes root)
-        # TODO:  maya_jnt_tree immediately below is unused:  remove?:
-        # maya_jnt_tree = cmds.skinCluster(lbs_cluster, query=True, wi=True)
-        for frame in range(frame_range[0], frame_range[-1]):
-            cmds.currentTime(frame)
-
-            ## Set poseblends for all joints excluding pelvis (there are no blendshapes for pelvis)
-            for jidx, j_name in self.j_names.items():
-                if jidx > 0 and (frame_range[-1] - frame_range[0]) > 0:
-                    bone = '%s_%s' % (bonePrefix, j_name)
-                    logging.debug("ui::applyBlendshapes():  bone:  " + str(bone))
-                    start_weight_index = (weights_per_joint * (jidx - 1))
-
-                    ## Get original 4x4 maya rotation matrix from bone
-                    #cmds.select(bone, replace=True)
-                    #real_m = np.array(cmds.xform(query=True, matrix=True)).reshape((4, 4)).T
-                    bone_m = cmds.xform(bone, query=True, matrix=True)
-                    logging.debug("ui::applyBlendshapes():  bone_m:  " + str(bone_m))
-                    real_m = maya_ops.from_1x16_list_to_4x4_MMatrix(
-                        bone_m,
-                        transpose = True
-                    )
-                    
-                    real_m = real_m - oM.MMatrix.identity
-                    # in the real_m_1D assignment immediately below:
-                    # range(0, 3) instead of range(0, 4) in order to drop the translation values:
-                    real_m_1D = [real_m(ii, jj) for ii in range(0, 3) for jj in range(0, 3)]
-                    for mi, rot_element in enumerate(real_m_1D):
-                        blendShape_weight_attr = get_SMPL_blendShape_weight_attr_alias(
-                            start_weight_index,
-                            mi
-                        )
-                        blendShape_weight_obj_attr = '%s.%s' % (blendShape_node, blendShape_weight_attr)
-                        logging.debug("ui::applyBlendshapes():  blendShape_weight_obj_attr:  " + str(blendShape_weight_obj_attr))
+        ## Set poseblends for all joints excluding pelvis (there are no blendshapes for pelvis)
+        # Ignoring extraneous blendshapes for FBX(ie joints past 21):
+        joints = []
+        joint_indices = []
+        for jidx, j_name in self.j_names.items():
+            if jidx < 1 or jidx > 21:
+                continue
 
-                        blendShape_weight_value = rot_element * scale_up
-                        cmds.setAttr(
-                            blendShape_weight_obj_attr,
-                            blendShape_weight_value
-                        )
-                        # cmds.blendShape(blendShape_node, edit=True, w=[(bidx, rot_element * scale_up)])
-                        if rekey:
-                            cmds.setKeyframe(
-                                blendShape_weight_obj_attr,
-                                breakdown=False,
-                                controlPoints=False,
-                                shape=False
-                            )
-                # Ignoring extraneous blendshapes for FBX
-                if jidx == 21:
-                    break
+            joints.append('%s_%s' % (bonePrefix, j_name))
+            joint_indices.append(jidx - 1)
+        logging.debug("ui::applyBlendshapes():  joints:  " + str(joints))
+
+        # the joints are evaluated at each frame without changing the current time, a window of frames at a
+        # time(see bake_ops):
+        # (without 'Undo':  ranges longer than one window are baked with undo off, see bake_in_windows()):
+        undoable = None
+        if use_timeline and cmds.checkBox(self.range_undo_checkbox, query=True, value=True):
+            undoable = True
+        bake_ops.bake_in_windows(
+            joints,
+            joint_indices,
+            blendShape_node,
+            list(range(frame_range[0], frame_range[-1])),
+            rekey=rekey,
+            undoable=undoable
+        )
 
-            ## clear selection
-            # cmds.select( clear=True )
-            cmds.select(maya_mesh, replace=True)
+        ## clear selection
+        # cmds.select( clear=True )
+        cmds.select(maya_mesh, replace=True)
 
 #    def reRig(self):
 #        """
@@ -1281,6 +2284,79 @@ def cmdCreator():
     return OpenMayaMPx.asMPxPtr(scriptedCommand())
 
 
+kSetKeysCmdName = "SMPL_maya_plugin_set_keys"
+
+
+# Command:  writes keyframe_writer.pending, as one undoable step
+class setKeysCommand(OpenMayaMPx.MPxCommand):
+    def __init__(self):
+        OpenMayaMPx.MPxCommand.__init__(self)
+        # creates/connects the missing anim curves:
+        self.dg_modifier = oM.MDGModifier()
+        # records the key edits:
+        self.anim_curve_change = oMA.MAnimCurveChange()
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, argList):
+        if keyframe_writer.pending is None:
+            sys.stderr.write("%s:  nothing to key (use keyframe_writer.write())\n" % kSetKeysCmdName)
+            return
+
+        plugs, frames, values = keyframe_writer.pending
+
+        time_unit = oM.MTime.uiUnit()
+        times = oM.MTimeArray()
+        for frame in frames:
+            times.append(oM.MTime(frame, time_unit))
+
+        # find the anim curves, creating the missing ones all in one pass:
+        anim_curve_fns = []
+        for plug in plugs:
+            anim_curve = keyframe_writer.get_anim_curve(plug)
+            if anim_curve is None:
+                sys.stderr.write("%s:  %s is driven by something other than an anim curve, not keyed\n" % (kSetKeysCmdName, plug.name()))
+                anim_curve_fns.append(None)
+                continue
+
+            anim_curve_fn = oMA.MFnAnimCurve()
+            if anim_curve.isNull():
+                anim_curve_fn.create(plug, self.dg_modifier)
+            else:
+                anim_curve_fn.setObject(anim_curve)
+            anim_curve_fns.append(anim_curve_fn)
+        self.dg_modifier.doIt()
+
+        for ii in range(0, len(plugs)):
+            anim_curve_fn = anim_curve_fns[ii]
+            if anim_curve_fn is None:
+                continue
+
+            current_values = oM.MDoubleArray()
+            for value in values[ii]:
+                current_values.append(value)
+
+            keyframe_writer.replace_keys(
+                anim_curve_fn,
+                times,
+                current_values,
+                self.anim_curve_change
+            )
+
+    def redoIt(self):
+        self.dg_modifier.doIt()
+        self.anim_curve_change.redoIt()
+
+    def undoIt(self):
+        self.anim_curve_change.undoIt()
+        self.dg_modifier.undoIt()
+
+
+def setKeysCmdCreator():
+    return OpenMayaMPx.asMPxPtr(setKeysCommand())
+
+
 # Initialize the script plug-in
 def initializePlugin(mobject):
     mplugin = OpenMayaMPx.MFnPlugin(mobject)
@@ -1290,11 +2366,24 @@ def initializePlugin(mobject):
         sys.stderr.write("Failed to register command: %s\n" % kPluginCmdName)
         raise
 
+    try:
+        mplugin.registerCommand(kSetKeysCmdName, setKeysCmdCreator)
+    except:
+        sys.stderr.write("Failed to register command: %s\n" % kSetKeysCmdName)
+        raise
+
 
 # Uninitialize the script plug-in
 def uninitializePlugin(mobject):
     mplugin = OpenMayaMPx.MFnPlugin(mobject)
+    blendShape_weight_plugs.clear_cache()
+
     try:
         mplugin.deregisterCommand(kPluginCmdName)
     except:
         sys.stderr.write("Failed to unregister command: %s\n" % kPluginCmdName)
+
+    try:
+        mplugin.deregisterCommand(kSetKeysCmdName)
+    except:
+        sys.stderr.write("Failed to unregister command: %s\n" % kSetKeysCmdName)
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark:  per-joint cost of the SMPL weights solve.
+
+Compares:
+-joint_io.calculate_SMPL():  the per-joint path(get_bs_weights_source(),
+ transpose, identity subtraction, get_row()).
+-joint_io.calculate_SMPL_batch():  the allocation-free path that writes the 
+ 9 weights straight from the 3x3 rotation block in the matrix buffer.
+
+Run it with plain python(pure-Python matrix backend), or with mayapy to
+benchmark the MMatrix backend:
+    python benchmarks/bench_calculate_SMPL.py
+    mayapy benchmarks/bench_calculate_SMPL.py
+"""
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mde_py_poseblends_driver')
+)
+
+import lib_mde_poseblends_driver as mlpbd
+
+NUM_JOINTS = 21
+NUM_REPEATS = 5
+NUM_CALLS = 200
+
+
+def random_rotation_values():
+    angle_x, angle_y, angle_z = [random.uniform(-math.pi, math.pi) for ii in range(0, 3)]
+    cx, sx = math.cos(angle_x), math.sin(angle_x)
+    cy, sy = math.cos(angle_y), math.sin(angle_y)
+    cz, sz = math.cos(angle_z), math.sin(angle_z)
+
+    # Maya's default xyz rotate order, row-vector convention:
+    result = [
+        cy * cz, cy * sz, -sy, 0.0,
+        sx * sy * cz - cx * sz, sx * sy * sz + cx * cz, sx * cy, 0.0,
+        cx * sy * cz + sx * sz, cx * sy * sz - sx * cz, cx * cy, 0.0,
+        0.0, 0.0, 0.0, 1.0
+    ]
+    return result
+
+
+def make_driver_data():
+    data = mlpbd.poseblends_driver_data()
+    data.init_joints_data(NUM_JOINTS)
+    for current_joint_data in data.joints_data:
+        current_joint_data.matrix = mlpbd.mbackend.matrix_from_values(random_rotation_values())
+
+    return data
+
+
+def bench_per_joint(data):
+    calculate_SMPL = mlpbd.joint_io.calculate_SMPL
+    joints_data = data.joints_data
+
+    def run():
+        for current_joint_data in joints_data:
+            calculate_SMPL(current_joint_data)
+
+    return run
+
+
+def bench_batch(data):
+    calculate_SMPL_batch = mlpbd.joint_io.calculate_SMPL_batch
+    joints_data = data.joints_data
+    workspace = data.workspace
+
+    def run():
+        calculate_SMPL_batch(joints_data, workspace)
+
+    return run
+
+
+def per_joint_microseconds(run):
+    best = min(timeit.repeat(run, number = NUM_CALLS, repeat = NUM_REPEATS))
+    return 1.0e6 * best / (NUM_CALLS * NUM_JOINTS)
+
+
+def main():
+    random.seed(0)
+    data = make_driver_data()
+
+    per_joint_us = per_joint_microseconds(bench_per_joint(data))
+    per_joint_weights = [list(x.blendshape_weights) for x in data.joints_data]
+
+    batch_us = per_joint_microseconds(bench_batch(data))
+    batch_weights = [list(x.blendshape_weights) for x in data.joints_data]
+
+    max_error = max(
+        abs(a - b)
+        for current_weights, other_weights in zip(per_joint_weights, batch_weights)
+        for a, b in zip(current_weights, other_weights)
+    )
+
+    print('matrix backend:  {0}'.format(mlpbd.mbackend.BACKEND_NAME))
+    print('calculate_SMPL():        {0:8.2f} us/joint'.format(per_joint_us))
+    print('calculate_SMPL_batch():  {0:8.2f} us/joint'.format(batch_us))
+    print('speedup:                 {0:8.2f}x'.format(per_joint_us / batch_us))
+    print('max abs difference:      {0:.3g}'.format(max_error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark:  how many plugs of an mde_py_poseblends_driver node get dirtied
+when ONE input joint moves.
+
+Builds a single-node(mode 0 style) setup:  NUM_JOINTS joints connected to
+inputJoint[*], and every outputJoint[*].outputJointBlendShapeWeights[*]
+connected downstream, then moves one joint and counts the plugs dirtied
+on the driver node with MNodeMessage.addNodeDirtyPlugCallback().
+
+That's done twice, with the plugin loaded:
+-before:  MDE_PY_POSEBLENDS_FINE_GRAINED_DIRTY=0(the default), ie every inputJoint
+ child affects every output through attributeAffects.
+-after:  MDE_PY_POSEBLENDS_FINE_GRAINED_DIRTY=1, ie
+ setDependentsDirty() only dirties the matching outputJoint element.
+
+It needs Maya, so run it with mayapy:
+    mayapy benchmarks/bench_dirty_propagation.py
+"""
+import os
+import sys
+
+import maya.standalone
+maya.standalone.initialize(name = 'python')
+
+import maya.cmds as cmds
+import maya.OpenMaya as oM
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mde_py_poseblends_driver')
+PLUGIN_PATH = os.path.join(PLUGIN_DIR, 'mde_py_poseblends_driver.py')
+sys.path.insert(0, PLUGIN_DIR)
+
+NUM_JOINTS = 23 # SMPL:  23 posed joints, 23 * 9 = 207 weights
+NUM_WEIGHTS = 9
+
+
+def build_scene():
+    cmds.file(new = True, force = True)
+
+    driver = cmds.createNode('mde_py_poseblends_driver')
+    sink = cmds.createNode('network')
+    cmds.addAttr(sink, longName = 'weight', attributeType = 'double', multi = True)
+
+    joints = []
+    for ii in range(0, NUM_JOINTS):
+        joint = cmds.createNode('joint')
+        joints.append(joint)
+        cmds.connectAttr(
+            '{0}.matrix'.format(joint),
+            '{0}.inputJoint[{1}].inputJointMatrix'.format(driver, ii)
+        )
+        for jj in range(0, NUM_WEIGHTS):
+            cmds.connectAttr(
+                '{0}.outputJoint[{1}].outputJointBlendShapeWeights[{2}]'.format(driver, ii, jj),
+                '{0}.weight[{1}]'.format(sink, NUM_WEIGHTS * ii + jj)
+            )
+
+    return driver, sink, joints
+
+
+def count_dirtied_plugs(
+    fine_grained_dirty
+):
+    os.environ['MDE_PY_POSEBLENDS_FINE_GRAINED_DIRTY'] = '1' if fine_grained_dirty else '0'
+
+    if cmds.pluginInfo(PLUGIN_PATH, query = True, loaded = True):
+        cmds.file(new = True, force = True)
+        cmds.unloadPlugin('mde_py_poseblends_driver.py')
+    cmds.loadPlugin(PLUGIN_PATH)
+
+    driver, sink, joints = build_scene()
+
+    # pull everything once so all the outputs start clean:
+    cmds.getAttr('{0}.weight'.format(sink))
+
+    dirtied_plugs = []
+
+    def on_dirty_plug(node, plug, client_data):
+        dirtied_plugs.append(plug.partialName(False, False, False, False, False, True))
+
+    selection = oM.MSelectionList()
+    selection.add(driver)
+    driver_node = oM.MObject()
+    selection.getDependNode(0, driver_node)
+    callback_id = oM.MNodeMessage.addNodeDirtyPlugCallback(driver_node, on_dirty_plug)
+    try:
+        cmds.setAttr('{0}.rotateX'.format(joints[NUM_JOINTS // 2]), 30.0)
+    finally:
+        oM.MMessage.removeCallback(callback_id)
+
+    num_output_plugs = len([x for x in dirtied_plugs if x.startswith('outputJoint')])
+
+    return len(dirtied_plugs), num_output_plugs
+
+
+def main():
+    before_total, before_outputs = count_dirtied_plugs(False)
+    after_total, after_outputs = count_dirtied_plugs(True)
+
+    print('{0} joints, one joint moved:'.format(NUM_JOINTS))
+    print('before(attributeAffects):  {0} dirtied plugs, {1} of them outputs'.format(before_total, before_outputs))
+    print('after(setDependentsDirty):  {0} dirtied plugs, {1} of them outputs'.format(after_total, after_outputs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Check:  crowd_node_data(the compute() part of mde_py_poseblends_crowd_driver)
+outside of Maya.
+
+Fills a few characters through character_data.set_joint_matrix_from_api2_MMatrix()
+the way mde_py_poseblends_crowd_driver.input_to_node_data() does, but with a
+stand-in for maya.api.OpenMaya's MMatrix(a sequence of 16 values that is NOT
+an array), solves them with crowd_node_data.calculate(), and compares the
+weights with the per-joint solve of lib_mde_poseblends_driver.
+
+It doesn't need Maya or numpy:
+    python benchmarks/check_crowd_node_data.py
+"""
+import math
+import os
+import random
+import sys
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mde_py_poseblends_driver')
+)
+
+import crowd_node_data as mcnd
+import lib_mde_poseblends_driver as mlpbd
+
+NUM_CHARACTERS = 3
+MAX_NUM_JOINTS = 5
+TOL = 1.0e-12
+
+
+class MMatrix_stand_in(object):
+    # like an om2.MMatrix:  indexable and iterable as its 16 row-major
+    # values, but it can't be slice-assigned into an array('d'):
+    def __init__(
+        self,
+        values
+    ):
+        self.values = tuple(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(
+        self,
+        index
+    ):
+        return self.values[index]
+
+
+def random_rotation_values():
+    angle_x, angle_y, angle_z = [random.uniform(-math.pi, math.pi) for ii in range(0, 3)]
+    cx, sx = math.cos(angle_x), math.sin(angle_x)
+    cy, sy = math.cos(angle_y), math.sin(angle_y)
+    cz, sz = math.cos(angle_z), math.sin(angle_z)
+
+    # Maya's default xyz rotate order, row-vector convention:
+    result = [
+        cy * cz, cy * sz, -sy, 0.0,
+        sx * sy * cz - cx * sz, sx * sy * sz + cx * cz, sx * cy, 0.0,
+        cx * sy * cz + sx * sz, cx * sy * sz - sx * cz, cx * cy, 0.0,
+        random.uniform(-1.0, 1.0), random.uniform(-1.0, 1.0), random.uniform(-1.0, 1.0), 1.0,
+    ]
+
+    return result
+
+
+def expected_SMPL_weights(
+    values,
+    scale
+):
+    # the transposed 3x3 block minus the identity, times scale:
+    result = []
+    for ii in range(0, 3):
+        for jj in range(0, 3):
+            value = values[4 * jj + ii]
+            if ii == jj:
+                value -= 1.0
+            result.append(scale * value)
+
+    return result
+
+
+def main():
+    random.seed(0)
+
+    node = mcnd.crowd_node_data()
+    node.model_type = mlpbd.poseblends_driver_data.MODEL_T.kSMPL
+    node.resize_inputs(NUM_CHARACTERS)
+
+    expected = []
+    for ii in range(0, NUM_CHARACTERS):
+        # characters with different numbers of joints, so the batch is padded:
+        num_joints = MAX_NUM_JOINTS - ii
+        current_character = node.characters[ii]
+        current_character.envelope = 1.0 - 0.25 * ii
+        current_character.resize(num_joints)
+
+        character_expected = []
+        for jj in range(0, num_joints):
+            values = random_rotation_values()
+            current_character.joint_logical_indices[jj] = jj
+            current_character.set_joint_matrix_from_api2_MMatrix(
+                jj,
+                MMatrix_stand_in(values)
+            )
+            character_expected.extend(expected_SMPL_weights(values, current_character.envelope))
+        expected.append(character_expected)
+
+    if not node.calculate():
+        raise RuntimeError('crowd_node_data.calculate() failed')
+
+    max_error = 0.0
+    for ii in range(0, NUM_CHARACTERS):
+        weights = node.characters[ii].weights
+        if len(weights) != len(expected[ii]):
+            raise RuntimeError('character {0}:  {1} weights, expected {2}'.format(ii, len(weights), len(expected[ii])))
+        for kk in range(0, len(weights)):
+            max_error = max(max_error, abs(weights[kk] - expected[ii][kk]))
+
+    print('crowd_node_data:  {0} characters, max error:  {1}'.format(NUM_CHARACTERS, max_error))
+    if max_error > TOL:
+        raise RuntimeError('crowd_node_data:  max error {0} > {1}'.format(max_error, TOL))
+
+
+if __name__ == '__main__':
+    main()
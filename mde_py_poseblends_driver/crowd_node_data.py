@@ -0,0 +1,293 @@
+import array
+import sys
+
+import lib_mde_poseblends_batch as mlpbb
+import lib_mde_poseblends_driver as mlpbd
+import mde_trace as mtrace
+import mde_utilities as utils
+
+# crowd_node_data:
+# The compute() part of the mde_py_poseblends_crowd_driver Python MPxNode
+# (see mde_py_poseblends_crowd_driver.py), like node_data.py is for
+# mde_py_poseblends_driver.
+#
+# One crowd node drives MANY characters.  Each character is a list of
+# local joint matrices, and all the characters' joints are solved
+# together by ONE poseblends_batch_solver.calculate() call(see
+# lib_mde_poseblends_batch.py), with the character as the batch's first
+# dimension.  So:  a 200 character crowd is one node and one batch,
+# instead of 200-4200 nodes, each with its own node_data.
+class character_data(object):
+    # The inputs and results of one character of a crowd.
+    # joint_logical_indices[jj]:  the inputCharacterJointMatrix logical
+    # index the jjth joint was read from.
+    # joint_matrices:  16 row-major values per joint, MATRIX_SIZE apart.
+    # weights:  the blendShape weights, get_num_weights() per joint.
+    MATRIX_SIZE = 16
+
+    def __init__(
+        self
+    ):
+        self.envelope = 1.0
+        self.joint_logical_indices = list()
+        self.joint_matrices = array.array('d')
+        self.weights = array.array('d')
+
+    def resize(
+        self,
+        num_joints
+    ):
+        # no-op unless the number of joints changed:
+        THIS_T = character_data
+
+        utils.resize(self.joint_logical_indices, num_joints)
+
+        num_values = THIS_T.MATRIX_SIZE * num_joints
+        current_num_values = len(self.joint_matrices)
+        if current_num_values > num_values:
+            del self.joint_matrices[num_values:]
+        elif current_num_values < num_values:
+            self.joint_matrices.extend(array.array('d', [0.0]) * (num_values - current_num_values))
+
+    @property
+    def num_joints(
+        self
+    ):
+        return len(self.joint_logical_indices)
+
+    def set_joint_matrix_values(
+        self,
+        joint_index,
+        values
+    ):
+        # \param[in] values:  an array('d') of the 16 row-major values of the matrix.
+        offset = character_data.MATRIX_SIZE * joint_index
+        self.joint_matrices[offset:offset + character_data.MATRIX_SIZE] = values
+
+    def set_joint_matrix_from_api2_MMatrix(
+        self,
+        joint_index,
+        maya_matrix
+    ):
+        # set_joint_matrix_values() for a maya.api.OpenMaya MMatrix, which
+        # is a sequence of its 16 row-major values, but not an array:
+        self.set_joint_matrix_values(
+            joint_index,
+            array.array('d', maya_matrix)
+        )
+
+
+class crowd_node_data(object):
+    CHARACTER_DATA_T = character_data
+    BATCH_SOLVER_T = mlpbb.poseblends_batch_solver
+    MODEL_T = mlpbd.poseblends_driver_data.MODEL_T
+
+    IDENTITY_VALUES = (
+        1.0, 0.0, 0.0, 0.0,
+        0.0, 1.0, 0.0, 0.0,
+        0.0, 0.0, 1.0, 0.0,
+        0.0, 0.0, 0.0, 1.0
+    )
+
+    def __init__(
+        self
+    ):
+        # INPUTS:
+        self.envelope = 1.0
+        self.scale = 1.0
+        self.tol = 1.0e-5
+        self.model_type = crowd_node_data.MODEL_T.kSMPL
+
+        # characters[cc]:  a CHARACTER_DATA_T, read from the inputCharacter
+        # element at logical index character_logical_indices[cc]:
+        self.character_logical_indices = list()
+        self.characters = list()
+
+        # OUTPUT CACHE:  what was last written to the output attributes,
+        # so only the values that changed get written(see
+        # output_layout_changed() and
+        # mde_py_poseblends_crowd_driver.output_from_node_data()):
+        # output_character_logical_indices:  the outputCharacter logical indices.
+        # output_joint_logical_indices:  each of those characters' joints.
+        # output_weights:  each of those characters' written weights.
+        self.output_character_logical_indices = list()
+        self.output_joint_logical_indices = list()
+        self.output_weights = list()
+        self.output_model_type = None
+
+    def resize_inputs(
+        self,
+        num_characters
+    ):
+        # no-op unless the number of characters changed:
+        CHARACTER_DATA_T = crowd_node_data.CHARACTER_DATA_T
+
+        utils.resize(self.character_logical_indices, num_characters)
+
+        current_num_characters = len(self.characters)
+        if current_num_characters > num_characters:
+            del self.characters[num_characters:]
+        else:
+            for ii in range(current_num_characters, num_characters):
+                self.characters.append(CHARACTER_DATA_T())
+
+    def get_num_weights(
+        self
+    ):
+        # the number of weights per joint:
+        return crowd_node_data.BATCH_SOLVER_T.get_num_weights(self.model_type)
+
+    def output_layout_changed(
+        self
+    ):
+        # \return True if the outputs have to be rebuilt, ie the characters,
+        # their joints or the model type(and so the number of weights per
+        # joint) changed since the last set_output_layout().
+        characters = self.characters
+        num_characters = len(characters)
+
+        if self.output_model_type != self.model_type:
+            return True
+
+        if self.output_character_logical_indices != self.character_logical_indices[0:num_characters]:
+            return True
+
+        output_joint_logical_indices = self.output_joint_logical_indices
+        for ii in range(0, num_characters):
+            if output_joint_logical_indices[ii] != characters[ii].joint_logical_indices:
+                return True
+
+        return False
+
+    def set_output_layout(
+        self
+    ):
+        # remember the current characters and joints as the output layout,
+        # with the current weights as the written values:
+        characters = self.characters
+        num_characters = len(characters)
+
+        self.output_model_type = self.model_type
+        self.output_character_logical_indices = self.character_logical_indices[0:num_characters]
+        self.output_joint_logical_indices = [list(x.joint_logical_indices) for x in characters]
+        self.output_weights = [array.array('d', x.weights) for x in characters]
+
+    def memory_usage(
+        self
+    ):
+        # \return the approximate number of bytes used by the per-character
+        # data and the output cache:
+        result = 0
+        for current_character in self.characters:
+            result += sys.getsizeof(current_character.joint_logical_indices)
+            result += sys.getsizeof(current_character.joint_matrices)
+            result += sys.getsizeof(current_character.weights)
+
+        for current_weights in self.output_weights:
+            result += sys.getsizeof(current_weights)
+
+        result += sys.getsizeof(self.characters)
+        result += sys.getsizeof(self.character_logical_indices)
+
+        return result
+
+    def calculate(
+        self
+    ):
+        # Solve all the characters' joints in one batch.  Characters with
+        # fewer joints than the largest are padded with identity matrices
+        # whose envelope is 0.0, so their padding solves to zeros.
+        THIS_T = crowd_node_data
+        BATCH_SOLVER_T = THIS_T.BATCH_SOLVER_T
+        MATRIX_SIZE = THIS_T.CHARACTER_DATA_T.MATRIX_SIZE
+
+        stat = 1
+
+        characters = self.characters
+        num_characters = len(characters)
+        num_weights = self.get_num_weights()
+
+        max_num_joints = 0
+        for current_character in characters:
+            max_num_joints = max(max_num_joints, current_character.num_joints)
+
+        if mtrace.TRACE:
+            mtrace.debug('crowd_node_data.calculate():  num_characters:  {0}, max_num_joints:  {1}', num_characters, max_num_joints)
+
+        if (num_characters == 0) or (max_num_joints == 0):
+            for current_character in characters:
+                utils.resize(current_character.weights, 0)
+            return stat
+
+        if mlpbb.HAS_NUMPY:
+            np = mlpbb.np
+
+            local_matrices = np.tile(
+                np.array(THIS_T.IDENTITY_VALUES),
+                (num_characters, max_num_joints, 1)
+            )
+            joint_envelopes = np.zeros((num_characters, max_num_joints))
+            for ii in range(0, num_characters):
+                current_character = characters[ii]
+                num_joints = current_character.num_joints
+                local_matrices[ii, 0:num_joints] = np.frombuffer(
+                    current_character.joint_matrices,
+                    dtype = np.float64
+                ).reshape(num_joints, MATRIX_SIZE)
+                joint_envelopes[ii, 0:num_joints] = current_character.envelope
+
+            result = BATCH_SOLVER_T.calculate(
+                local_matrices,
+                model_type = self.model_type,
+                joint_envelopes = joint_envelopes,
+                envelope = self.envelope,
+                scale = self.scale,
+                tol = self.tol,
+                use_numpy = True
+            )
+
+            for ii in range(0, num_characters):
+                current_character = characters[ii]
+                weights = array.array('d')
+                weights.frombytes(result[ii, 0:current_character.num_joints].tobytes())
+                current_character.weights = weights
+        else:
+            identity = [list(THIS_T.IDENTITY_VALUES[ii:ii + 4]) for ii in range(0, MATRIX_SIZE, 4)]
+
+            local_matrices = []
+            joint_envelopes = []
+            for current_character in characters:
+                num_joints = current_character.num_joints
+                values = current_character.joint_matrices
+                character_matrices = [
+                    [values[jj + ii:jj + ii + 4] for ii in range(0, MATRIX_SIZE, 4)]
+                    for jj in range(0, MATRIX_SIZE * num_joints, MATRIX_SIZE)
+                ]
+                character_matrices.extend([identity] * (max_num_joints - num_joints))
+                local_matrices.append(character_matrices)
+
+                character_envelopes = [current_character.envelope] * num_joints
+                character_envelopes.extend([0.0] * (max_num_joints - num_joints))
+                joint_envelopes.append(character_envelopes)
+
+            result = BATCH_SOLVER_T.calculate(
+                local_matrices,
+                model_type = self.model_type,
+                joint_envelopes = joint_envelopes,
+                envelope = self.envelope,
+                scale = self.scale,
+                tol = self.tol,
+                use_numpy = False
+            )
+
+            for ii in range(0, num_characters):
+                current_character = characters[ii]
+                current_character.weights = array.array('d', [
+                    x for joint_weights in result[ii][0:current_character.num_joints] for x in joint_weights
+                ])
+
+        if mtrace.PROFILE:
+            mtrace.add_count('crowd_characters_solved', num_characters)
+            mtrace.add_count('crowd_joints_solved', num_characters * max_num_joints)
+
+        return stat
@@ -0,0 +1,488 @@
+import logging
+import math
+import os
+
+# lib_mde_matrix_backend:
+# The matrix and quaternion types used by lib_mde_poseblends_driver.py.
+# lib_mde_poseblends_driver.py only needs a small part of the
+# MMatrix/MQuaternion interface:
+#     MATRIX_T():  identity 4x4 matrix
+#     m(row, column), m.setToIdentity(), m.transpose(), m.inverse(),
+#     m * n, m - n, m.isEquivalent(n, tol)
+#     matrix_from_values()/matrix_to_values():  copy a matrix from/to
+#     16 row-major floats in a flat buffer.
+#     QUAT_T(x, y, z, w), q.normalizeIt(), q.x/y/z/w, q[ii], scalar * q
+# so, besides the OpenMaya one, this module provides a pure-Python and
+# a NumPy implementation of that interface.  That lets the poseblends
+# weights be calculated in a plain CPython process(ie without
+# Maya/mayapy).
+#
+# The backend is selected once, at import time:
+# -if the MDE_PY_POSEBLENDS_BACKEND environment variable is set to one of
+#  'maya', 'numpy' or 'python':  that backend is used.
+# -otherwise:  'maya' is used if maya.OpenMaya can be imported,
+#  and 'python' is used if it can't.
+BACKEND_ENV_VAR = 'MDE_PY_POSEBLENDS_BACKEND'
+BACKEND_NAMES = ('maya', 'numpy', 'python')
+
+try:
+    import maya.OpenMaya as oM
+except ImportError:
+    oM = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class py_matrix(object):
+    # 4x4 homogeneous matrix stored as a row-major list of 16 floats.
+    # Like MMatrix:  the default constructed value is the identity.
+    __slots__ = ('values',)
+
+    IDENTITY_VALUES = (
+        1.0, 0.0, 0.0, 0.0,
+        0.0, 1.0, 0.0, 0.0,
+        0.0, 0.0, 1.0, 0.0,
+        0.0, 0.0, 0.0, 1.0
+    )
+
+    def __init__(
+        self,
+        values = None
+    ):
+        if values is None:
+            values = py_matrix.IDENTITY_VALUES
+        self.values = [float(x) for x in values]
+
+    def __call__(
+        self,
+        row,
+        column
+    ):
+        return self.values[4 * row + column]
+
+    def __repr__(self):
+        return 'py_matrix({0})'.format(self.values)
+
+    def set_cell(
+        self,
+        value,
+        row,
+        column
+    ):
+        self.values[4 * row + column] = float(value)
+
+    def setToIdentity(self):
+        self.values[:] = py_matrix.IDENTITY_VALUES
+
+    def transpose(self):
+        v = self.values
+        result = py_matrix.__new__(py_matrix)
+        result.values = [v[4 * jj + ii] for ii in range(0, 4) for jj in range(0, 4)]
+        return result
+
+    def inverse(self):
+        # Gauss-Jordan elimination with partial pivoting:
+        a = [self.values[4 * ii:4 * ii + 4] for ii in range(0, 4)]
+        inv = [list(py_matrix.IDENTITY_VALUES[4 * ii:4 * ii + 4]) for ii in range(0, 4)]
+
+        for column in range(0, 4):
+            pivot_row = max(range(column, 4), key = lambda r: abs(a[r][column]))
+            pivot = a[pivot_row][column]
+            if pivot == 0.0:
+                # singular:  MMatrix.inverse() returns garbage in this case
+                # rather than raising, so match that as best we can:
+                logging.warning('py_matrix.inverse():  matrix is singular')
+                return py_matrix()
+
+            a[column], a[pivot_row] = a[pivot_row], a[column]
+            inv[column], inv[pivot_row] = inv[pivot_row], inv[column]
+
+            scale = 1.0 / pivot
+            a_column = a[column]
+            inv_column = inv[column]
+            for jj in range(0, 4):
+                a_column[jj] *= scale
+                inv_column[jj] *= scale
+
+            for row in range(0, 4):
+                if row == column:
+                    continue
+                factor = a[row][column]
+                if factor == 0.0:
+                    continue
+                a_row = a[row]
+                inv_row = inv[row]
+                for jj in range(0, 4):
+                    a_row[jj] -= factor * a_column[jj]
+                    inv_row[jj] -= factor * inv_column[jj]
+
+        result = py_matrix.__new__(py_matrix)
+        result.values = [x for row in inv for x in row]
+        return result
+
+    def __mul__(
+        self,
+        other
+    ):
+        a = self.values
+        b = other.values
+        values = []
+        for ii in range(0, 4):
+            a0 = a[4 * ii]
+            a1 = a[4 * ii + 1]
+            a2 = a[4 * ii + 2]
+            a3 = a[4 * ii + 3]
+            for jj in range(0, 4):
+                values.append(a0 * b[jj] + a1 * b[4 + jj] + a2 * b[8 + jj] + a3 * b[12 + jj])
+
+        result = py_matrix.__new__(py_matrix)
+        result.values = values
+        return result
+
+    def __add__(
+        self,
+        other
+    ):
+        result = py_matrix.__new__(py_matrix)
+        result.values = [x + y for x, y in zip(self.values, other.values)]
+        return result
+
+    def __sub__(
+        self,
+        other
+    ):
+        result = py_matrix.__new__(py_matrix)
+        result.values = [x - y for x, y in zip(self.values, other.values)]
+        return result
+
+    def isEquivalent(
+        self,
+        other,
+        tol = 1.0e-10
+    ):
+        return all(abs(x - y) <= tol for x, y in zip(self.values, other.values))
+
+
+class np_matrix(object):
+    # 4x4 homogeneous matrix stored as a (4, 4) numpy array.
+    __slots__ = ('values',)
+
+    def __init__(
+        self,
+        values = None
+    ):
+        if values is None:
+            self.values = np.identity(4)
+        else:
+            self.values = np.array(values, dtype = np.float64).reshape(4, 4)
+
+    @staticmethod
+    def from_array(
+        array
+    ):
+        result = np_matrix.__new__(np_matrix)
+        result.values = array
+        return result
+
+    def __call__(
+        self,
+        row,
+        column
+    ):
+        return float(self.values[row, column])
+
+    def __repr__(self):
+        return 'np_matrix({0})'.format(self.values.ravel().tolist())
+
+    def set_cell(
+        self,
+        value,
+        row,
+        column
+    ):
+        self.values[row, column] = value
+
+    def setToIdentity(self):
+        self.values = np.identity(4)
+
+    def transpose(self):
+        return np_matrix.from_array(self.values.T.copy())
+
+    def inverse(self):
+        return np_matrix.from_array(np.linalg.inv(self.values))
+
+    def __mul__(
+        self,
+        other
+    ):
+        return np_matrix.from_array(self.values.dot(other.values))
+
+    def __add__(
+        self,
+        other
+    ):
+        return np_matrix.from_array(self.values + other.values)
+
+    def __sub__(
+        self,
+        other
+    ):
+        return np_matrix.from_array(self.values - other.values)
+
+    def isEquivalent(
+        self,
+        other,
+        tol = 1.0e-10
+    ):
+        return bool(np.all(np.abs(self.values - other.values) <= tol))
+
+
+class py_quaternion(object):
+    # (x, y, z, w) quaternion with the subset of the MQuaternion
+    # interface used by lib_mde_poseblends_driver.py:
+    __slots__ = ('x', 'y', 'z', 'w')
+
+    def __init__(
+        self,
+        x = 0.0,
+        y = 0.0,
+        z = 0.0,
+        w = 1.0
+    ):
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+        self.w = float(w)
+
+    def __getitem__(
+        self,
+        index
+    ):
+        return (self.x, self.y, self.z, self.w)[index]
+
+    def __repr__(self):
+        return 'py_quaternion({0}, {1}, {2}, {3})'.format(self.x, self.y, self.z, self.w)
+
+    def normalizeIt(self):
+        norm = math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z + self.w * self.w)
+        if norm > 0.0:
+            scale = 1.0 / norm
+            self.x *= scale
+            self.y *= scale
+            self.z *= scale
+            self.w *= scale
+        return self
+
+    def __mul__(
+        self,
+        scalar
+    ):
+        return py_quaternion(
+            scalar * self.x,
+            scalar * self.y,
+            scalar * self.z,
+            scalar * self.w
+        )
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return py_quaternion(-self.x, -self.y, -self.z, -self.w)
+
+
+class maya_backend(object):
+    NAME = 'maya'
+
+    @staticmethod
+    def is_available():
+        return oM is not None
+
+    @staticmethod
+    def get_types():
+        return oM.MMatrix, oM.MQuaternion
+
+    @staticmethod
+    def set_cell(
+        matrix,
+        value,
+        row,
+        column
+    ):
+        # for setting the [row][column] element of MMatrix
+        # https:#groups.google.com/g/python_inside_maya/c/Gou02IHsYKA
+        oM.MScriptUtil.setDoubleArray(
+            matrix[row],
+            column,
+            value
+        )
+
+    @staticmethod
+    def set_cell_float(
+        matrix,
+        value,
+        row,
+        column
+    ):
+        oM.MScriptUtil.setFloatArray(
+            matrix[row],
+            column,
+            value
+        )
+
+    @staticmethod
+    def from_MMatrix(
+        maya_matrix
+    ):
+        # both Maya and Non-Maya are MMatrix, so just use assignment:
+        return maya_matrix
+
+    @staticmethod
+    def matrix_from_values(
+        values,
+        offset = 0
+    ):
+        result = oM.MMatrix()
+        oM.MScriptUtil.createMatrixFromList(
+            [values[offset + ii] for ii in range(0, 16)],
+            result
+        )
+        return result
+
+    @staticmethod
+    def matrix_to_values(
+        matrix,
+        values,
+        offset = 0
+    ):
+        for ii in range(0, 4):
+            for jj in range(0, 4):
+                values[offset + 4 * ii + jj] = matrix(ii, jj)
+
+
+class python_backend(object):
+    NAME = 'python'
+    MATRIX_T = py_matrix
+
+    @staticmethod
+    def is_available():
+        return True
+
+    @staticmethod
+    def get_types():
+        return py_matrix, py_quaternion
+
+    @staticmethod
+    def set_cell(
+        matrix,
+        value,
+        row,
+        column
+    ):
+        matrix.set_cell(value, row, column)
+
+    set_cell_float = set_cell
+
+    @staticmethod
+    def from_MMatrix(
+        maya_matrix
+    ):
+        return py_matrix([maya_matrix(ii, jj) for ii in range(0, 4) for jj in range(0, 4)])
+
+    @staticmethod
+    def matrix_from_values(
+        values,
+        offset = 0
+    ):
+        return py_matrix(values[offset:offset + 16])
+
+    @staticmethod
+    def matrix_to_values(
+        matrix,
+        values,
+        offset = 0
+    ):
+        source = matrix.values
+        for ii in range(0, 16):
+            values[offset + ii] = source[ii]
+
+
+class numpy_backend(python_backend):
+    NAME = 'numpy'
+
+    @staticmethod
+    def is_available():
+        return np is not None
+
+    @staticmethod
+    def get_types():
+        return np_matrix, py_quaternion
+
+    @staticmethod
+    def from_MMatrix(
+        maya_matrix
+    ):
+        return np_matrix([maya_matrix(ii, jj) for ii in range(0, 4) for jj in range(0, 4)])
+
+    @staticmethod
+    def matrix_from_values(
+        values,
+        offset = 0
+    ):
+        return np_matrix(values[offset:offset + 16])
+
+    @staticmethod
+    def matrix_to_values(
+        matrix,
+        values,
+        offset = 0
+    ):
+        source = matrix.values.ravel()
+        for ii in range(0, 16):
+            values[offset + ii] = float(source[ii])
+
+
+BACKENDS = {
+    maya_backend.NAME:  maya_backend,
+    numpy_backend.NAME:  numpy_backend,
+    python_backend.NAME:  python_backend,
+}
+
+
+def select_backend(
+    name = None
+):
+    # \param[in] name:  one of BACKEND_NAMES, or None to pick the default(see the top of this file).
+    # \return the backend class to use.
+    if name is None:
+        name = os.environ.get(BACKEND_ENV_VAR, '').strip().lower()
+
+    if name:
+        if name not in BACKENDS:
+            raise ValueError('{0}:  unknown matrix backend "{1}", expected one of {2}'.format(BACKEND_ENV_VAR, name, BACKEND_NAMES))
+
+        backend = BACKENDS[name]
+        if not backend.is_available():
+            raise ImportError('matrix backend "{0}" was requested but is not available'.format(name))
+
+        return backend
+
+    if maya_backend.is_available():
+        return maya_backend
+
+    return python_backend
+
+
+BACKEND = select_backend()
+BACKEND_NAME = BACKEND.NAME
+XFORM_MATRIX_T, QUAT_T = BACKEND.get_types()
+
+set_cell = BACKEND.set_cell
+set_cell_float = BACKEND.set_cell_float
+from_MMatrix = BACKEND.from_MMatrix
+matrix_from_values = BACKEND.matrix_from_values
+matrix_to_values = BACKEND.matrix_to_values
+
+logging.debug('lib_mde_matrix_backend:  using the "{0}" backend'.format(BACKEND_NAME))
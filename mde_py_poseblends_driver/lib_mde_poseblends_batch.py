@@ -0,0 +1,503 @@
+import array
+import math
+
+import lib_mde_poseblends_driver as mlpbd
+
+# lib_mde_poseblends_batch:
+# This is the batch version of the poseblends_driver calculation in
+# lib_mde_poseblends_driver.py.  Instead of solving one joint_io_data
+# at a time(which builds several MMatrix/MQuaternion objects per joint),
+# it takes a whole block of local joint matrices:
+#     local_matrices[frame][joint] -> 4x4 local homogeneous transform
+# and returns all the blendShape weights for all the frames and joints:
+#     result[frame][joint] -> 9 SMPL weights, or 4 STAR weights
+# in one pass.
+#
+# NumPy is used when it is available, since it lets the whole block be
+# solved in a handful of vectorized operations.  It is NOT required,
+# though:  the current criteria is still not to use anything which
+# would require end user action to obtain/setup to work with Maya,
+# so there is a pure-Python fallback which gives the same results.
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+
+class poseblends_batch_solver(object):
+    MODEL_T = mlpbd.poseblends_driver_data.MODEL_T
+
+    NUM_SMPL_WEIGHTS = 9
+    NUM_STAR_WEIGHTS = 4
+
+    @staticmethod
+    def get_num_weights(
+        model_type
+    ):
+        THIS_T = poseblends_batch_solver
+
+        result = THIS_T.NUM_SMPL_WEIGHTS
+        if(model_type == THIS_T.MODEL_T.kSTAR):
+            result = THIS_T.NUM_STAR_WEIGHTS
+
+        return result
+
+    @staticmethod
+    def calculate(
+        local_matrices,
+        model_type = mlpbd.poseblends_driver_data.MODEL_T.kSMPL,
+        joint_envelopes = None,
+        envelope = 1.0,
+        scale = 1.0,
+        tol = 1.0e-5,
+        use_numpy = None
+    ):
+        # Calculate the blendShape weights for a whole block of joints.
+        # \param[in] local_matrices:  (N_frames, N_joints, 4, 4) local joint matrices, either as a numpy array or as nested sequences indexable like local_matrices[frame][joint][row][column].  These use the same(row-vector) convention as MMatrix.
+        # \param[in] model_type:  poseblends_driver_data.MODEL_T(kSMPL or kSTAR).
+        # \param[in] joint_envelopes:  optional (N_frames, N_joints) per-joint envelopes.  Defaults to 1.0 for all joints.
+        # \param[in] envelope:  the global envelope, like poseblends_driver_data.envelope.
+        # \param[in] scale:  the global scale, like poseblends_driver_data.scale.
+        # \param[in] tol:  joints whose combined scale * envelope is below tol get zeroed weights, like joint_io.get_bs_weights_source().
+        # \param[in] use_numpy:  None:  use numpy if it is available.  True/False:  force/forbid the numpy path.
+        # \return the (N_frames, N_joints, 9 or 4) weights.  A numpy array for the numpy path, nested lists otherwise.
+        THIS_T = poseblends_batch_solver
+
+        if use_numpy is None:
+            use_numpy = HAS_NUMPY
+
+        if use_numpy and not HAS_NUMPY:
+            raise ImportError('poseblends_batch_solver:  numpy was requested but it could not be imported')
+
+        if use_numpy:
+            result = THIS_T.calculate_numpy(
+                local_matrices,
+                model_type,
+                joint_envelopes,
+                envelope,
+                scale,
+                tol
+            )
+        else:
+            result = THIS_T.calculate_python(
+                local_matrices,
+                model_type,
+                joint_envelopes,
+                envelope,
+                scale,
+                tol
+            )
+
+        return result
+
+    @staticmethod
+    def calculate_numpy(
+        local_matrices,
+        model_type,
+        joint_envelopes,
+        envelope,
+        scale,
+        tol
+    ):
+        THIS_T = poseblends_batch_solver
+
+        matrices = np.asarray(local_matrices, dtype = np.float64)
+        num_frames = matrices.shape[0]
+        num_joints = matrices.shape[1]
+        matrices = matrices.reshape(num_frames, num_joints, 4, 4)
+
+        # attenuate the per-joint envelopes by the:
+        # *global envelope and
+        # *global scale:
+        combined_scale = np.full((num_frames, num_joints), scale * envelope)
+        if joint_envelopes is not None:
+            combined_scale = combined_scale * np.asarray(joint_envelopes, dtype = np.float64).reshape(num_frames, num_joints)
+
+        # the source of the blendshape weights is the transposed 3x3
+        # block of the local matrices(see joint_io.get_bs_weights_source()).
+        # Joints whose combined_scale is ~0 use an all-zero source:
+        bs_weights_source = np.swapaxes(matrices[..., :3, :3], -1, -2)
+        is_zero = np.abs(combined_scale) < tol
+        bs_weights_source = np.where(is_zero[..., None, None], 0.0, bs_weights_source)
+
+        if(model_type == THIS_T.MODEL_T.kSTAR):
+            flat_source = bs_weights_source.reshape(-1, 3, 3)
+            quats = THIS_T.from_matrices_to_quaternions_numpy(flat_source)
+
+            norms = np.sqrt(np.sum(quats * quats, axis = 1))
+            quats = quats / norms[:, None]
+
+            # make sure w is always positive:
+            # (for unit quaternions:  -q and q are the same rotation):
+            quats = np.where(quats[:, 3:4] < 0.0, -quats, quats)
+            quats[:, 3] -= 1.0
+
+            result = quats.reshape(num_frames, num_joints, THIS_T.NUM_STAR_WEIGHTS)
+        else:
+            identity = np.eye(3)
+            bs_weights_source = np.where(is_zero[..., None, None], 0.0, bs_weights_source - identity)
+
+            result = bs_weights_source.reshape(num_frames, num_joints, THIS_T.NUM_SMPL_WEIGHTS)
+
+        result = result * combined_scale[..., None]
+
+        return result
+
+    @staticmethod
+    def from_matrices_to_quaternions_numpy(
+        mats
+    ):
+        # Vectorized version of lib_mde_poseblends_driver.from_matrix_to_quaternion():
+        # \param[in] mats:  (K, 3, 3) rotation matrices.
+        # \return (K, 4) quaternions as (x, y, z, w), NOT normalized.
+        num_mats = mats.shape[0]
+        result = np.empty((num_mats, 4))
+
+        trace = mats[:, 0, 0] + mats[:, 1, 1] + mats[:, 2, 2]
+
+        # trace-positive branch:
+        positive = np.nonzero(trace > 0)[0]
+        if positive.size > 0:
+            m = mats[positive]
+            t = np.sqrt(trace[positive] + 1.0)
+            result[positive, 3] = 0.5 * t
+            t = 0.5 / t
+            result[positive, 0] = (m[:, 2, 1] - m[:, 1, 2]) * t
+            result[positive, 1] = (m[:, 0, 2] - m[:, 2, 0]) * t
+            result[positive, 2] = (m[:, 1, 0] - m[:, 0, 1]) * t
+
+        # diagonal-pivot branch:
+        pivot = np.nonzero(~(trace > 0))[0]
+        if pivot.size > 0:
+            m = mats[pivot]
+            rows = np.arange(pivot.size)
+            diagonal = np.diagonal(m, axis1 = 1, axis2 = 2)
+
+            ii = np.where(diagonal[:, 1] > diagonal[:, 0], 1, 0)
+            ii = np.where(diagonal[:, 2] > diagonal[rows, ii], 2, ii)
+            jj = (ii + 1) % 3
+            kk = (jj + 1) % 3
+
+            t = np.sqrt(m[rows, ii, ii] - m[rows, jj, jj] - m[rows, kk, kk] + 1.0)
+            result[pivot, ii] = 0.5 * t
+            t = 0.5 / t
+            result[pivot, 3] = (m[rows, kk, jj] - m[rows, jj, kk]) * t
+            result[pivot, jj] = (m[rows, jj, ii] + m[rows, ii, jj]) * t
+            result[pivot, kk] = (m[rows, kk, ii] + m[rows, ii, kk]) * t
+
+        return result
+
+    @staticmethod
+    def calculate_python(
+        local_matrices,
+        model_type,
+        joint_envelopes,
+        envelope,
+        scale,
+        tol
+    ):
+        THIS_T = poseblends_batch_solver
+
+        global_scale = scale * envelope
+        is_STAR = (model_type == THIS_T.MODEL_T.kSTAR)
+
+        result = []
+        for frame_index, frame_matrices in enumerate(local_matrices):
+            frame_envelopes = None
+            if joint_envelopes is not None:
+                frame_envelopes = joint_envelopes[frame_index]
+
+            num_joints = len(frame_matrices)
+            combined_scales = [global_scale] * num_joints
+            if frame_envelopes is not None:
+                combined_scales = [global_scale * x for x in frame_envelopes]
+
+            if is_STAR:
+                # flatten the frame's matrices so all of them can be
+                # converted by one from_matrices_to_STAR_weights() call:
+                matrix_values = array.array('d', [
+                    x for m in frame_matrices for row in m for x in row
+                ])
+                weights = array.array('d', [0.0]) * (THIS_T.NUM_STAR_WEIGHTS * num_joints)
+                mlpbd.from_matrices_to_STAR_weights(
+                    matrix_values,
+                    range(0, 16 * num_joints, 16),
+                    combined_scales,
+                    tol,
+                    weights,
+                    range(0, THIS_T.NUM_STAR_WEIGHTS * num_joints, THIS_T.NUM_STAR_WEIGHTS)
+                )
+                result.append([
+                    weights[ii:ii + THIS_T.NUM_STAR_WEIGHTS].tolist()
+                    for ii in range(0, THIS_T.NUM_STAR_WEIGHTS * num_joints, THIS_T.NUM_STAR_WEIGHTS)
+                ])
+                continue
+
+            frame_result = []
+            for joint_index, m in enumerate(frame_matrices):
+                combined_scale = combined_scales[joint_index]
+                if abs(combined_scale) < tol:
+                    frame_result.append([0.0] * THIS_T.NUM_SMPL_WEIGHTS)
+                    continue
+
+                # the 3x3 block of m, transposed, minus the identity:
+                row0 = m[0]
+                row1 = m[1]
+                row2 = m[2]
+                frame_result.append([
+                    combined_scale * (row0[0] - 1.0),
+                    combined_scale * row1[0],
+                    combined_scale * row2[0],
+                    combined_scale * row0[1],
+                    combined_scale * (row1[1] - 1.0),
+                    combined_scale * row2[1],
+                    combined_scale * row0[2],
+                    combined_scale * row1[2],
+                    combined_scale * (row2[2] - 1.0)
+                ])
+
+            result.append(frame_result)
+
+        return result
+
+
+class local_rotation_batch(object):
+    # Builds the 3x3 rotation block of many joints' local matrices, for
+    # many frames, from their euler rotations, the way Maya's joint does:
+    #     [rotateAxis] * [rotate(in rotateOrder)] * [jointOrient]
+    # in the row-vector convention of MMatrix, with rotateAxis and
+    # jointOrient always in XYZ order.  Scale, shear and inverseScale are
+    # assumed to be the identity, and translation is left at zero:  so
+    # the result can go straight to poseblends_batch_solver.calculate().
+
+    # Maya's rotateOrder enum -> the order the axis rotations are applied in:
+    ROTATE_ORDERS = (
+        'xyz',
+        'yzx',
+        'zxy',
+        'xzy',
+        'yxz',
+        'zyx',
+    )
+
+    MATRIX_SIZE = 16
+
+    @staticmethod
+    def calculate(
+        rotations,
+        rotate_orders,
+        rotate_axes = None,
+        joint_orients = None,
+        use_numpy = None
+    ):
+        # \param[in] rotations:  N_frames * N_joints * 3 euler angles in radians, frame major:  the (x, y, z) rotation of joint j at frame f starts at 3 * (f * N_joints + j).
+        # \param[in] rotate_orders:  N_joints rotate orders, like Maya's rotateOrder enum(see ROTATE_ORDERS).
+        # \param[in] rotate_axes:  optional N_joints * 3 rotateAxis angles in radians.  Defaults to zero.
+        # \param[in] joint_orients:  optional N_joints * 3 jointOrient angles in radians.  Defaults to zero.
+        # \param[in] use_numpy:  None:  use numpy if it is available.  True/False:  force/forbid the numpy path.
+        # \return an array('d') of N_frames * N_joints row-major 4x4 matrices, frame major, like the local_matrices of poseblends_batch_solver.calculate().
+        THIS_T = local_rotation_batch
+
+        if use_numpy is None:
+            use_numpy = HAS_NUMPY
+
+        if use_numpy and not HAS_NUMPY:
+            raise ImportError('local_rotation_batch:  numpy was requested but it could not be imported')
+
+        num_joints = len(rotate_orders)
+        if rotate_axes is None:
+            rotate_axes = [0.0] * (3 * num_joints)
+        if joint_orients is None:
+            joint_orients = [0.0] * (3 * num_joints)
+
+        if use_numpy:
+            result = THIS_T.calculate_numpy(
+                rotations,
+                rotate_orders,
+                rotate_axes,
+                joint_orients
+            )
+        else:
+            result = THIS_T.calculate_python(
+                rotations,
+                rotate_orders,
+                rotate_axes,
+                joint_orients
+            )
+
+        return result
+
+    @staticmethod
+    def from_angles_to_axis_matrices_numpy(
+        angles
+    ):
+        # \param[in] angles:  (..., 3) euler angles in radians.
+        # \return a dict:  axis('x', 'y' or 'z') -> (..., 3, 3) rotation matrices about that axis.
+        cosines = np.cos(angles)
+        sines = np.sin(angles)
+
+        result = {}
+        for axis_index, axis in enumerate('xyz'):
+            c = cosines[..., axis_index]
+            s = sines[..., axis_index]
+
+            # the other two axes, in cyclic order:
+            jj = (axis_index + 1) % 3
+            kk = (axis_index + 2) % 3
+
+            m = np.zeros(angles.shape[:-1] + (3, 3))
+            m[..., axis_index, axis_index] = 1.0
+            m[..., jj, jj] = c
+            m[..., jj, kk] = s
+            m[..., kk, jj] = -s
+            m[..., kk, kk] = c
+
+            result[axis] = m
+
+        return result
+
+    @staticmethod
+    def calculate_numpy(
+        rotations,
+        rotate_orders,
+        rotate_axes,
+        joint_orients
+    ):
+        THIS_T = local_rotation_batch
+
+        num_joints = len(rotate_orders)
+        angles = np.asarray(rotations, dtype = np.float64).reshape(-1, num_joints, 3)
+        num_frames = angles.shape[0]
+
+        axis_matrices = THIS_T.from_angles_to_axis_matrices_numpy(angles)
+
+        # [R] in each joint's rotate order:
+        rotate_matrices = np.empty((num_frames, num_joints, 3, 3))
+        orders = np.asarray(rotate_orders, dtype = np.int64)
+        for order_index, order in enumerate(THIS_T.ROTATE_ORDERS):
+            joint_indices = np.nonzero(orders == order_index)[0]
+            if joint_indices.size == 0:
+                continue
+
+            m = axis_matrices[order[0]][:, joint_indices]
+            m = np.matmul(m, axis_matrices[order[1]][:, joint_indices])
+            m = np.matmul(m, axis_matrices[order[2]][:, joint_indices])
+            rotate_matrices[:, joint_indices] = m
+
+        # [RA] and [JO], both XYZ:
+        rotate_axis_matrices = THIS_T.from_angles_to_axis_matrices_numpy(
+            np.asarray(rotate_axes, dtype = np.float64).reshape(num_joints, 3)
+        )
+        rotate_axis_matrices = np.matmul(np.matmul(rotate_axis_matrices['x'], rotate_axis_matrices['y']), rotate_axis_matrices['z'])
+        joint_orient_matrices = THIS_T.from_angles_to_axis_matrices_numpy(
+            np.asarray(joint_orients, dtype = np.float64).reshape(num_joints, 3)
+        )
+        joint_orient_matrices = np.matmul(np.matmul(joint_orient_matrices['x'], joint_orient_matrices['y']), joint_orient_matrices['z'])
+
+        matrices = np.zeros((num_frames, num_joints, 4, 4))
+        matrices[..., :3, :3] = np.matmul(np.matmul(rotate_axis_matrices, rotate_matrices), joint_orient_matrices)
+        matrices[..., 3, 3] = 1.0
+
+        result = array.array('d')
+        result.frombytes(np.ascontiguousarray(matrices).tobytes())
+
+        return result
+
+    @staticmethod
+    def from_angle_to_axis_matrix_python(
+        axis,
+        angle
+    ):
+        # \param[in] axis:  'x', 'y' or 'z'.
+        # \return the 3x3 rotation by angle(radians) about axis, as a list of 3 rows.
+        c = math.cos(angle)
+        s = math.sin(angle)
+
+        if(axis == 'x'):
+            result = [[1.0, 0.0, 0.0], [0.0, c, s], [0.0, -s, c]]
+        elif(axis == 'y'):
+            result = [[c, 0.0, -s], [0.0, 1.0, 0.0], [s, 0.0, c]]
+        else:
+            result = [[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]]
+
+        return result
+
+    @staticmethod
+    def multiply_3x3_python(
+        a,
+        b
+    ):
+        # \return a * b, for 3x3 matrices as lists of 3 rows:
+        result = [
+            [a[ii][0] * b[0][jj] + a[ii][1] * b[1][jj] + a[ii][2] * b[2][jj] for jj in range(0, 3)]
+            for ii in range(0, 3)
+        ]
+
+        return result
+
+    @staticmethod
+    def from_angles_to_matrix_python(
+        angles,
+        offset,
+        order
+    ):
+        # \param[in] angles:  a sequence of euler angles in radians, whose (x, y, z) start at offset.
+        # \param[in] order:  one of ROTATE_ORDERS.
+        # \return the 3x3 rotation, as a list of 3 rows.
+        THIS_T = local_rotation_batch
+
+        result = None
+        for axis in order:
+            m = THIS_T.from_angle_to_axis_matrix_python(
+                axis,
+                angles[offset + 'xyz'.index(axis)]
+            )
+            if result is None:
+                result = m
+            else:
+                result = THIS_T.multiply_3x3_python(result, m)
+
+        return result
+
+    @staticmethod
+    def calculate_python(
+        rotations,
+        rotate_orders,
+        rotate_axes,
+        joint_orients
+    ):
+        THIS_T = local_rotation_batch
+
+        num_joints = len(rotate_orders)
+        num_frames = len(rotations) // (3 * num_joints) if num_joints > 0 else 0
+
+        orders = [THIS_T.ROTATE_ORDERS[x] for x in rotate_orders]
+        rotate_axis_matrices = [
+            THIS_T.from_angles_to_matrix_python(rotate_axes, 3 * jj, 'xyz')
+            for jj in range(0, num_joints)
+        ]
+        joint_orient_matrices = [
+            THIS_T.from_angles_to_matrix_python(joint_orients, 3 * jj, 'xyz')
+            for jj in range(0, num_joints)
+        ]
+
+        result = array.array('d', [0.0]) * (THIS_T.MATRIX_SIZE * num_frames * num_joints)
+        offset = 0
+        for ff in range(0, num_frames):
+            for jj in range(0, num_joints):
+                m = THIS_T.from_angles_to_matrix_python(
+                    rotations,
+                    3 * (ff * num_joints + jj),
+                    orders[jj]
+                )
+                m = THIS_T.multiply_3x3_python(rotate_axis_matrices[jj], m)
+                m = THIS_T.multiply_3x3_python(m, joint_orient_matrices[jj])
+
+                for ii in range(0, 3):
+                    result[offset + 4 * ii:offset + 4 * ii + 3] = array.array('d', m[ii])
+                result[offset + 15] = 1.0
+                offset += THIS_T.MATRIX_SIZE
+
+        return result
@@ -1,8 +1,10 @@
+import array
 import enum
-import logging
 import math
-import maya.OpenMaya as oM
+import sys
 
+import lib_mde_matrix_backend as mbackend
+import mde_trace as mtrace
 import mde_utilities as utils
 
 @enum.unique
@@ -17,13 +19,13 @@ def set_cell_float(
     row, 
     column
 ):
-    # for setting the [row][column] element of MMatrix
-    # https:#groups.google.com/g/python_inside_maya/c/Gou02IHsYKA
-    #oM.MScriptUtil.setDoubleArray( 
-    oM.MScriptUtil.setFloatArray( 
-        matrix[row], 
-        column, 
-        value 
+    # for setting the [row][column] element of XFORM_MATRIX_T
+    # (see lib_mde_matrix_backend.py for how that's done for MMatrix):
+    mbackend.set_cell_float(
+        matrix,
+        value,
+        row,
+        column
     )
 
 def set_all_cells_float(
@@ -41,13 +43,13 @@ def set_cell(
     row, 
     column
 ):
-    # for setting the [row][column] element of MMatrix
-    # https:#groups.google.com/g/python_inside_maya/c/Gou02IHsYKA
-    #oM.MScriptUtil.setDoubleArray( 
-    oM.MScriptUtil.setDoubleArray( 
-        matrix[row], 
-        column, 
-        value 
+    # for setting the [row][column] element of XFORM_MATRIX_T
+    # (see lib_mde_matrix_backend.py for how that's done for MMatrix):
+    mbackend.set_cell(
+        matrix,
+        value,
+        row,
+        column
     )
 
 def set_all_cells(
@@ -146,14 +148,294 @@ def from_matrix_to_quaternion(mat):
     return q
 
 
+# how far from orthonormal a matrix's 3x3 block can be for
+# invert_matrix_values() to treat it as a rigid transform:
+RIGID_TOL = 1.0e-9
+
+def is_rigid_matrix_values(
+    matrix_values,
+    offset,
+    tol = RIGID_TOL
+):
+    # \return True if the row-major 4x4 matrix at 
+    # matrix_values[offset:offset + 16] is a rigid transform, ie:
+    # its 3x3 block is orthonormal(no scale or shear) and its last column
+    # is (0, 0, 0, 1), both within tol.
+    m = matrix_values
+    if (abs(m[offset + 3]) > tol) or (abs(m[offset + 7]) > tol) or (abs(m[offset + 11]) > tol) or (abs(m[offset + 15] - 1.0) > tol):
+        return False
+    
+    for ii in range(0, 3):
+        row_ii = offset + 4 * ii
+        for jj in range(ii, 3):
+            row_jj = offset + 4 * jj
+            dot = m[row_ii] * m[row_jj] + m[row_ii + 1] * m[row_jj + 1] + m[row_ii + 2] * m[row_jj + 2]
+            if ii == jj:
+                dot -= 1.0
+            if abs(dot) > tol:
+                return False
+    
+    return True
+
+
+def invert_matrix_values(
+    matrix_values,
+    offset,
+    result,
+    result_offset
+):
+    # Write the inverse of the row-major 4x4 matrix at
+    # matrix_values[offset:offset + 16] to 
+    # result[result_offset:result_offset + 16].
+    # Rigid transforms(see is_rigid_matrix_values()), ie:
+    #     [R 0]
+    #     [t 1]
+    # with orthonormal R, are inverted cheaply:
+    #     [R^T        0]
+    #     [-t * R^T   1]
+    # anything else goes through the backend's full inverse().
+    # \return True if the rigid shortcut was used, False otherwise.
+    m = matrix_values
+    if not is_rigid_matrix_values(m, offset):
+        inverse = mbackend.matrix_from_values(m, offset).inverse()
+        mbackend.matrix_to_values(inverse, result, result_offset)
+        return False
+    
+    tx = m[offset + 12]
+    ty = m[offset + 13]
+    tz = m[offset + 14]
+    for ii in range(0, 3):
+        # column ii of the inverse's 3x3 block is row ii of R:
+        row = offset + 4 * ii
+        r0 = m[row]
+        r1 = m[row + 1]
+        r2 = m[row + 2]
+        result[result_offset + ii] = r0
+        result[result_offset + 4 + ii] = r1
+        result[result_offset + 8 + ii] = r2
+        result[result_offset + 12 + ii] = -(tx * r0 + ty * r1 + tz * r2)
+    
+    result[result_offset + 3] = 0.0
+    result[result_offset + 7] = 0.0
+    result[result_offset + 11] = 0.0
+    result[result_offset + 15] = 1.0
+    
+    return True
+
+
+def multiply_matrix_values(
+    a_values,
+    a_offset,
+    b_values,
+    b_offset,
+    result,
+    result_offset
+):
+    # result = a * b, for row-major 4x4 matrices stored as 16 values 
+    # at the given offsets.  result must not overlap a or b.
+    a = a_values
+    b = b_values
+    for ii in range(0, 4):
+        row = a_offset + 4 * ii
+        a0 = a[row]
+        a1 = a[row + 1]
+        a2 = a[row + 2]
+        a3 = a[row + 3]
+        result_row = result_offset + 4 * ii
+        for jj in range(0, 4):
+            column = b_offset + jj
+            result[result_row + jj] = a0 * b[column] + a1 * b[column + 4] + a2 * b[column + 8] + a3 * b[column + 12]
+
+
+def from_matrices_to_SMPL_weights(
+    matrix_values,
+    matrix_offsets,
+    combined_scales,
+    tol,
+    weights,
+    weights_offsets
+):
+    # Batched, allocation-free version of what joint_io.calculate_SMPL()
+    # does for one joint with get_bs_weights_source(), get_row(), etc.:
+    # for each kk:
+    # *take the 3x3 rotation block of the row-major 4x4 matrix at 
+    #  matrix_values[matrix_offsets[kk]:matrix_offsets[kk] + 16], transposed,
+    #  minus the identity(see joint_io.get_bs_weights_source()).
+    # *write it, row by row, times combined_scales[kk] to 
+    #  weights[weights_offsets[kk]:weights_offsets[kk] + 9].
+    #  If abs(combined_scales[kk]) < tol:  write zeros instead.
+    # The parameters are the same as for from_matrices_to_STAR_weights().
+    # \return an int:  0:  fail, 1:  success
+    stat = 1
+    
+    for kk in range(0, len(matrix_offsets)):
+        combined_scale = combined_scales[kk]
+        weights_offset = weights_offsets[kk]
+        
+        if abs(combined_scale) < tol:
+            for ii in range(weights_offset, weights_offset + 9):
+                weights[ii] = 0.0
+            continue
+        
+        offset = matrix_offsets[kk]
+        # row ii of the transposed block is column ii of the matrix:
+        weights[weights_offset] = combined_scale * (matrix_values[offset] - 1.0)
+        weights[weights_offset + 1] = combined_scale * matrix_values[offset + 4]
+        weights[weights_offset + 2] = combined_scale * matrix_values[offset + 8]
+        weights[weights_offset + 3] = combined_scale * matrix_values[offset + 1]
+        weights[weights_offset + 4] = combined_scale * (matrix_values[offset + 5] - 1.0)
+        weights[weights_offset + 5] = combined_scale * matrix_values[offset + 9]
+        weights[weights_offset + 6] = combined_scale * matrix_values[offset + 2]
+        weights[weights_offset + 7] = combined_scale * matrix_values[offset + 6]
+        weights[weights_offset + 8] = combined_scale * (matrix_values[offset + 10] - 1.0)
+    
+    return stat
+
+
+def from_matrices_to_STAR_weights(
+    matrix_values,
+    matrix_offsets,
+    combined_scales,
+    tol,
+    weights,
+    weights_offsets
+):
+    # Batched version of what joint_io.calculate_STAR() does for one
+    # joint with from_matrix_to_quaternion(), QUAT_T.normalizeIt(), etc.,
+    # without building any matrix or quaternion objects:
+    # for each kk:
+    # *take the 3x3 rotation block of the row-major 4x4 matrix at 
+    #  matrix_values[matrix_offsets[kk]:matrix_offsets[kk] + 16], transposed
+    #  (see joint_io.get_bs_weights_source(), do_transpose = True).
+    #  If abs(combined_scales[kk]) < tol:  use an all-zero block instead.
+    # *convert it to a quaternion with Shoemake's algorithm(both the 
+    #  trace-positive and the diagonal-pivot branches of 
+    #  from_matrix_to_quaternion()), normalize it, and make w positive.
+    # *write the STAR weights:
+    #      combined_scales[kk] * (x, y, z, w - 1.0)
+    #  to weights[weights_offsets[kk]:weights_offsets[kk] + 4].
+    # \param[in] matrix_values:  flat buffer of row-major 4x4 matrices(eg poseblends_driver_data.matrix_buffer).
+    # \param[in] matrix_offsets:  the offsets into matrix_values of the matrices to convert.
+    # \param[in] combined_scales:  per-matrix scale * envelope.
+    # \param[in] tol:  matrices whose combined scale is smaller than this are treated as all-zero.
+    # \param[out] weights:  flat buffer to write the results to(eg poseblends_driver_data.weights_buffer).
+    # \param[in] weights_offsets:  the offsets into weights to write the results of each matrix to.
+    # \return an int:  0:  fail, 1:  success
+    stat = 1
+    
+    sqrt = math.sqrt
+    
+    for kk in range(0, len(matrix_offsets)):
+        combined_scale = combined_scales[kk]
+        
+        # aij is the [i][j] element of the transposed matrix:
+        if abs(combined_scale) < tol:
+            a00 = a01 = a02 = a10 = a11 = a12 = a20 = a21 = a22 = 0.0
+        else:
+            offset = matrix_offsets[kk]
+            a00 = matrix_values[offset]
+            a10 = matrix_values[offset + 1]
+            a20 = matrix_values[offset + 2]
+            a01 = matrix_values[offset + 4]
+            a11 = matrix_values[offset + 5]
+            a21 = matrix_values[offset + 6]
+            a02 = matrix_values[offset + 8]
+            a12 = matrix_values[offset + 9]
+            a22 = matrix_values[offset + 10]
+        
+        t = a00 + a11 + a22
+        if (t > 0):
+            t = sqrt(t + 1.0)
+            qw = 0.5 * t
+            t = 0.5 / t
+            qx = (a21 - a12) * t
+            qy = (a02 - a20) * t
+            qz = (a10 - a01) * t
+        elif (a11 > a00 and a22 <= a11):
+            # pivot on y(ii = 1, jj = 2, kk = 0):
+            t = sqrt(a11 - a22 - a00 + 1.0)
+            qy = 0.5 * t
+            t = 0.5 / t
+            qw = (a02 - a20) * t
+            qz = (a21 + a12) * t
+            qx = (a01 + a10) * t
+        elif (a22 > a00 and a22 > a11):
+            # pivot on z(ii = 2, jj = 0, kk = 1):
+            t = sqrt(a22 - a00 - a11 + 1.0)
+            qz = 0.5 * t
+            t = 0.5 / t
+            qw = (a10 - a01) * t
+            qx = (a02 + a20) * t
+            qy = (a12 + a21) * t
+        else:
+            # pivot on x(ii = 0, jj = 1, kk = 2):
+            t = sqrt(a00 - a11 - a22 + 1.0)
+            qx = 0.5 * t
+            t = 0.5 / t
+            qw = (a21 - a12) * t
+            qy = (a10 + a01) * t
+            qz = (a20 + a02) * t
+        
+        # normalize, and make sure w is always positive
+        # (for unit quaternions:  -q and q are the same rotation):
+        norm = sqrt(qx * qx + qy * qy + qz * qz + qw * qw)
+        if qw < 0.0:
+            norm = -norm
+        norm = combined_scale / norm
+        
+        weights_offset = weights_offsets[kk]
+        weights[weights_offset] = norm * qx
+        weights[weights_offset + 1] = norm * qy
+        weights[weights_offset + 2] = norm * qz
+        weights[weights_offset + 3] = norm * qw - combined_scale
+    
+    return stat
+
+
 class joint_io_data(object):
-    #XFORM_MATRIX_T = oM.MFloatMatrix
-    XFORM_MATRIX_T = oM.MMatrix
+    # XFORM_MATRIX_T:  MMatrix when running inside Maya, otherwise
+    # the pure-Python/NumPy one from lib_mde_matrix_backend:
+    XFORM_MATRIX_T = mbackend.XFORM_MATRIX_T
     JOINT_MATRIX_MODE_T = joint_matrix_mode_t
     
+    # joint_io_data does not own its matrices and weights.  They live in
+    # flat array('d') buffers shared by all the joints of a 
+    # poseblends_driver_data(see poseblends_driver_data.init_joints_data()).
+    # Per joint, the matrix buffer holds NUM_MATRIX_SLOTS row-major 
+    # 4x4 matrices, and the weights buffer holds MAX_NUM_WEIGHTS doubles:
+    MATRIX_SIZE = 16
+    LOCAL_MATRIX_SLOT = 0
+    WORLD_MATRIX_SLOT = 1
+    WORLD_PARENT_MATRIX_SLOT = 2
+    WORLD_PARENT_INVERSE_MATRIX_SLOT = 3
+    NUM_MATRIX_SLOTS = 4
+    JOINT_MATRICES_SIZE = NUM_MATRIX_SLOTS * MATRIX_SIZE
+    MAX_NUM_WEIGHTS = 9 # SMPL:  9, STAR:  4
+    
+    __slots__ = (
+        'scale',
+        'envelope',
+        'tol',
+        'matrix_mode',
+        'matrix_buffer',
+        'matrix_offset',
+        'weights_buffer',
+        'weights_offset',
+        'blendshape_weights',
+        'is_dirty',
+        'solved_envelope',
+        'solved_matrix_mode',
+    )
+    
+    # scratch storage for update_matrix_slot():
+    scratch_values = array.array('d', [0.0]) * MATRIX_SIZE
+    
     def __init__(
         self, 
-        matrix_mode = joint_matrix_mode_t.LOCAL
+        matrix_mode = joint_matrix_mode_t.LOCAL,
+        matrix_buffer = None,
+        weights_buffer = None,
+        index = 0
     ):
         THIS_T = joint_io_data
         
@@ -163,35 +445,215 @@ class joint_io_data(object):
         self.tol = 1.0e-5
         self.matrix_mode = matrix_mode
         
-        MATRIX_T = THIS_T.XFORM_MATRIX_T
-        self.matrix = MATRIX_T()
-        self.world_matrix = MATRIX_T()
-        self.world_parent_matrix = MATRIX_T()
-        self.world_parent_inverse_matrix = MATRIX_T()
+        if matrix_buffer is None:
+            # stand-alone joint_io_data:  give it its own storage:
+            matrix_buffer = THIS_T.allocate_matrix_buffer(1)
+            weights_buffer = THIS_T.allocate_weights_buffer(1)
+            index = 0
         
-        self.matrix.setToIdentity()
-        self.world_matrix.setToIdentity()
-        self.world_parent_matrix.setToIdentity()
-        self.world_parent_inverse_matrix.setToIdentity()
+        # matrix, world_matrix, world_parent_matrix and 
+        # world_parent_inverse_matrix(see the properties below) are
+        # stored at matrix_buffer[matrix_offset:matrix_offset + JOINT_MATRICES_SIZE]:
+        self.matrix_buffer = matrix_buffer
+        self.matrix_offset = index * THIS_T.JOINT_MATRICES_SIZE
         
+        # OUTPUTS:
+        # blendshape_weights is a view on 
+        # weights_buffer[weights_offset:weights_offset + MAX_NUM_WEIGHTS],
+        # sized by resize_weights():
+        self.weights_buffer = weights_buffer
+        self.weights_offset = index * THIS_T.MAX_NUM_WEIGHTS
+        self.blendshape_weights = memoryview(weights_buffer)[self.weights_offset:self.weights_offset]
         
+        # DIRTY TRACKING:
+        # is_dirty:  True if any input matrix changed since the last solve.
+        # solved_envelope/solved_matrix_mode:  the(scaled) envelope and
+        # matrix_mode the current blendshape_weights were solved with.
+        # See needs_calculate():
+        self.is_dirty = True
+        self.solved_envelope = None
+        self.solved_matrix_mode = None
+    
+    @staticmethod
+    def allocate_matrix_buffer(
+        num_joints
+    ):
+        # all the matrices of num_joints joints, set to the identity:
+        THIS_T = joint_io_data
         
-        # OUTPUTS:
-        self.blendshape_weights = list()
+        identity = array.array('d', mbackend.py_matrix.IDENTITY_VALUES)
+        result = identity * (num_joints * THIS_T.NUM_MATRIX_SLOTS)
         
-    def resize_weights(self, new_size):
-        utils.resize(
-            self.blendshape_weights, 
-            new_size
+        return result
+    
+    @staticmethod
+    def allocate_weights_buffer(
+        num_joints
+    ):
+        THIS_T = joint_io_data
+        
+        result = array.array('d', [0.0]) * (num_joints * THIS_T.MAX_NUM_WEIGHTS)
+        
+        return result
+    
+    def get_matrix_slot_offset(
+        self,
+        slot
+    ):
+        return self.matrix_offset + slot * joint_io_data.MATRIX_SIZE
+    
+    @staticmethod
+    def get_input_matrix_slots(
+        matrix_mode
+    ):
+        # \return the slots a joint in matrix_mode solves from.  The
+        # other slots hold values derived from those by the last 
+        # set_local_matrix_based_on_matrix_mode()(or nothing at all):
+        THIS_T = joint_io_data
+        MATRIX_MODE_T = THIS_T.JOINT_MATRIX_MODE_T
+        
+        if matrix_mode == MATRIX_MODE_T.WORLD:
+            return (THIS_T.WORLD_MATRIX_SLOT, THIS_T.WORLD_PARENT_MATRIX_SLOT)
+        if matrix_mode == MATRIX_MODE_T.WORLDwInv:
+            return (THIS_T.WORLD_MATRIX_SLOT, THIS_T.WORLD_PARENT_INVERSE_MATRIX_SLOT)
+        
+        return (THIS_T.LOCAL_MATRIX_SLOT,)
+    
+    def get_matrix_slot(
+        self,
+        slot
+    ):
+        return mbackend.matrix_from_values(
+            self.matrix_buffer,
+            self.get_matrix_slot_offset(slot)
+        )
+    
+    def set_matrix_slot(
+        self,
+        slot,
+        matrix
+    ):
+        mbackend.matrix_to_values(
+            matrix,
+            self.matrix_buffer,
+            self.get_matrix_slot_offset(slot)
         )
+        self.is_dirty = True
+    
+    def update_matrix_slot(
+        self,
+        slot,
+        matrix
+    ):
+        # Like set_matrix_slot(), but only writes(and marks this joint
+        # dirty) if matrix differs from the stored value by more than tol.
+        # \return True if the stored value was changed, False otherwise.
+        THIS_T = joint_io_data
         
-    def set_local_matrix_based_on_matrix_mode(
+        scratch_values = THIS_T.scratch_values
+        mbackend.matrix_to_values(
+            matrix,
+            scratch_values,
+            0
+        )
+        
+        result = self.update_matrix_slot_values(
+            slot,
+            scratch_values
+        )
+        
+        return result
+    
+    def update_matrix_slot_values(
+        self,
+        slot,
+        values
+    ):
+        # update_matrix_slot() for a matrix that's already been flattened
+        # into 16 row-major values(eg read straight off a Maya input 
+        # attribute, see node_data.py).
+        # \return True if the stored value was changed, False otherwise.
+        THIS_T = joint_io_data
+        
+        matrix_buffer = self.matrix_buffer
+        offset = self.get_matrix_slot_offset(slot)
+        tol = self.tol
+        for ii in range(0, THIS_T.MATRIX_SIZE):
+            if abs(values[ii] - matrix_buffer[offset + ii]) > tol:
+                break
+        else:
+            return False
+        
+        matrix_buffer[offset:offset + THIS_T.MATRIX_SIZE] = values
+        self.is_dirty = True
+        
+        return True
+    
+    def needs_calculate(
         self
     ):
+        # \return False if the current blendshape_weights are still valid, ie:
+        # *none of the input matrices changed(by more than tol) since they were solved, and
+        # *they were solved with the same matrix_mode, and
+        # *they were solved with the same envelope(within tol).
+        if self.is_dirty:
+            return True
+        
+        if self.matrix_mode != self.solved_matrix_mode:
+            return True
+        
+        if abs(self.envelope - self.solved_envelope) > self.tol:
+            return True
+        
+        return False
+    
+    def set_calculated(
+        self
+    ):
+        # remember what the current blendshape_weights were solved with:
+        self.is_dirty = False
+        self.solved_envelope = self.envelope
+        self.solved_matrix_mode = self.matrix_mode
+    
+    matrix = property(
+        lambda self: self.get_matrix_slot(joint_io_data.LOCAL_MATRIX_SLOT),
+        lambda self, value: self.set_matrix_slot(joint_io_data.LOCAL_MATRIX_SLOT, value)
+    )
+    world_matrix = property(
+        lambda self: self.get_matrix_slot(joint_io_data.WORLD_MATRIX_SLOT),
+        lambda self, value: self.set_matrix_slot(joint_io_data.WORLD_MATRIX_SLOT, value)
+    )
+    world_parent_matrix = property(
+        lambda self: self.get_matrix_slot(joint_io_data.WORLD_PARENT_MATRIX_SLOT),
+        lambda self, value: self.set_matrix_slot(joint_io_data.WORLD_PARENT_MATRIX_SLOT, value)
+    )
+    world_parent_inverse_matrix = property(
+        lambda self: self.get_matrix_slot(joint_io_data.WORLD_PARENT_INVERSE_MATRIX_SLOT),
+        lambda self, value: self.set_matrix_slot(joint_io_data.WORLD_PARENT_INVERSE_MATRIX_SLOT, value)
+    )
+        
+    def resize_weights(self, new_size):
+        # the storage is preallocated for MAX_NUM_WEIGHTS, so this only
+        # changes the size of the blendshape_weights view:
+        if len(self.blendshape_weights) == new_size:
+            return
+        
+        self.blendshape_weights = memoryview(self.weights_buffer)[
+            self.weights_offset:self.weights_offset + new_size
+        ]
+        
+    def set_local_matrix_based_on_matrix_mode(
+        self,
+        workspace = None
+    ):
+        # \param[in] workspace:  a joint_io_workspace whose parent 
+        # inverses are shared by the joints with the same world parent
+        # matrix, or None.
         stat = 1
         
         THIS_T = joint_io_data
         MATRIX_MODE_T = THIS_T.JOINT_MATRIX_MODE_T
+        MATRIX_SIZE = THIS_T.MATRIX_SIZE
         
         if(self.matrix_mode == MATRIX_MODE_T.LOCAL):
             # no op:  we assume the user has set LOCAL to the value
@@ -200,8 +662,22 @@ class joint_io_data(object):
         else:
             # we are going to calculate local matrix based on world
             # matrix inputs:
+            matrix_buffer = self.matrix_buffer
+            inverse_offset = self.get_matrix_slot_offset(THIS_T.WORLD_PARENT_INVERSE_MATRIX_SLOT)
             if(self.matrix_mode == MATRIX_MODE_T.WORLD):
-                self.world_parent_inverse_matrix = self.world_parent_matrix.inverse()
+                parent_offset = self.get_matrix_slot_offset(THIS_T.WORLD_PARENT_MATRIX_SLOT)
+                if workspace is None:
+                    invert_matrix_values(
+                        matrix_buffer,
+                        parent_offset,
+                        matrix_buffer,
+                        inverse_offset
+                    )
+                else:
+                    matrix_buffer[inverse_offset:inverse_offset + MATRIX_SIZE] = workspace.get_parent_inverse(
+                        matrix_buffer,
+                        parent_offset
+                    )
             
             # if the evaluation is here, it means:
             # *self.matrix_mode == WORLD, and we've just calculated the
@@ -210,8 +686,16 @@ class joint_io_data(object):
             #         self.world_parent_inverse_matrix was set by the user to an
             #         appropriate value before calling this procedure.
             # Either way:  we need to calculate the local matrix given the
-            # world matrix and it's parent's inverse matrix in world space:
-            self.matrix = self.world_matrix * self.world_parent_inverse_matrix
+            # world matrix and it's parent's inverse matrix in world space.
+            # Like the slot properties, but straight on the buffer:
+            multiply_matrix_values(
+                matrix_buffer,
+                self.get_matrix_slot_offset(THIS_T.WORLD_MATRIX_SLOT),
+                matrix_buffer,
+                inverse_offset,
+                matrix_buffer,
+                self.get_matrix_slot_offset(THIS_T.LOCAL_MATRIX_SLOT)
+            )
             
         return stat
     
@@ -222,6 +706,104 @@ class joint_io_data(object):
         self.envelope *= scale
         
 
+class joint_io_workspace(object):
+    # Scratch lists used by joint_io.calculate_SMPL_batch() and
+    # joint_io.calculate_STAR_batch().  One of these is kept by each
+    # poseblends_driver_data and reused for every joint on every 
+    # calculate, so the batched solves don't allocate per joint:
+    #
+    # It also memoizes the inverses of the WORLD mode joints' world parent
+    # matrices(see get_parent_inverse()), keyed on the parent matrix 
+    # values, so sibling joints share one inverse and an unchanged 
+    # parent isn't inverted again on the next calculate:
+    __slots__ = (
+        'matrix_offsets',
+        'combined_scales',
+        'weights_offsets',
+        'parent_inverses',
+        'previous_parent_inverses',
+    )
+    
+    def __init__(
+        self
+    ):
+        self.matrix_offsets = list()
+        self.combined_scales = list()
+        self.weights_offsets = list()
+        
+        # parent matrix values(as bytes) -> array('d') of its inverse.
+        # parent_inverses:  the ones used by the current calculate.
+        # previous_parent_inverses:  the ones used by the one before:
+        self.parent_inverses = dict()
+        self.previous_parent_inverses = dict()
+    
+    def resize(
+        self,
+        new_size
+    ):
+        utils.resize(self.matrix_offsets, new_size)
+        utils.resize(self.combined_scales, new_size)
+        utils.resize(self.weights_offsets, new_size)
+    
+    def begin_parent_inverses(
+        self
+    ):
+        # Start a new calculate:  the inverses the last one used are kept
+        # for reuse, any older ones are dropped, so the memo never holds
+        # much more than one inverse per distinct parent:
+        self.previous_parent_inverses = self.parent_inverses
+        self.parent_inverses = dict()
+    
+    def get_parent_inverse(
+        self,
+        matrix_values,
+        offset
+    ):
+        # \return an array('d') with the 16 values of the inverse of the
+        # row-major 4x4 matrix at matrix_values[offset:offset + 16].
+        # Computed(see invert_matrix_values()) only if neither this nor
+        # the previous calculate already did so for the same values.
+        key = matrix_values[offset:offset + joint_io_data.MATRIX_SIZE].tobytes()
+        
+        result = self.parent_inverses.get(key)
+        if result is not None:
+            if mtrace.PROFILE:
+                mtrace.add_count('parent_inverses_shared')
+            return result
+        
+        result = self.previous_parent_inverses.get(key)
+        if result is None:
+            result = array.array('d', [0.0]) * joint_io_data.MATRIX_SIZE
+            is_rigid = invert_matrix_values(
+                matrix_values,
+                offset,
+                result,
+                0
+            )
+            
+            if mtrace.PROFILE:
+                mtrace.add_count('parent_inverses_rigid' if is_rigid else 'parent_inverses_full')
+        elif mtrace.PROFILE:
+            mtrace.add_count('parent_inverses_reused')
+        
+        self.parent_inverses[key] = result
+        
+        return result
+    
+    def memory_usage(
+        self
+    ):
+        # \return the approximate number of bytes used by the memoized
+        # parent inverses:
+        result = 0
+        for parent_inverses in (self.parent_inverses, self.previous_parent_inverses):
+            result += sys.getsizeof(parent_inverses)
+            for key, value in parent_inverses.items():
+                result += sys.getsizeof(key) + sys.getsizeof(value)
+        
+        return result
+
+
 class joint_io(object):
     DATA_T = joint_io_data
     
@@ -232,7 +814,7 @@ class joint_io(object):
     # criteria is not to use Numpy or any Python which would require
     # end user action to obtain/setup to work with Maya.
     XFORM_MATRIX_T = DATA_T.XFORM_MATRIX_T
-    QUAT_T = oM.MQuaternion
+    QUAT_T = mbackend.QUAT_T
     
     @staticmethod
     def get_bs_weights_source (
@@ -286,7 +868,8 @@ class joint_io(object):
                 identity.setToIdentity()
                 bs_weights_source = bs_weights_source - identity
         
-        logging.debug('joint_io.get_bs_weights_source():  bs_weights_source(at the end):  {0}'.format(bs_weights_source))
+        if mtrace.TRACE:
+            mtrace.debug('joint_io.get_bs_weights_source():  bs_weights_source(at the end):  {0}', bs_weights_source)
         result[0] = bs_weights_source
         
         return stat
@@ -322,13 +905,15 @@ class joint_io(object):
             return stat
             
         bs_weights_source = gbws_result[0]
-        logging.debug('joint_io.calculate_SMPL():  bs_weights_source:  {0}'.format([bs_weights_source(ii, jj) for ii in range(0, 4) for jj in range(0, 4)]))
+        if mtrace.TRACE:
+            mtrace.debug('joint_io.calculate_SMPL():  bs_weights_source:  {0}', [bs_weights_source(ii, jj) for ii in range(0, 4) for jj in range(0, 4)])
         scale = arg_data.scale
         envelope = arg_data.envelope
         
         combined_scale = scale * envelope
         
-        logging.debug('joint_io.calculate_SMPL():  combined_scale:  {0}'.format(combined_scale))
+        if mtrace.TRACE:
+            mtrace.debug('joint_io.calculate_SMPL():  combined_scale:  {0}', combined_scale)
         num_bs_weights_rows = 3
         num_bs_weights_cols = 3
         num_bs_weights = num_bs_weights_rows * num_bs_weights_cols # should be 9
@@ -345,10 +930,12 @@ class joint_io(object):
                 ii
             )
             
-            logging.debug('joint_io.calculate_SMPL():  current_source_row:  {0}'.format(current_source_row))
+            if mtrace.TRACE:
+                mtrace.debug('joint_io.calculate_SMPL():  current_source_row:  {0}', current_source_row)
             for jj in range(0, num_bs_weights_cols):
                 result[bs_weights_index] = combined_scale * current_source_row[jj]
-                logging.debug('joint_io.calculate_SMPL():  result[bs_weights_index({0})]:  {1}'.format(bs_weights_index, result[bs_weights_index]))
+                if mtrace.TRACE:
+                    mtrace.debug('joint_io.calculate_SMPL():  result[bs_weights_index({0})]:  {1}', bs_weights_index, result[bs_weights_index])
                 bs_weights_index += 1
         
         return stat
@@ -396,8 +983,9 @@ class joint_io(object):
             # (Slim advises:  for unit quaternions:  -q and q are the same rotation):
             bs_quat = -1.0 * bs_quat
         
-        logging.debug('joint_io.calculate_STAR():  bs_weights_source:  {0}'.format([bs_weights_source(ii, jj) for ii in range(0, 4) for jj in range(0, 4)]))
-        logging.debug('joint_io.calculate_STAR():  bs_quat:  {0}'.format([bs_quat[ii] for ii in range(0, 4)]))
+        if mtrace.TRACE:
+            mtrace.debug('joint_io.calculate_STAR():  bs_weights_source:  {0}', [bs_weights_source(ii, jj) for ii in range(0, 4) for jj in range(0, 4)])
+            mtrace.debug('joint_io.calculate_STAR():  bs_quat:  {0}', [bs_quat[ii] for ii in range(0, 4)])
         
         num_bs_weights = 4 # same as number of quaternion elements(ie x, y, z, w)
         
@@ -412,6 +1000,128 @@ class joint_io(object):
         result[3] = combined_scale * (bs_quat.w - 1.0)
         
         return stat
+    
+    @staticmethod
+    def fill_workspace (
+        joints_data,
+        num_bs_weights,
+        workspace
+    ):
+        # Get joints_data ready for a from_matrices_to_*_weights() call:
+        # *make sure each joint's local matrix is up to date and its
+        #  blendshape_weights is sized num_bs_weights.
+        # *fill workspace with each joint's local matrix offset, combined
+        #  scale and weights offset.
+        stat = 1
+        
+        DATA_T = joint_io.DATA_T
+        LOCAL_MATRIX_SLOT = DATA_T.LOCAL_MATRIX_SLOT
+        
+        num_joints = len(joints_data)
+        workspace.resize(num_joints)
+        matrix_offsets = workspace.matrix_offsets
+        combined_scales = workspace.combined_scales
+        weights_offsets = workspace.weights_offsets
+        workspace.begin_parent_inverses()
+        
+        for ii in range(0, num_joints):
+            current_joint_data = joints_data[ii]
+            combined_scale = current_joint_data.scale * current_joint_data.envelope
+            if(abs(combined_scale) >= current_joint_data.tol):
+                # the local matrix is only needed for non-zero weights:
+                current_joint_data.set_local_matrix_based_on_matrix_mode(
+                    workspace
+                )
+            
+            current_joint_data.resize_weights(
+                num_bs_weights
+            )
+            
+            matrix_offsets[ii] = current_joint_data.get_matrix_slot_offset(LOCAL_MATRIX_SLOT)
+            combined_scales[ii] = combined_scale
+            weights_offsets[ii] = current_joint_data.weights_offset
+        
+        return stat
+    
+    @staticmethod
+    def calculate_SMPL_batch (
+        joints_data,
+        workspace = None
+    ):
+        # The same as calling calculate_SMPL() on each of joints_data,
+        # but the weights are written by from_matrices_to_SMPL_weights()
+        # straight from/to the joints' buffers, without building any
+        # intermediate matrices or row lists.
+        # It assumes all of joints_data share the same buffers(ie they
+        # are from the same poseblends_driver_data).
+        stat = 1
+        
+        num_joints = len(joints_data)
+        if num_joints == 0:
+            return stat
+        
+        if workspace is None:
+            workspace = joint_io_workspace()
+        
+        num_bs_weights = 9 # one for each element of the 3x3 rotation block
+        
+        joint_io.fill_workspace(
+            joints_data,
+            num_bs_weights,
+            workspace
+        )
+        
+        first_joint_data = joints_data[0]
+        stat = from_matrices_to_SMPL_weights(
+            first_joint_data.matrix_buffer,
+            workspace.matrix_offsets,
+            workspace.combined_scales,
+            first_joint_data.tol,
+            first_joint_data.weights_buffer,
+            workspace.weights_offsets
+        )
+        
+        return stat
+    
+    @staticmethod
+    def calculate_STAR_batch (
+        joints_data,
+        workspace = None
+    ):
+        # The same as calling calculate_STAR() on each of joints_data,
+        # but the matrix -> quaternion -> weights conversion is done for 
+        # all of them at once by from_matrices_to_STAR_weights(), 
+        # straight from/to the joints' buffers.
+        # It assumes all of joints_data share the same buffers(ie they
+        # are from the same poseblends_driver_data).
+        stat = 1
+        
+        num_joints = len(joints_data)
+        if num_joints == 0:
+            return stat
+        
+        if workspace is None:
+            workspace = joint_io_workspace()
+        
+        num_bs_weights = 4 # same as number of quaternion elements(ie x, y, z, w)
+        
+        joint_io.fill_workspace(
+            joints_data,
+            num_bs_weights,
+            workspace
+        )
+        
+        first_joint_data = joints_data[0]
+        stat = from_matrices_to_STAR_weights(
+            first_joint_data.matrix_buffer,
+            workspace.matrix_offsets,
+            workspace.combined_scales,
+            first_joint_data.tol,
+            first_joint_data.weights_buffer,
+            workspace.weights_offsets
+        )
+        
+        return stat
         
         
 class poseblends_driver_data(object):
@@ -422,37 +1132,140 @@ class poseblends_driver_data(object):
         kSMPL = 0
         kSTAR = 1
 
+    __slots__ = (
+        'scale',
+        'envelope',
+        'tol',
+        'model_type',
+        'joints_data',
+        'matrix_buffer',
+        'weights_buffer',
+        'solved_model_type',
+        'workspace',
+    )
+
     def __init__(
         self
     ):
         THIS_T = poseblends_driver_data
+        JOINT_IO_DATA_T = THIS_T.JOINT_IO_DATA_T
         
         self.scale = 1.0
         self.envelope = 1.0
         self.tol = 1.0e-5
         self.model_type = THIS_T.MODEL_T.kSMPL
+        
+        # struct-of-arrays storage:  one contiguous buffer for all the 
+        # joints' matrices and one for all the joints' output weights.
+        # joints_data[ii] is a (__slots__) joint_io_data which reads
+        # and writes joint ii's part of those buffers:
         self.joints_data = list()
+        self.matrix_buffer = JOINT_IO_DATA_T.allocate_matrix_buffer(0)
+        self.weights_buffer = JOINT_IO_DATA_T.allocate_weights_buffer(0)
+        
+        # the model_type the joints' blendshape_weights were solved with:
+        self.solved_model_type = None
+        
+        # scratch space shared by all the joints' batched solves:
+        self.workspace = joint_io_workspace()
         
     def init_joints_data(
         self,
         num_joints
     ):
+        # Size the storage for num_joints joints.
+        # Like utils.resize():  most calls to this, once the scene is
+        # loaded, will find the number of joints unchanged and do nothing.
+        # When it does change:  the buffers are reallocated once, at 
+        # their final size, keeping the values of the joints that remain.
         stat = 1
         
-        utils.resize(
-            self.joints_data, 
-            num_joints
-        )
+        num_existing_joints = len(self.joints_data)
+        if num_existing_joints == num_joints:
+            return stat
+        
+        THIS_T = poseblends_driver_data
+        JOINT_IO_DATA_T = THIS_T.JOINT_IO_DATA_T
+        
+        matrix_buffer = JOINT_IO_DATA_T.allocate_matrix_buffer(num_joints)
+        weights_buffer = JOINT_IO_DATA_T.allocate_weights_buffer(num_joints)
+        
+        num_kept_joints = min(num_existing_joints, num_joints)
+        num_kept_matrix_values = num_kept_joints * JOINT_IO_DATA_T.JOINT_MATRICES_SIZE
+        num_kept_weights_values = num_kept_joints * JOINT_IO_DATA_T.MAX_NUM_WEIGHTS
+        matrix_buffer[0:num_kept_matrix_values] = self.matrix_buffer[0:num_kept_matrix_values]
+        weights_buffer[0:num_kept_weights_values] = self.weights_buffer[0:num_kept_weights_values]
+        
+        joints_data = list()
+        for ii in range(0, num_joints):
+            current_joint_data = JOINT_IO_DATA_T(
+                matrix_buffer = matrix_buffer,
+                weights_buffer = weights_buffer,
+                index = ii
+            )
+            
+            if ii < num_kept_joints:
+                previous_joint_data = self.joints_data[ii]
+                current_joint_data.scale = previous_joint_data.scale
+                current_joint_data.envelope = previous_joint_data.envelope
+                current_joint_data.tol = previous_joint_data.tol
+                current_joint_data.matrix_mode = previous_joint_data.matrix_mode
+                current_joint_data.resize_weights(len(previous_joint_data.blendshape_weights))
+                current_joint_data.is_dirty = previous_joint_data.is_dirty
+                current_joint_data.solved_envelope = previous_joint_data.solved_envelope
+                current_joint_data.solved_matrix_mode = previous_joint_data.solved_matrix_mode
+            
+            joints_data.append(current_joint_data)
+        
+        self.joints_data = joints_data
+        self.matrix_buffer = matrix_buffer
+        self.weights_buffer = weights_buffer
         
         return stat
     
+    def set_all_dirty(
+        self
+    ):
+        # force every joint to be re-solved on the next calculate:
+        for current_joint_data in self.joints_data:
+            current_joint_data.is_dirty = True
+    
+    def memory_usage(
+        self
+    ):
+        # \return the approximate number of bytes used by this 
+        # poseblends_driver_data(the buffers, the per-joint objects and 
+        # the workspace's memoized parent inverses):
+        result = sys.getsizeof(self)
+        result += sys.getsizeof(self.matrix_buffer)
+        result += sys.getsizeof(self.weights_buffer)
+        result += self.workspace.memory_usage()
+        result += sys.getsizeof(self.joints_data)
+        for current_joint_data in self.joints_data:
+            result += sys.getsizeof(current_joint_data)
+            result += sys.getsizeof(current_joint_data.blendshape_weights)
+        
+        return result
+    
+    def get_num_weights(
+        self
+    ):
+        # the number of blendshape weights per joint for model_type:
+        # SMPL:  one per element of the 3x3 rotation block, STAR:  one 
+        # per quaternion element:
+        if self.model_type == poseblends_driver_data.MODEL_T.kSMPL:
+            return 9
+        
+        return 4
+    
     def is_SMPL(
         self
     ):
         THIS_T = poseblends_driver_data
         
-        logging.debug('poseblends_driver_data.is_SMPL:  self.model_type:  {0}'.format(self.model_type))
-        logging.debug('poseblends_driver_data.is_SMPL:   THIS_T.MODEL_T.kSMPL:  {0}'.format( THIS_T.MODEL_T.kSMPL))
+        if mtrace.TRACE:
+            mtrace.debug('poseblends_driver_data.is_SMPL:  self.model_type:  {0}', self.model_type)
+            mtrace.debug('poseblends_driver_data.is_SMPL:   THIS_T.MODEL_T.kSMPL:  {0}', THIS_T.MODEL_T.kSMPL)
         result = (self.model_type == THIS_T.MODEL_T.kSMPL)
         
         return result
@@ -462,8 +1275,9 @@ class poseblends_driver_data(object):
     ):
         THIS_T = poseblends_driver_data
         
-        logging.debug('poseblends_driver_data.is_SMPL:  self.model_type:  {0}'.format(self.model_type))
-        logging.debug('poseblends_driver_data.is_SMPL:   THIS_T.MODEL_T.kSTAR:  {0}'.format( THIS_T.MODEL_T.kSTAR))
+        if mtrace.TRACE:
+            mtrace.debug('poseblends_driver_data.is_SMPL:  self.model_type:  {0}', self.model_type)
+            mtrace.debug('poseblends_driver_data.is_SMPL:   THIS_T.MODEL_T.kSTAR:  {0}', THIS_T.MODEL_T.kSTAR)
         result = (self.model_type == THIS_T.MODEL_T.kSTAR)
         
         return result
@@ -486,8 +1300,9 @@ class poseblends_driver(object):
         
         current_joint_data = arg_data.joints_data[joint_index]
         
-        logging.debug('poseblends_driver.calculate_single:  arg_data.is_SMPL():  {0}'.format(arg_data.is_SMPL()))
-        logging.debug('poseblends_driver.calculate_single:  arg_data.is_STAR():  {0}'.format(arg_data.is_STAR()))
+        if mtrace.TRACE:
+            mtrace.debug('poseblends_driver.calculate_single:  arg_data.is_SMPL():  {0}', arg_data.is_SMPL())
+            mtrace.debug('poseblends_driver.calculate_single:  arg_data.is_STAR():  {0}', arg_data.is_STAR())
         if(arg_data.is_SMPL()):
             # use SMPL:
             ops.calculate_SMPL(
@@ -505,9 +1320,30 @@ class poseblends_driver(object):
     def calculate(
         arg_data
     ):
+        # calculate all the joints of arg_data:
+        stat = poseblends_driver.calculate_joints(
+            arg_data,
+            range(0, len(arg_data.joints_data))
+        )
+        
+        return stat
+    
+    @staticmethod
+    def calculate_joints(
+        arg_data,
+        joint_indices
+    ):
+        # Calculate only the joints of arg_data at joint_indices(eg just
+        # the one joint whose output was asked for).  The envelopes of 
+        # those joints are expected to have been(re)set to their 
+        # unscaled input values since the last calculate.
+        # \param[in,out] arg_data:  the poseblends_driver_data.
+        # \param[in] joint_indices:  the indices in arg_data.joints_data to calculate.
+        # \return an int:  0:  fail, 1:  success
         stat = 1
         
-        joints_data = arg_data.joints_data
+        all_joints_data = arg_data.joints_data
+        joints_data = [all_joints_data[ii] for ii in joint_indices]
         num_joints = len(joints_data)
         scale = arg_data.scale
         envelope = arg_data.envelope
@@ -516,16 +1352,40 @@ class poseblends_driver(object):
         # *global envelope and 
         # *global scale:
         combined_scale = scale * envelope
-        for ii in range(0, num_joints):
-            current_joint_data = arg_data.joints_data[ii]
+        for current_joint_data in joints_data:
             current_joint_data.scale_envelope(combined_scale)
+        
+        # switching between SMPL and STAR changes what every joint's
+        # weights mean, so nothing solved before can be reused:
+        if arg_data.model_type != arg_data.solved_model_type:
+            arg_data.set_all_dirty()
+            arg_data.solved_model_type = arg_data.model_type
             
-        # serial:
-        for ii in range(0, num_joints):
-            current_stat = poseblends_driver.calculate_single(
-                arg_data,
-                ii
+        # batched:  all the dirty joints' matrices are converted to 
+        # weights in one go(joints whose inputs haven't changed since 
+        # they were last solved keep their previous blendshape_weights).
+        # See calculate_single() for the one-joint-at-a-time version:
+        dirty_joints_data = [x for x in joints_data if x.needs_calculate()]
+        
+        ops = poseblends_driver.JOINT_IO_OPS_T
+        if(arg_data.is_SMPL()):
+            current_stat = ops.calculate_SMPL_batch(
+                dirty_joints_data,
+                arg_data.workspace
             )
+        else:
+            current_stat = ops.calculate_STAR_batch(
+                dirty_joints_data,
+                arg_data.workspace
+            )
+        
+        for current_joint_data in dirty_joints_data:
+            current_joint_data.set_calculated()
+        
+        if mtrace.PROFILE:
+            num_dirty_joints = len(dirty_joints_data)
+            mtrace.add_count('joints_solved', num_dirty_joints)
+            mtrace.add_count('joints_reused', num_joints - num_dirty_joints)
         
         return stat
         
@@ -0,0 +1,112 @@
+import csv
+import io
+
+import mde_trace as mtrace
+
+# mde_node_stats:
+# Per node timings and counters for mde_py_poseblends_driver.
+# Unlike the mde_trace.py profile timers(which add up every node in the
+# scene, and only while PROFILE is on), each node keeps its own
+# node_stats, always.  That's a handful of clock() calls per compute, so
+# in a scene with hundreds of drivers the expensive ones can be found:
+# see the outputStat* attributes and the mde_py_poseblends_stats command
+# in mde_py_poseblends_driver.py.
+#
+# It has no Maya dependencies, like mde_result_cache.py.
+
+class node_stats(object):
+    # the compute stages that are timed, in the order compute() runs them:
+    STAGES = (
+        'input',
+        'calculate',
+        'output',
+    )
+
+    # the values get_values() returns, in order(also the CSV columns,
+    # after the node name, see to_csv()):
+    FIELDS = (
+        'computes',
+        'joint_computes',
+        'input_total',
+        'input_last',
+        'calculate_total',
+        'calculate_last',
+        'output_total',
+        'output_last',
+        'zero_envelope_joints',
+    )
+
+    __slots__ = (
+        'num_computes',
+        'num_joint_computes',
+        'timers',
+        'num_zero_envelope_joints',
+    )
+
+    def __init__(
+        self
+    ):
+        self.reset()
+
+    def reset(
+        self
+    ):
+        # num_computes:  the number of full computes(ie all the joints).
+        # num_joint_computes:  the number of single joint computes(see
+        # mde_py_poseblends_driver.compute_joint()).
+        self.num_computes = 0
+        self.num_joint_computes = 0
+
+        # timers:  stage -> [total seconds, last call seconds], like the
+        # mde_trace.py timers, for the full and single joint computes:
+        self.timers = dict([(x, [0.0, 0.0]) for x in node_stats.STAGES])
+
+        # the number of joints the last full compute didn't read or solve
+        # because their envelope was zero:
+        self.num_zero_envelope_joints = 0
+
+    def add_time(
+        self,
+        stage,
+        start
+    ):
+        # add the time since start(an mtrace.clock() value) to stage's timer:
+        # \return the time since start, in seconds.
+        elapsed = mtrace.clock() - start
+
+        timer = self.timers[stage]
+        timer[0] += elapsed
+        timer[1] = elapsed
+
+        return elapsed
+
+    def get_values(
+        self
+    ):
+        # \return a list of the FIELDS values:
+        result = [
+            self.num_computes,
+            self.num_joint_computes
+        ]
+        for stage in node_stats.STAGES:
+            result.extend(self.timers[stage])
+        result.append(self.num_zero_envelope_joints)
+
+        return result
+
+
+def to_csv(
+    named_stats
+):
+    # \param[in] named_stats:  a list of (node name, node_stats).
+    # \return a CSV string:  a header line, then a line per node:
+    stream = io.StringIO()
+    writer = csv.writer(stream, lineterminator = '\n')
+
+    writer.writerow(['node'] + list(node_stats.FIELDS))
+    for name, stats in named_stats:
+        writer.writerow([name] + stats.get_values())
+
+    result = stream.getvalue()
+
+    return result
@@ -24,6 +24,9 @@ class maya_type_id(enum.IntEnum):
 	
 	# MDE_POSEBLENDS_DRIVER:  MPxNode to drive poseBlends corrective blendShape weights based on SMPL joints' rotations: 
 	MDE_PY_POSEBLENDS_DRIVER		= 0,
+	
+	# MDE_PY_POSEBLENDS_CROWD_DRIVER:  MPxNode to drive the poseBlends corrective blendShape weights of many SMPL characters with one node: 
+	MDE_PY_POSEBLENDS_CROWD_DRIVER	= 1,
 
 	# End if type ids--contact Autodesk Maya for more if necessary
 	# Do not use '64', as that's out-of-bounds:
@@ -0,0 +1,548 @@
+import maya.api.OpenMaya as om2
+import mde_py_maya_type_ids as mp_mtid
+import crowd_node_data as cnd
+import logging
+import weakref
+
+import lib_mde_poseblends_driver as mlpbd
+import mde_trace as mtrace
+
+# mde_py_poseblends_crowd_driver:
+# One node driving the poseBlends corrective blendShape weights of a
+# whole crowd of SMPL(or STAR) characters.
+# mde_poseblends_driver_ops.create_and_connect() makes 1 or 21
+# mde_py_poseblends_driver nodes per character, so a 200 character crowd
+# is up to 4200 Python MPxNodes, and the node count, not the math,
+# dominates evaluation.  This node instead has a character dimension on
+# its inputs and outputs:
+#     inputCharacter[c].inputCharacterJointMatrix[j]:  character c's jth local joint matrix
+#     outputCharacter[c].outputCharacterWeight[k]:  character c's kth blendShape weight
+# and solves every character's joints in one batched compute(see
+# crowd_node_data.py and lib_mde_poseblends_batch.py).
+# The weights of joint j are at k = num_weights * j + w(num_weights:
+# 9 for SMPL, 4 for STAR), which is the same layout as the pose blendShape
+# targets, so each outputCharacter element can drive its character's
+# blendShape node directly(see
+# mde_poseblends_driver_ops.create_and_connect_crowd() in SMPL_maya_plugin.py).
+#
+# Only local joint matrices are read(ie mde_py_poseblends_driver's
+# LOCAL matrix mode).  Written against the Maya Python API 2.0.
+
+def maya_useNewAPI():
+    # tells Maya this plugin uses the Python API 2.0:
+    pass
+
+MAYA_TYPE_ID_T = mp_mtid.maya_type_id
+
+class mde_py_poseblends_crowd_driver(om2.MPxNode):
+    kPluginNodeName = 'mde_py_poseblends_crowd_driver'
+    kPluginNodeId = om2.MTypeId(
+        MAYA_TYPE_ID_T.PREFIX1.value,
+        MAYA_TYPE_ID_T.MDE_PY_POSEBLENDS_CROWD_DRIVER.value
+    )
+
+    NODE_DATA_T = cnd.crowd_node_data
+
+    plugin_path = None
+
+    input_envelope_ = om2.MObject()
+    input_model_type_ = om2.MObject()
+    input_character_ = om2.MObject()
+    input_character_envelope_ = om2.MObject()
+    input_character_joint_matrix_ = om2.MObject()
+
+    output_character_ = om2.MObject()
+    output_character_weight_ = om2.MObject()
+
+    input_attrs = list()
+    output_attrs = list()
+
+    # every live instance of this node(eg for memory_usage_report()):
+    instances = weakref.WeakSet()
+
+    def __init__(self):
+        THIS_T = mde_py_poseblends_crowd_driver
+
+        om2.MPxNode.__init__(self)
+        self.internal_node_data = THIS_T.NODE_DATA_T()
+
+        THIS_T.instances.add(self)
+
+    def memory_usage(
+        self
+    ):
+        result = self.internal_node_data.memory_usage()
+
+        return result
+
+    def input_to_node_data(
+        self,
+        block
+    ):
+        THIS_T = mde_py_poseblends_crowd_driver
+        MODEL_T = mlpbd.poseblends_driver_data.MODEL_T
+        stat = 1
+
+        node = self.internal_node_data
+
+        try:
+            node.envelope = block.inputValue(THIS_T.input_envelope_).asDouble()
+            node.model_type = MODEL_T(block.inputValue(THIS_T.input_model_type_).asShort())
+            input_character_array_handle = block.inputArrayValue(THIS_T.input_character_)
+        except:
+            logging.error("mde_py_poseblends_crowd_driver.input_to_node_data:  reading the node level inputs")
+            stat = 0
+            return stat
+
+        num_characters = len(input_character_array_handle)
+        node.resize_inputs(
+            num_characters
+        )
+
+        characters = node.characters
+        character_logical_indices = node.character_logical_indices
+        for ii in range(0, num_characters):
+            try:
+                input_character_array_handle.jumpToPhysicalElement(ii)
+                character_logical_indices[ii] = input_character_array_handle.elementLogicalIndex()
+                input_character_handle = input_character_array_handle.inputValue()
+                joint_matrix_array_handle = om2.MArrayDataHandle(
+                    input_character_handle.child( THIS_T.input_character_joint_matrix_ )
+                )
+            except:
+                logging.error("mde_py_poseblends_crowd_driver.input_to_node_data:  reading inputCharacter[{0}]".format(ii))
+                stat = 0
+                return stat
+
+            current_character = characters[ii]
+            current_character.envelope = input_character_handle.child( THIS_T.input_character_envelope_ ).asDouble()
+
+            num_joints = len(joint_matrix_array_handle)
+            current_character.resize(
+                num_joints
+            )
+
+            joint_logical_indices = current_character.joint_logical_indices
+            for jj in range(0, num_joints):
+                joint_matrix_array_handle.jumpToPhysicalElement(jj)
+                joint_logical_indices[jj] = joint_matrix_array_handle.elementLogicalIndex()
+                current_character.set_joint_matrix_from_api2_MMatrix(
+                    jj,
+                    joint_matrix_array_handle.inputValue().asMatrix()
+                )
+
+        return stat
+
+    def output_from_node_data(
+        self,
+        block
+    ):
+        # Like mde_py_poseblends_driver.output_from_node_data():  rebuild
+        # the output elements only when the characters, their joints or
+        # the model type changed.  Otherwise only write the weights that
+        # changed.  Also like it:  that's only for the normal context,
+        # whose datablock is what the output cache(output_weights) tracks:
+        stat = 1
+
+        node = self.internal_node_data
+
+        if not block.context().isNormal():
+            stat = self.build_outputs(
+                block,
+                set_layout = False
+            )
+            return stat
+
+        if node.output_layout_changed():
+            if mtrace.PROFILE:
+                mtrace.add_count('crowd_output_rebuilds')
+            stat = self.build_outputs(
+                block
+            )
+            return stat
+
+        stat = self.update_outputs(
+            block
+        )
+        if not stat:
+            if mtrace.PROFILE:
+                mtrace.add_count('crowd_output_rebuilds')
+            stat = self.build_outputs(
+                block
+            )
+
+        return stat
+
+    def get_weight_logical_indices(
+        self,
+        character_index
+    ):
+        # \return the outputCharacterWeight logical indices of the
+        # character at character_index, in the order of its weights:
+        node = self.internal_node_data
+        num_weights = node.get_num_weights()
+        joint_logical_indices = node.characters[character_index].joint_logical_indices
+
+        result = [
+            num_weights * joint_logical_index + ww
+            for joint_logical_index in joint_logical_indices
+            for ww in range(0, num_weights)
+        ]
+
+        return result
+
+    def update_outputs(
+        self,
+        block
+    ):
+        THIS_T = mde_py_poseblends_crowd_driver
+
+        stat = 1
+
+        node = self.internal_node_data
+        characters = node.characters
+        tol = node.tol
+
+        try:
+            output_character_array_handle = block.outputArrayValue( THIS_T.output_character_ )
+        except:
+            stat = 0
+            return stat
+
+        num_values_written = 0
+        for ii in range(0, len(characters)):
+            current_weights = characters[ii].weights
+            output_weights = node.output_weights[ii]
+            weight_logical_indices = None
+
+            try:
+                output_character_array_handle.jumpToLogicalElement(node.output_character_logical_indices[ii])
+                output_character_handle = output_character_array_handle.outputValue()
+                output_weight_array_handle = om2.MArrayDataHandle(
+                    output_character_handle.child( THIS_T.output_character_weight_ )
+                )
+            except:
+                stat = 0
+                return stat
+
+            for kk in range(0, len(current_weights)):
+                current_value = current_weights[kk]
+                if abs(current_value - output_weights[kk]) <= tol:
+                    continue
+
+                if weight_logical_indices is None:
+                    weight_logical_indices = self.get_weight_logical_indices(ii)
+
+                try:
+                    output_weight_array_handle.jumpToLogicalElement(weight_logical_indices[kk])
+                except:
+                    stat = 0
+                    return stat
+
+                output_weight_array_handle.outputValue().setDouble(current_value)
+                output_weights[kk] = current_value
+                num_values_written += 1
+
+            output_weight_array_handle.setAllClean()
+            output_character_handle.setClean()
+
+        output_character_array_handle.setAllClean()
+
+        if mtrace.PROFILE:
+            mtrace.add_count('crowd_output_values_written', num_values_written)
+
+        return stat
+
+    def build_outputs(
+        self,
+        block,
+        set_layout = True
+    ):
+        # (Re)build all the output array elements with builders, then
+        # remember the layout for update_outputs():
+        # \param[in] set_layout:  False:  don't remember the layout(ie the
+        # outputs aren't written to the normal context's datablock).
+        THIS_T = mde_py_poseblends_crowd_driver
+
+        stat = 1
+
+        node = self.internal_node_data
+        characters = node.characters
+        num_characters = len(characters)
+
+        try:
+            output_character_array_handle = block.outputArrayValue( THIS_T.output_character_ )
+            output_character_builder = om2.MArrayDataBuilder(block, THIS_T.output_character_, num_characters)
+        except:
+            logging.error("mde_py_poseblends_crowd_driver.build_outputs:  creating output_character_builder")
+            stat = 0
+            return stat
+
+        for ii in range(0, num_characters):
+            output_character_handle = output_character_builder.addElement(node.character_logical_indices[ii])
+
+            try:
+                output_weight_array_handle = om2.MArrayDataHandle(
+                    output_character_handle.child( THIS_T.output_character_weight_ )
+                )
+                output_weight_array_builder = output_weight_array_handle.builder()
+            except:
+                logging.error("mde_py_poseblends_crowd_driver.build_outputs:  creating output_weight_array_builder")
+                stat = 0
+                return stat
+
+            current_weights = characters[ii].weights
+            weight_logical_indices = self.get_weight_logical_indices(ii)
+            for kk in range(0, len(current_weights)):
+                output_weight_handle = output_weight_array_builder.addElement(weight_logical_indices[kk])
+                output_weight_handle.setDouble(current_weights[kk])
+                output_weight_handle.setClean()
+
+            output_weight_array_handle.set(output_weight_array_builder)
+            output_weight_array_handle.setAllClean()
+            output_character_handle.setClean()
+
+        try:
+            output_character_array_handle.set(output_character_builder)
+            output_character_array_handle.setAllClean()
+        except:
+            logging.error("mde_py_poseblends_crowd_driver.build_outputs:  setting the output_character_builder")
+            stat = 0
+            return stat
+
+        if set_layout:
+            node.set_output_layout()
+
+        return stat
+
+    def compute(
+        self,
+        plug,
+        block
+    ):
+        THIS_T = mde_py_poseblends_crowd_driver
+
+        current_plug = plug
+        if current_plug.isElement:
+            current_plug = current_plug.array()
+        if current_plug.isChild:
+            current_plug = current_plug.parent()
+        if current_plug.isElement:
+            current_plug = current_plug.array()
+
+        if current_plug.attribute() != THIS_T.output_character_:
+            return None
+
+        profile = mtrace.PROFILE
+        if profile:
+            mtrace.add_count('crowd_compute')
+            compute_start = mtrace.clock()
+
+        # STEP 1:  read every character's inputs:
+        stat = self.input_to_node_data(
+            block
+        )
+        if not stat:
+            return None
+
+        if profile:
+            mtrace.add_time('crowd_compute.input', compute_start)
+            stage_start = mtrace.clock()
+
+        # STEP 2:  solve all the characters in one batch:
+        self.internal_node_data.calculate()
+
+        if profile:
+            mtrace.add_time('crowd_compute.calculate', stage_start)
+            stage_start = mtrace.clock()
+
+        # STEP 3:  write the weights:
+        self.output_from_node_data(
+            block
+        )
+
+        if profile:
+            mtrace.add_time('crowd_compute.output', stage_start)
+            mtrace.add_time('crowd_compute', compute_start)
+
+        return None
+
+def memory_usage_report():
+    # log and return {node name:  approximate bytes} for every crowd node:
+    result = {}
+    for node in list(mde_py_poseblends_crowd_driver.instances):
+        node_handle = om2.MObjectHandle(node.thisMObject())
+        if not node_handle.isAlive():
+            continue
+
+        node_name = om2.MFnDependencyNode(node.thisMObject()).name()
+        current_usage = node.memory_usage()
+        result.update({node_name:current_usage})
+        logging.info('{0}:  {1} bytes'.format(
+            node_name,
+            current_usage
+        ))
+
+    return result
+
+def creator():
+    return mde_py_poseblends_crowd_driver()
+
+def initialize():
+    THIS_T = mde_py_poseblends_crowd_driver
+    stat = 1
+
+    nAttr = om2.MFnNumericAttribute()
+    eAttr = om2.MFnEnumAttribute()
+    mAttr = om2.MFnMatrixAttribute()
+    cAttr = om2.MFnCompoundAttribute()
+
+    #----------------------------------------------------inputEnvelope:
+    attrLong = "inputEnvelope"
+    attrShort = "inEnvelope"
+
+    THIS_T.input_envelope_ = nAttr.create(
+        attrLong,
+        attrShort,
+        om2.MFnNumericData.kDouble,
+        1.0
+    )
+    nAttr.setMin(0.0)
+    nAttr.setMax(1.0)
+    nAttr.storable = True
+
+    #---------------------------------------------------inputModelType:
+    attrLong = "inputModelType"
+    attrShort = "inModelType"
+
+    THIS_T.input_model_type_ = eAttr.create(
+        attrLong,
+        attrShort,
+        0
+    )
+    eAttr.addField("kSMPL", 0)
+    eAttr.addField("kSTAR", 1)
+    eAttr.storable = True
+
+    #-------------------------------------------inputCharacterEnvelope:
+    attrLong = "inputCharacterEnvelope"
+    attrShort = "inCharacterEnvelope"
+
+    THIS_T.input_character_envelope_ = nAttr.create(
+        attrLong,
+        attrShort,
+        om2.MFnNumericData.kDouble,
+        1.0
+    )
+    nAttr.setMin(0.0)
+    nAttr.setMax(1.0)
+    nAttr.storable = True
+
+    #----------------------------------------inputCharacterJointMatrix:
+    attrLong = "inputCharacterJointMatrix"
+    attrShort = "inCharacterJointMatrix"
+
+    THIS_T.input_character_joint_matrix_ = mAttr.create(
+        attrLong,
+        attrShort,
+        om2.MFnMatrixAttribute.kDouble
+    )
+    mAttr.storable = True
+    mAttr.array = True
+    mAttr.disconnectBehavior = om2.MFnAttribute.kDelete
+
+    #---------------------------------------------------inputCharacter:
+    attrLong = "inputCharacter"
+    attrShort = "inCharacter"
+
+    THIS_T.input_character_ = cAttr.create(
+        attrLong,
+        attrShort
+    )
+    cAttr.addChild(THIS_T.input_character_envelope_)
+    cAttr.addChild(THIS_T.input_character_joint_matrix_)
+    cAttr.storable = True
+    cAttr.array = True
+    cAttr.disconnectBehavior = om2.MFnAttribute.kDelete
+
+    #--------------------------------------------outputCharacterWeight:
+    attrLong = "outputCharacterWeight"
+    attrShort = "outCharacterWeight"
+
+    THIS_T.output_character_weight_ = nAttr.create(
+        attrLong,
+        attrShort,
+        om2.MFnNumericData.kDouble,
+        0.0
+    )
+    nAttr.array = True
+    nAttr.storable = False
+    nAttr.readable = True
+    nAttr.writable = False
+    nAttr.usesArrayDataBuilder = True
+
+    #--------------------------------------------------outputCharacter:
+    attrLong = "outputCharacter"
+    attrShort = "outCharacter"
+
+    THIS_T.output_character_ = cAttr.create(
+        attrLong,
+        attrShort
+    )
+    cAttr.addChild(THIS_T.output_character_weight_)
+    cAttr.storable = False
+    cAttr.readable = True
+    cAttr.writable = False
+    cAttr.array = True
+    cAttr.usesArrayDataBuilder = True
+
+    #----------------------------------------------------addAttributes:
+    THIS_T.addAttribute( THIS_T.input_envelope_)
+    THIS_T.addAttribute( THIS_T.input_model_type_)
+    THIS_T.addAttribute( THIS_T.input_character_)
+    THIS_T.addAttribute( THIS_T.output_character_)
+
+    #-------------------------------------------------attributeAffects:
+    # every character is solved in the same batch, so every input
+    # affects every output:
+    THIS_T.input_attrs.append( THIS_T.input_envelope_ )
+    THIS_T.input_attrs.append( THIS_T.input_model_type_ )
+    THIS_T.input_attrs.append( THIS_T.input_character_ )
+    THIS_T.input_attrs.append( THIS_T.input_character_envelope_ )
+    THIS_T.input_attrs.append( THIS_T.input_character_joint_matrix_ )
+
+    THIS_T.output_attrs.append( THIS_T.output_character_ )
+    THIS_T.output_attrs.append( THIS_T.output_character_weight_ )
+
+    for current_input_attr in THIS_T.input_attrs:
+        for current_output_attr in THIS_T.output_attrs:
+            THIS_T.attributeAffects(
+                current_input_attr,
+                current_output_attr
+            )
+
+    return stat
+
+
+def initializePlugin(obj):
+    plugin = om2.MFnPlugin(obj, 'Meshcapade', '1.0', 'Any')
+    try:
+        plugin.registerNode(
+            mde_py_poseblends_crowd_driver.kPluginNodeName,
+            mde_py_poseblends_crowd_driver.kPluginNodeId,
+            creator,
+            initialize
+        )
+    except:
+        raise RuntimeError('Failed to register node:  {0}'.format(mde_py_poseblends_crowd_driver.kPluginNodeName))
+
+    mde_py_poseblends_crowd_driver.plugin_path = plugin.loadPath()
+
+def uninitializePlugin(obj):
+    plugin = om2.MFnPlugin(obj)
+    try:
+        plugin.deregisterNode(
+            mde_py_poseblends_crowd_driver.kPluginNodeId
+        )
+    except:
+        raise RuntimeError('Failed to deregister node:  {0}'.format(mde_py_poseblends_crowd_driver.kPluginNodeName))
@@ -1,32 +1,128 @@
 import maya.OpenMaya as oM
+import maya.OpenMayaAnim as oMA
 import maya.OpenMayaMPx as oMPx
+import mde_node_stats as mns
 import mde_py_maya_type_ids as mp_mtid
 import node_data as nd
 import read_multi_attribute as rma
 import logging
+import os
+import weakref
 
 import lib_mde_poseblends_driver as mlpbd
+import mde_trace as mtrace
 
 MAYA_TYPE_ID_T = mp_mtid.maya_type_id
 
 class per_joint_data_extract(object):
+    # Reads one input_joint_ element into a joint_io_data.
+    # One of these is built per mde_py_poseblends_driver node(see 
+    # mde_py_poseblends_driver.create_input_joint_extractor()) and used
+    # for every joint of every compute, so everything that doesn't 
+    # change between computes is looked up once, here:
+    # -the child attribute MObjects and matrix slots,
+    # -one read routine per matrix mode(read_LOCAL(), read_WORLD() and 
+    #  read_WORLDwInv()), picked per joint by indexing read_routines
+    #  with its matrix mode, rather than re-branching through if/elif.
     
     NODE_DATA_T = nd.node_data 
-    MAYA_PER_JOINT_DATA_T = NODE_DATA_T.MAYA_PER_JOINT_DATA_T 
+    JOINT_IO_DATA_T = NODE_DATA_T.JOINT_IO_DATA_T 
     JOINT_MATRIX_MODE_T = NODE_DATA_T.JOINT_MATRIX_MODE_T 
+    MAYA_JOINT_DATA_OPS_T = NODE_DATA_T.MAYA_JOINT_DATA_OPS_T 
     
     def __init__(
-        self
+        self,
+        input_joint_envelope_MObject = None,
+        input_joint_matrix_mode_MObject = None,
+        input_joint_matrix_MObject = None,
+        input_joint_world_matrix_MObject = None,
+        input_joint_world_parent_matrix_MObject = None,
+        input_joint_world_parent_inverse_matrix_MObject = None
     ):
+        THIS_T = per_joint_data_extract
+        JOINT_IO_DATA_T = THIS_T.JOINT_IO_DATA_T
+        MATRIX_MODE_T = THIS_T.JOINT_MATRIX_MODE_T
+        
         self.tol = 1.0e-5
         
-        self.input_joint_envelope_MObject = None
-        self.input_joint_matrix_mode_MObject = None
-        self.input_joint_matrix_MObject = None
-        self.input_joint_world_matrix_MObject = None
-        self.input_joint_world_parent_matrix_MObject = None
-        self.input_joint_world_parent_inverse_matrix_MObject = None
+        self.input_joint_envelope_MObject = input_joint_envelope_MObject
+        self.input_joint_matrix_mode_MObject = input_joint_matrix_mode_MObject
+        self.input_joint_matrix_MObject = input_joint_matrix_MObject
+        self.input_joint_world_matrix_MObject = input_joint_world_matrix_MObject
+        self.input_joint_world_parent_matrix_MObject = input_joint_world_parent_matrix_MObject
+        self.input_joint_world_parent_inverse_matrix_MObject = input_joint_world_parent_inverse_matrix_MObject
+        
+        self.set_matrix_slot = THIS_T.MAYA_JOINT_DATA_OPS_T.set_matrix_slot_from_MMatrix
+        
+        # read_routines[matrix_mode]:  the read routine for that mode:
+        self.read_routines = [None] * len(MATRIX_MODE_T)
+        self.read_routines[MATRIX_MODE_T.LOCAL] = self.read_LOCAL
+        self.read_routines[MATRIX_MODE_T.WORLD] = self.read_WORLD
+        self.read_routines[MATRIX_MODE_T.WORLDwInv] = self.read_WORLDwInv
+        
+        self.LOCAL_MATRIX_SLOT = JOINT_IO_DATA_T.LOCAL_MATRIX_SLOT
+        self.WORLD_MATRIX_SLOT = JOINT_IO_DATA_T.WORLD_MATRIX_SLOT
+        self.WORLD_PARENT_MATRIX_SLOT = JOINT_IO_DATA_T.WORLD_PARENT_MATRIX_SLOT
+        self.WORLD_PARENT_INVERSE_MATRIX_SLOT = JOINT_IO_DATA_T.WORLD_PARENT_INVERSE_MATRIX_SLOT
+    
+    def read_LOCAL(
+        self,
+        per_joint_data,
+        data_handle
+    ):
+        # read in the local matrix only:
+        self.set_matrix_slot(
+            per_joint_data,
+            self.LOCAL_MATRIX_SLOT,
+            data_handle.child( self.input_joint_matrix_MObject ).asMatrix()
+        )
+        
+        if mtrace.TRACE:
+            mtrace.debug('per_joint_data_extract.read_LOCAL():  per_joint_data.matrix:  {0}', per_joint_data.matrix)
+    
+    def read_WORLD(
+        self,
+        per_joint_data,
+        data_handle
+    ):
+        # read in the world matrix and world parent matrix:
+        set_matrix_slot = self.set_matrix_slot
+        set_matrix_slot(
+            per_joint_data,
+            self.WORLD_MATRIX_SLOT,
+            data_handle.child( self.input_joint_world_matrix_MObject ).asMatrix()
+        )
+        set_matrix_slot(
+            per_joint_data,
+            self.WORLD_PARENT_MATRIX_SLOT,
+            data_handle.child( self.input_joint_world_parent_matrix_MObject ).asMatrix()
+        )
+        
+        if mtrace.TRACE:
+            mtrace.debug('per_joint_data_extract.read_WORLD():  per_joint_data.world_matrix:  {0}', per_joint_data.world_matrix)
+            mtrace.debug('per_joint_data_extract.read_WORLD():  per_joint_data.world_parent_matrix:  {0}', per_joint_data.world_parent_matrix)
     
+    def read_WORLDwInv(
+        self,
+        per_joint_data,
+        data_handle
+    ):
+        # read in the world matrix and world parent inverse matrix:
+        set_matrix_slot = self.set_matrix_slot
+        set_matrix_slot(
+            per_joint_data,
+            self.WORLD_MATRIX_SLOT,
+            data_handle.child( self.input_joint_world_matrix_MObject ).asMatrix()
+        )
+        set_matrix_slot(
+            per_joint_data,
+            self.WORLD_PARENT_INVERSE_MATRIX_SLOT,
+            data_handle.child( self.input_joint_world_parent_inverse_matrix_MObject ).asMatrix()
+        )
+        
+        if mtrace.TRACE:
+            mtrace.debug('per_joint_data_extract.read_WORLDwInv():  per_joint_data.world_matrix:  {0}', per_joint_data.world_matrix)
+            mtrace.debug('per_joint_data_extract.read_WORLDwInv():  per_joint_data.world_parent_inverse_matrix:  {0}', per_joint_data.world_parent_inverse_matrix)
     
     def __call__(
         self,
@@ -34,21 +130,21 @@ class per_joint_data_extract(object):
         per_joint_data_index,
         data_handle
     ):
-        logging.debug('per_joint_data_extract.__call__():  BEGIN!!!')
+        # per_joint_data_array is node_data.joints_data, already sized by
+        # node_data.resize_inputs():  the input values are read directly 
+        # into the joint_io_data the solver uses(see maya_joint_data_ops).
+        # Each matrix is only written to it(and the joint marked dirty)
+        # if it changed:
         stat = 1
         
-        if per_joint_data_array[per_joint_data_index] is None:
-            per_joint_data_array[per_joint_data_index] = nd.maya_per_joint_data()
-            
         per_joint_data = per_joint_data_array[per_joint_data_index]
         
         #--------------------------------------------------------------
         # get envelope:
-        input_envelope_handle = data_handle.child( self.input_joint_envelope_MObject )
-        per_joint_data.envelope = input_envelope_handle.asDouble()
-        #per_joint_data.envelope = input_envelope_handle.asFloat()
-        envelope = per_joint_data.envelope
-        logging.debug('per_joint_data_extract.__call__():  envelope:  {0}'.format(envelope))
+        envelope = data_handle.child( self.input_joint_envelope_MObject ).asDouble()
+        per_joint_data.envelope = envelope
+        if mtrace.TRACE:
+            mtrace.debug('per_joint_data_extract.__call__():  envelope:  {0}', envelope)
         
         if abs(envelope) < self.tol:
             # the envelope is zero, so don't bother reading in any of the
@@ -57,52 +153,19 @@ class per_joint_data_extract(object):
         
         # if the evaluation is here:  it means the envelope is non-zero.
         # Therefore:  read in some of the matrices, depending on 
-        # matrix_mode's value:
+        # matrix_mode's value.
+        # (a change of matrix_mode makes the joint re-derive its local
+        # matrix, see joint_io_data.needs_calculate()):
+        matrix_mode = data_handle.child( self.input_joint_matrix_mode_MObject ).asShort()
+        per_joint_data.matrix_mode = matrix_mode
+        if mtrace.TRACE:
+            mtrace.debug('per_joint_data_extract.__call__():  matrix_mode:  {0}', matrix_mode)
         
-        #--------------------------------------------------------------
-        # get matrix_mode:
-        input_matrix_mode_handle = data_handle.child( self.input_joint_matrix_mode_MObject )
-        per_joint_data.matrix_mode = input_matrix_mode_handle.asShort()
-        matrix_mode = per_joint_data.matrix_mode
-        logging.debug('per_joint_data_extract.__call__():  matrix_mode:  {0}'.format(matrix_mode))
-        
-        #--------------------------------------------------------------
-        # get matrices(based on matrix_mode):
-        if matrix_mode == per_joint_data_extract.JOINT_MATRIX_MODE_T.LOCAL:
-            logging.debug('per_joint_data_extract.__call__():  LOCAL read:  ')
-            # read in the local matrix only:
-            input_matrix_handle = data_handle.child( self.input_joint_matrix_MObject )
-            per_joint_data.matrix = input_matrix_handle.asMatrix()
-            #per_joint_data.matrix = input_matrix_handle.asFloatMatrix()
-            
-            logging.debug('per_joint_data_extract.__call__():  per_joint_data.matrix:  {0}'.format([per_joint_data.matrix(ii, jj) for ii in range(0, 4) for jj in range(0, 4)]))
-        elif matrix_mode == per_joint_data_extract.JOINT_MATRIX_MODE_T.WORLD:
-            logging.debug('per_joint_data_extract.__call__():  WORLD read:  ')
-            # read in the world matrix and world parent matrix:
-            input_world_matrix_handle = data_handle.child( self.input_joint_world_matrix_MObject )
-            per_joint_data.world_matrix = input_world_matrix_handle.asMatrix()
-            #per_joint_data.world_matrix = input_world_matrix_handle.asFloatMatrix()
-            logging.debug('per_joint_data_extract.__call__():  per_joint_data.world_matrix:  {0}'.format([per_joint_data.world_matrix(ii, jj) for ii in range(0, 4) for jj in range(0, 4)]))
-            
-            input_world_parent_matrix_handle = data_handle.child( self.input_joint_world_parent_matrix_MObject )
-            per_joint_data.world_parent_matrix = input_world_parent_matrix_handle.asMatrix()
-            #per_joint_data.world_parent_matrix = input_world_parent_matrix_handle.asFloatMatrix()
-            logging.debug('per_joint_data_extract.__call__():  per_joint_data.world_parent_matrix:  {0}'.format([per_joint_data.world_parent_matrix(ii, jj) for ii in range(0, 4) for jj in range(0, 4)]))
-        else: # matrix_mode == per_joint_data_extract.JOINT_MATRIX_MODE_T.WORLDwInv:
-            logging.debug('per_joint_data_extract.__call__():  WORLDwInv read:  ')
-            # read in the world matrix and world parent inverse matrix:
-            input_world_matrix_handle = data_handle.child( self.input_joint_world_matrix_MObject )
-            per_joint_data.world_matrix = input_world_matrix_handle.asMatrix()
-            #per_joint_data.world_matrix = input_world_matrix_handle.asFloatMatrix()
-            logging.debug('per_joint_data_extract.__call__():  per_joint_data.world_matrix:  {0}'.format([per_joint_data.world_matrix(ii, jj) for ii in range(0, 4) for jj in range(0, 4)]))
-            
-            input_world_parent_inverse_matrix_handle = data_handle.child( self.input_joint_world_parent_inverse_matrix_MObject )
-            per_joint_data.world_parent_inverse_matrix = input_world_parent_inverse_matrix_handle.asMatrix()
-            #per_joint_data.world_parent_inverse_matrix = input_world_parent_inverse_matrix_handle.asFloatMatrix()
-            logging.debug('per_joint_data_extract.__call__():  per_joint_data.world_parent_inverse_matrix:  {0}'.format([per_joint_data.world_parent_inverse_matrix(ii, jj) for ii in range(0, 4) for jj in range(0, 4)]))
-            
+        self.read_routines[matrix_mode](
+            per_joint_data,
+            data_handle
+        )
         
-        logging.debug('per_joint_data_extract.__call__():  END!!!')
         return stat
 
 class mde_py_poseblends_driver(oMPx.MPxNode):
@@ -125,16 +188,88 @@ class mde_py_poseblends_driver(oMPx.MPxNode):
     
     output_joint_ = oM.MObject()
     output_joint_blendshape_weights_ = oM.MObject()
+    output_packed_weights_ = oM.MObject()
+    output_weight_ = oM.MObject()
+    
+    input_cache_capacity_ = oM.MObject()
+    input_cache_eviction_ = oM.MObject()
+    output_cache_hits_ = oM.MObject()
+    output_cache_misses_ = oM.MObject()
+    
+    # the outputStat* attributes, one per mde_node_stats.node_stats.FIELDS
+    # value, in that order(see output_stats()):
+    output_stats_ = list()
     
     input_attrs = list()
     output_attrs = list()
     input_attr_long_names = list()
     output_attr_long_names = list()
     
+    # every live instance of this node(eg for memory_usage_report()):
+    instances = weakref.WeakSet()
+    
+    # fine_grained_dirty:  if True, a change to inputJoint[i] only 
+    # dirties outputJoint[i](see setDependentsDirty()).
+    # If False(the default), every input affects every output through 
+    # attributeAffects, like it used to.  It's opt-in because the 
+    # Evaluation Manager builds its graph from the static 
+    # attributeAffects, and this hasn't been verified under parallel 
+    # evaluation yet.  It's set from the FINE_GRAINED_DIRTY_ENV_VAR 
+    # environment variable when the plugin is loaded(ie in initialize()):
+    FINE_GRAINED_DIRTY_ENV_VAR = 'MDE_PY_POSEBLENDS_FINE_GRAINED_DIRTY'
+    fine_grained_dirty = False
+    
     def __init__(self):
+        THIS_T = mde_py_poseblends_driver
+        
         oMPx.MPxNode.__init__(self)
         self.internal_node_data = nd.node_data()
         
+        # built once and reused by every compute(see per_joint_data_extract):
+        self.input_joint_extractor = THIS_T.create_input_joint_extractor()
+        
+        # the inputJoint MPlug, see get_input_joint_plug():
+        self.input_joint_plug = None
+        
+        # reads inputJoint, remembering its logical index layout until
+        # its connections change(see connectionMade()/connectionBroken()):
+        self.input_joint_reader = rma.cached_layout_multi_attribute_reader('input_joint')
+        
+        # this node's own compute timings and counters(see output_stats()):
+        self.stats = mns.node_stats()
+        
+        THIS_T.instances.add(self)
+    
+    def get_input_joint_plug(
+        self
+    ):
+        # the inputJoint MPlug of this node, made on first use(ie once 
+        # thisMObject() is valid) and kept for the life of the node:
+        if self.input_joint_plug is None:
+            self.input_joint_plug = oM.MPlug(self.thisMObject(), mde_py_poseblends_driver.input_joint_)
+        
+        return self.input_joint_plug
+    
+    def memory_usage(
+        self
+    ):
+        # \return a dictionary of the approximate number of bytes used
+        # by this node's internal_node_data(see node_data.memory_usage()):
+        result = self.internal_node_data.memory_usage()
+        
+        return result
+        
+    @staticmethod
+    def is_stats_plug(
+        plug
+    ):
+        # \return True if plug is one of the outputStat* attributes:
+        for current_attr in mde_py_poseblends_driver.output_stats_:
+            if plug == current_attr:
+                return True
+        
+        return False
+    
     @staticmethod
     def is_output_plug(
         plug
@@ -145,7 +280,12 @@ class mde_py_poseblends_driver(oMPx.MPxNode):
         # is the plug itself one of the output plugs?:
         if(
             (plug == THIS_T.output_joint_blendshape_weights_) or
-            (plug == THIS_T.output_joint_)
+            (plug == THIS_T.output_joint_) or
+            (plug == THIS_T.output_packed_weights_) or
+            (plug == THIS_T.output_weight_) or
+            (plug == THIS_T.output_cache_hits_) or
+            (plug == THIS_T.output_cache_misses_) or
+            THIS_T.is_stats_plug(plug)
         ):
             is_output_plug = True    
             return is_output_plug 
@@ -174,7 +314,8 @@ class mde_py_poseblends_driver(oMPx.MPxNode):
             array_plug = plug.array()    
             if(
                 (array_plug == THIS_T.output_joint_blendshape_weights_) or
-                (array_plug == THIS_T.output_joint_)
+                (array_plug == THIS_T.output_joint_) or
+                (array_plug == THIS_T.output_weight_)
             ):
                 is_output_plug = True    
                 return is_output_plug 
@@ -188,12 +329,203 @@ class mde_py_poseblends_driver(oMPx.MPxNode):
            
         return is_output_plug    
     
-    def input_to_node_data(
+    @staticmethod
+    def create_input_joint_extractor():
+        # \return a per_joint_data_extract loaded with the input_joint_ 
+        # child element attributes for it to extract:
+        THIS_T = mde_py_poseblends_driver
+        
+        input_joint_extractor = per_joint_data_extract(
+            input_joint_envelope_MObject = THIS_T.input_joint_envelope_,
+            input_joint_matrix_mode_MObject = THIS_T.input_joint_matrix_mode_,
+            input_joint_matrix_MObject = THIS_T.input_joint_matrix_,
+            input_joint_world_matrix_MObject = THIS_T.input_joint_world_matrix_,
+            input_joint_world_parent_matrix_MObject = THIS_T.input_joint_world_parent_matrix_,
+            input_joint_world_parent_inverse_matrix_MObject = THIS_T.input_joint_world_parent_inverse_matrix_
+        )
+        
+        return input_joint_extractor
+    
+    @staticmethod
+    def get_input_joint_logical_index(
+        plug
+    ):
+        # \return the logical index of the inputJoint element plug is,
+        # or is a child of(ie inputJoint[i] or inputJoint[i].<child>),
+        # or None if it's neither:
+        THIS_T = mde_py_poseblends_driver
+        
+        current_plug = plug
+        if current_plug.isChild():
+            current_plug = current_plug.parent()
+        
+        if(
+            current_plug.isElement() and 
+            (current_plug.array() == THIS_T.input_joint_)
+        ):
+            return current_plug.logicalIndex()
+        
+        return None
+    
+    def setDependentsDirty(
         self,
-        block
+        plug,
+        plugArray
+    ):
+        # inputJoint and its children have no attributeAffects(see 
+        # initialize()) so that a change to inputJoint[i] only dirties:
+        # outputJoint[i]
+        # outputJoint[i].outputJointBlendShapeWeights
+        # outputJoint[i].outputJointBlendShapeWeights[*]
+        # rather than every output(ie every blendShape weight connected
+        # to this node).  inputEnvelope/inputModelType still dirty
+        # everything through attributeAffects.
+        THIS_T = mde_py_poseblends_driver
+        
+        # an inputJoint element that isn't in the cached layout(eg one
+        # just set after another was removed, which changes neither the
+        # connections nor the number of elements) means the layout has
+        # to be rescanned(see read_multi_attribute.py):
+        logical_index = THIS_T.get_input_joint_logical_index(plug)
+        if(
+            (logical_index is not None) and 
+            not self.input_joint_reader.has_logical_index(logical_index)
+        ):
+            self.input_joint_reader.invalidate()
+        
+        if not THIS_T.fine_grained_dirty:
+            return oMPx.MPxNode.setDependentsDirty(self, plug, plugArray)
+        
+        output_joint_plug = None
+        node = self.internal_node_data
+        
+        if(
+            (logical_index is not None) and 
+            node.zero_outputs and 
+            node.is_disabled() and
+            (node.get_joint_array_index(logical_index) is not None)
+        ):
+            # the node is disabled and its zero outputs are already 
+            # written(see compute_disabled()):  a change to a known joint
+            # can't change them, so nothing is dirtied.  A change of 
+            # envelope dirties everything through attributeAffects:
+            pass
+        elif logical_index is not None:
+            output_joint_array_plug = oM.MPlug(self.thisMObject(), THIS_T.output_joint_)
+            output_joint_plug = output_joint_array_plug.elementByLogicalIndex(logical_index)
+            
+            plugArray.append(output_joint_plug)
+            
+            out_joint_blendshape_weights_plug = output_joint_plug.child(THIS_T.output_joint_blendshape_weights_)
+            plugArray.append(out_joint_blendshape_weights_plug)
+            
+            for jj in range(0, out_joint_blendshape_weights_plug.numElements()):
+                plugArray.append(out_joint_blendshape_weights_plug.elementByPhysicalIndex(jj))
+            
+            # the packed outputs hold every joint's weights, so they're
+            # dirtied too.  Only the joint's outputWeight elements though,
+            # if its number of weights is known:
+            plugArray.append(oM.MPlug(self.thisMObject(), THIS_T.output_packed_weights_))
+            
+            output_weight_plug = oM.MPlug(self.thisMObject(), THIS_T.output_weight_)
+            joint_index = self.internal_node_data.get_joint_array_index(logical_index)
+            num_weights = 0
+            if joint_index is not None:
+                num_weights = len(self.internal_node_data.joints_data[joint_index].blendshape_weights)
+            
+            if num_weights > 0:
+                for jj in range(num_weights * logical_index, num_weights * (logical_index + 1)):
+                    plugArray.append(output_weight_plug.elementByLogicalIndex(jj))
+            else:
+                plugArray.append(output_weight_plug)
+        elif plug == THIS_T.input_joint_:
+            # the whole inputJoint array(eg an element was added or 
+            # removed):  dirty everything:
+            node.clear_zero_outputs()
+            output_joint_plug = oM.MPlug(self.thisMObject(), THIS_T.output_joint_)
+            plugArray.append(output_joint_plug)
+            plugArray.append(oM.MPlug(self.thisMObject(), THIS_T.output_packed_weights_))
+            plugArray.append(oM.MPlug(self.thisMObject(), THIS_T.output_weight_))
+        
+        if mtrace.TRACE and output_joint_plug is not None:
+            mtrace.debug('mde_poseblends_driver.setDependentsDirty:  {0} -> {1}', plug.name(), output_joint_plug.name())
+        
+        return oMPx.MPxNode.setDependentsDirty(self, plug, plugArray)
+    
+    def connectionMade(
+        self,
+        plug,
+        otherPlug,
+        asSrc
     ):
-        logging.debug("mde_poseblends_driver.input_to_node_data:  BEGIN!!!")
+        self.on_connection_changed(
+            plug
+        )
+        
+        return oMPx.MPxNode.connectionMade(self, plug, otherPlug, asSrc)
     
+    def connectionBroken(
+        self,
+        plug,
+        otherPlug,
+        asSrc
+    ):
+        self.on_connection_changed(
+            plug
+        )
+        
+        return oMPx.MPxNode.connectionBroken(self, plug, otherPlug, asSrc)
+    
+    def on_connection_changed(
+        self,
+        plug
+    ):
+        # a connection to(a child of) an inputJoint element changes the
+        # inputJoint topology, so its layout has to be rescanned:
+        THIS_T = mde_py_poseblends_driver
+        
+        if(
+            (THIS_T.get_input_joint_logical_index(plug) is not None) or
+            (plug == THIS_T.input_joint_)
+        ):
+            self.input_joint_reader.invalidate()
+    
+    @staticmethod
+    def get_requested_joint_logical_index(
+        plug
+    ):
+        # \return the logical index of the outputJoint element plug
+        # belongs to, ie for any of:
+        # outputJoint[i]
+        # outputJoint[i].outputJointBlendShapeWeights
+        # outputJoint[i].outputJointBlendShapeWeights[k]
+        # it's i.  Returns None if plug isn't(under) one outputJoint 
+        # element, eg if it's the whole outputJoint array.
+        THIS_T = mde_py_poseblends_driver
+        
+        current_plug = plug
+        if(
+            current_plug.isElement() and 
+            (current_plug.array() == THIS_T.output_joint_blendshape_weights_)
+        ):
+            current_plug = current_plug.array()
+        
+        if current_plug.isChild():
+            current_plug = current_plug.parent()
+        
+        if(
+            current_plug.isElement() and 
+            (current_plug.array() == THIS_T.output_joint_)
+        ):
+            return current_plug.logicalIndex()
+        
+        return None
+    
+    def input_node_level_to_node_data(
+        self,
+        block
+    ):
+        # read the inputs that aren't per-joint(ie envelope and model_type):
         THIS_T = mde_py_poseblends_driver
         stat = 1
         
@@ -211,7 +543,8 @@ class mde_py_poseblends_driver(oMPx.MPxNode):
         
         self.internal_node_data.envelope = env_data_handle.asDouble() 
         #self.internal_node_data.envelope = env_data_handle.asFloat()    
-        logging.debug('self.internal_node_data.envelope:  {0}'.format(self.internal_node_data.envelope))
+        if mtrace.TRACE:
+            mtrace.debug('self.internal_node_data.envelope:  {0}', self.internal_node_data.envelope)
         
         #--------------------------------------------------input_model_type_:
         #
@@ -226,205 +559,1035 @@ class mde_py_poseblends_driver(oMPx.MPxNode):
                 
         MODEL_T = mlpbd.poseblends_driver_data.MODEL_T
         self.internal_node_data.model_type = MODEL_T(model_type_data_handle.asShort())
-        logging.debug('self.internal_node_data.model_type:  {0}'.format(self.internal_node_data.model_type))  
+        if mtrace.TRACE:
+            mtrace.debug('self.internal_node_data.model_type:  {0}', self.internal_node_data.model_type)
+        
+        return stat
+    
+    def input_cache_settings_to_node_data(
+        self,
+        block
+    ):
+        # read the result cache's capacity and eviction policy(see 
+        # mde_result_cache.py):
+        THIS_T = mde_py_poseblends_driver
+        stat = 1
+        
+        try:
+            capacity = block.inputValue(THIS_T.input_cache_capacity_).asInt()
+            eviction_policy = block.inputValue(THIS_T.input_cache_eviction_).asShort()
+        except:
+            logging.error("Error reading the cache settings")
+            stat = 0
+            return stat
+        
+        result_cache = self.internal_node_data.result_cache
+        result_cache.set_capacity(capacity)
+        result_cache.set_eviction_policy(eviction_policy)
+        
+        return stat
+    
+    @staticmethod
+    def get_evaluation_time(
+        block
+    ):
+        # \return the time block is being evaluated at, in seconds:  
+        # the context's time, or the current time for a normal context:
+        context = block.context()
+        
+        time = None
+        if context.isNormal():
+            time = oMA.MAnimControl.currentTime()
+        else:
+            time = oM.MTime()
+            context.getTime(time)
+        
+        result = time.asUnits(oM.MTime.kSeconds)
+        
+        return result
+    
+    def calculate_or_restore(
+        self,
+        block
+    ):
+        # STEP 2 of compute():  calculate the weights, unless the result
+        # cache is on and already has them for these inputs at this time:
+        node = self.internal_node_data
+        result_cache = node.result_cache
+        
+        if not result_cache.is_enabled():
+            node.calculate()
+            return
+        
+        cache_key = node.get_cache_key(
+            mde_py_poseblends_driver.get_evaluation_time(block)
+        )
+        
+        if not node.restore_cached_result(cache_key):
+            node.calculate()
+            node.store_cached_result(cache_key)
+        
+        self.output_cache_statistics(
+            block
+        )
+    
+    def output_cache_statistics(
+        self,
+        block
+    ):
+        # outputCacheHits/outputCacheMisses aren't affected by any input:
+        # they're written here, on every compute that uses the cache:
+        THIS_T = mde_py_poseblends_driver
+        
+        result_cache = self.internal_node_data.result_cache
+        
+        hits_handle = block.outputValue(THIS_T.output_cache_hits_)
+        hits_handle.setInt(result_cache.num_hits)
+        hits_handle.setClean()
+        
+        misses_handle = block.outputValue(THIS_T.output_cache_misses_)
+        misses_handle.setInt(result_cache.num_misses)
+        misses_handle.setClean()
+    
+    def output_stats(
+        self,
+        block
+    ):
+        # Like output_cache_statistics():  the outputStat* attributes 
+        # aren't affected by any input, they're written at the end of 
+        # every compute(full or compute_joint()):
+        THIS_T = mde_py_poseblends_driver
+        
+        values = self.stats.get_values()
+        for ii in range(0, len(values)):
+            current_handle = block.outputValue(THIS_T.output_stats_[ii])
+            current_value = values[ii]
+            if isinstance(current_value, int):
+                current_handle.setInt(current_value)
+            else:
+                current_handle.setDouble(current_value)
+            current_handle.setClean()
+    
+    def input_to_node_data(
+        self,
+        block
+    ):
+        if mtrace.TRACE:
+            mtrace.debug("mde_poseblends_driver.input_to_node_data:  BEGIN!!!")
+    
+        THIS_T = mde_py_poseblends_driver
+        stat = self.input_node_level_to_node_data(
+            block
+        )
+        if not stat:
+            return stat
         
         #-----------------------------------------------------input_joint_:
-        input_joint_extractor = per_joint_data_extract()
-        
-        # load input_joint_extractor with the input_joint_ child element 
-        # attributes for it to extract:
-        # 
-        input_joint_extractor.input_joint_envelope_MObject = THIS_T.input_joint_envelope_    
-        input_joint_extractor.input_joint_matrix_mode_MObject = THIS_T.input_joint_matrix_mode_    
-        input_joint_extractor.input_joint_matrix_MObject = THIS_T.input_joint_matrix_    
-        input_joint_extractor.input_joint_world_matrix_MObject = THIS_T.input_joint_world_matrix_    
-        input_joint_extractor.input_joint_world_parent_matrix_MObject = THIS_T.input_joint_world_parent_matrix_    
-        input_joint_extractor.input_joint_world_parent_inverse_matrix_MObject = THIS_T.input_joint_world_parent_inverse_matrix_    
-        
-        logging.debug('self.internal_node_data.maya_joint_data(before rma call):  {0}'.format(self.internal_node_data.maya_joint_data))  
-        logging.debug('self.internal_node_data.joint_logical_indices(before rma call):  {0}'.format(self.internal_node_data.joint_logical_indices))  
+        input_joint_array_handle = None
+        try:
+            input_joint_array_handle = block.inputArrayValue(THIS_T.input_joint_)
+        except:
+            logging.error("Error reading input_joint")
+            stat = 0
+            return stat
+        
+        # size internal_node_data's per-joint storage before the input
+        # joints are read into it:
+        self.internal_node_data.resize_inputs(
+            input_joint_array_handle.elementCount()
+        )
+        
+        if mtrace.TRACE:
+            mtrace.debug('self.internal_node_data.joints_data(before rma call):  {0}', self.internal_node_data.joints_data)
+            mtrace.debug('self.internal_node_data.joint_logical_indices(before rma call):  {0}', self.internal_node_data.joint_logical_indices)
         arg_num_input_joint_elements = []  
-        rma.MDataBlock_ops.read_multi_attribute (
-            block,
-            THIS_T.input_joint_,
-            input_joint_extractor,
-            self.internal_node_data.maya_joint_data,
+        self.input_joint_reader.read_multi_attribute (
+            input_joint_array_handle,
+            self.input_joint_extractor,
+            self.internal_node_data.joints_data,
             self.internal_node_data.joint_logical_indices,
             arg_num_input_joint_elements
         )
-        logging.debug('self.internal_node_data.maya_joint_data(after rma call):  {0}'.format(self.internal_node_data.maya_joint_data))  
-        logging.debug('self.internal_node_data.joint_logical_indices(after rma call):  {0}'.format(self.internal_node_data.joint_logical_indices))  
+        self.internal_node_data.update_joint_array_indices()
+        
+        if mtrace.TRACE:
+            mtrace.debug('self.internal_node_data.joints_data(after rma call):  {0}', self.internal_node_data.joints_data)
+            mtrace.debug('self.internal_node_data.joint_logical_indices(after rma call):  {0}', self.internal_node_data.joint_logical_indices)
+            mtrace.debug("mde_poseblends_driver.input_to_node_data:  END!!!")
+        return stat    
+        
+    def output_from_node_data(
+        self,
+        block
+    ):
+        # internal_node_data will have the outputs stored as:
+        # data.joints_data[0...num_joints].blendshape_weights
+        # Only the first 9 elements of blendshape_weights should
+        # be used(ie one for each element of 3x3 rotation matrix).
+        #
+        # The output array elements are only(re)built when the joints
+        # or their number of weights change.  Otherwise the existing
+        # elements are kept and only the values that changed are
+        # written(see node_data.output_layout_changed()).
+        #
+        # The output cache(node_data.output_weights) is what was written
+        # to the normal context's datablock.  So in any other context(eg
+        # getAttr -time, or a DG context read), all the outputs are built,
+        # without reading or updating it:
+        stat = 1
+        
+        node = self.internal_node_data
+        
+        if not block.context().isNormal():
+            stat = self.build_outputs(
+                block,
+                set_layout = False
+            )
+            return stat
+        
+        if node.output_layout_changed():
+            if mtrace.PROFILE:
+                mtrace.add_count('output_rebuilds')
+            stat = self.build_outputs(
+                block
+            )
+            return stat
+        
+        stat = self.update_outputs(
+            block
+        )
+        if not stat:
+            # the output elements aren't what output_layout_changed()
+            # thought they were(eg an element was removed), so rebuild:
+            if mtrace.PROFILE:
+                mtrace.add_count('output_rebuilds')
+            stat = self.build_outputs(
+                block
+            )
+        
+        return stat
+    
+    def update_outputs(
+        self,
+        block
+    ):
+        # Write the blendshape weights into the existing output elements,
+        # only setting the ones whose value changed by more than tol
+        # since they were last written.
+        # \return an int:  0:  fail(ie the outputs need rebuilding), 1:  success
+        if mtrace.TRACE:
+            mtrace.debug("mde_py.poseblends_driver.update_outputs:  BEGIN!!!")
+        
+        THIS_T = mde_py_poseblends_driver
+        
+        stat = 1
+        
+        num_joints = len(self.internal_node_data.joints_data)
+        
+        try:
+            output_joint_array_handle = block.outputArrayValue( THIS_T.output_joint_ )
+        except:
+            stat = 0
+            return stat
+        
+        for ii in range(0, num_joints):
+            stat = self.update_output_joint(
+                output_joint_array_handle,
+                ii
+            )
+            if not stat:
+                return stat
+        
+        output_joint_array_handle.setAllClean()
+        
+        if mtrace.TRACE:
+            mtrace.debug("mde_py.poseblends_driver.update_outputs:  END!!!")
+        
+        return stat
+    
+    def update_output_joint(
+        self,
+        output_joint_array_handle,
+        joint_index
+    ):
+        # update_outputs() for the one joint at joint_index:
+        # \param[in] output_joint_array_handle:  the MArrayDataHandle of output_joint_.
+        # \param[in] joint_index:  the index in internal_node_data.joints_data.
+        # \return an int:  0:  fail(ie the outputs need rebuilding), 1:  success
+        THIS_T = mde_py_poseblends_driver
+        
+        stat = 1
+        
+        node = self.internal_node_data
+        data = node.non_maya_data
+        tol = data.tol
+        
+        output_weights = node.output_weights
+        MAX_NUM_WEIGHTS = node.JOINT_IO_DATA_T.MAX_NUM_WEIGHTS
+        
+        try:
+            output_joint_array_handle.jumpToElement(node.output_logical_indices[joint_index])
+            out_joint_handle = output_joint_array_handle.outputValue()
+            out_joint_blendshape_weights_array_handle = oM.MArrayDataHandle( 
+                out_joint_handle.child( THIS_T.output_joint_blendshape_weights_ ) 
+            )
+        except:
+            stat = 0
+            return stat
+        
+        current_blendshape_weights = data.joints_data[joint_index].blendshape_weights
+        num_blendshape_weights = len(current_blendshape_weights)
+        output_offset = joint_index * MAX_NUM_WEIGHTS
+        
+        num_values_written = 0
+        for jj in range(0, num_blendshape_weights):
+            current_value = current_blendshape_weights[jj]
+            if abs(current_value - output_weights[output_offset + jj]) <= tol:
+                continue
+            
+            try:
+                out_joint_blendshape_weights_array_handle.jumpToElement(jj)
+            except:
+                stat = 0
+                return stat
+            
+            out_joint_blendshape_weights_array_handle.outputValue().setDouble(current_value)
+            output_weights[output_offset + jj] = current_value
+            num_values_written += 1
+        
+        out_joint_blendshape_weights_array_handle.setAllClean()
+        out_joint_handle.setClean()
+        
+        if mtrace.PROFILE:
+            mtrace.add_count('output_values_written', num_values_written)
+        
+        return stat
+    
+    def build_outputs(
+        self,
+        block,
+        set_layout = True
+    ):
+        # (Re)build all the output array elements with builders, then 
+        # remember the layout for update_outputs():
+        # \param[in] set_layout:  False:  don't remember the layout(ie the
+        # outputs aren't written to the normal context's datablock).
+        if mtrace.TRACE:
+            mtrace.debug("mde_py.poseblends_driver.output_from_node_data:  BEGIN!!!")
+        
+        THIS_T = mde_py_poseblends_driver
+        
+        stat = 1
+        
+        if mtrace.TRACE:
+            mtrace.debug("mde_py.poseblends_driver.output_from_node_data output results:  ")
+        
+        #-------------------------------------------------------------------
+        #    output results... 
+        out_handle = oM.MDataHandle()
+    
+        node = self.internal_node_data
+        data = node.non_maya_data
+        joint_data = data.joints_data
+        joint_logical_indices = node.joint_logical_indices
+        num_joints = len(joint_data)
+    
+        #--------------------------------------------------------------------------------
+        output_joint_array_handle = None
+        try:
+            output_joint_array_handle = block.outputArrayValue( THIS_T.output_joint_ )
+        except:
+            logging.error("mde_py.poseblends_driver.output_from_node_data getting output_joint_array_handle")
+            stat = 0
+            return stat
+    
+        output_joint_builder = None
+        try:
+            output_joint_builder = oM.MArrayDataBuilder(block, THIS_T.output_joint_, num_joints)
+        except:
+            logging.error("mde_py.poseblends_driver.output_from_node_data creating output_joint_builder")
+            stat = 0
+            return stat
+    
+        for ii in range(0, num_joints):
+            if mtrace.TRACE:
+                mtrace.debug("mde_py.poseblends_driver.output_from_node_data output boneExtend loop ii:  {0}", ii)
+            current_logical_index = joint_logical_indices[ii]
+            out_joint_handle = output_joint_builder.addElement(current_logical_index)
+        
+            
+            out_joint_blendshape_weights_handle = out_joint_handle.child( THIS_T.output_joint_blendshape_weights_ )
+            
+            out_joint_blendshape_weights_array_handle = None
+            try:
+                out_joint_blendshape_weights_array_handle = oM.MArrayDataHandle( out_joint_blendshape_weights_handle )
+            except:
+                logging.error("mde_py.poseblends_driver.output_from_node_data getting out_joint_blendshape_weights_array_handle")
+                stat = 0
+                return stat
+            
+            out_joint_blendshape_weights_array_builder = None
+            try:
+                out_joint_blendshape_weights_array_builder = out_joint_blendshape_weights_array_handle.builder()
+            except:
+                logging.error("mde_py.poseblends_driver.output_from_node_data creating out_joint_blendshape_weights_array_builder")
+                stat = 0
+                return stat
+            
+            current_blendshape_weights = joint_data[ii].blendshape_weights
+            # num_blendshape_weights immediately below should only ever be 9 for SMPL and its flavors,
+            # but we'll just use the size of the array to keep from hardcoding it
+            # in case in changes in the future:
+            # (which it did, to 4, when support for STAR was added)
+            num_blendshape_weights = len(current_blendshape_weights)
+            
+            for jj in range(0, num_blendshape_weights):
+                out_joint_blendshape_weight_handle = out_joint_blendshape_weights_array_builder.addElement(jj)
+                
+                current_value = current_blendshape_weights[jj]
+                
+                if mtrace.TRACE:
+                    mtrace.debug("mde_py.poseblends_driver.output_from_node_data current_blendshape_weights[jj]:  {0}", current_value)
+                out_joint_blendshape_weight_handle.setDouble(current_value)
+                #out_joint_blendshape_weight_handle.setFloat(current_value)
+        
+    
+                if mtrace.TRACE:
+                    mtrace.debug("mde_py.poseblends_driver.output_from_node_data out_joint_blendshape_weight_handle.asDouble():  {0}", out_joint_blendshape_weight_handle.asDouble())
+                #logging.debug("mde_py.poseblends_driver.output_from_node_data out_joint_blendshape_weight_handle.asFloat():  {0}".format(out_joint_blendshape_weight_handle.asFloat()))
+                
+                out_joint_blendshape_weight_handle.setClean()
+            #---------------------------------------------------------------------------------------
+            try:
+                out_joint_blendshape_weights_array_handle.set(out_joint_blendshape_weights_array_builder)
+            except:
+                logging.error("mde_py.poseblends_driver.output_from_node_data setting the out_joint_blendshape_weights_array_builder")
+                stat = 0
+                return stat
+            
+            try:    
+                out_joint_blendshape_weights_array_handle.setAllClean()
+            except:
+                logging.error("mde_py.poseblends_driver.output_from_node_data cleaning out_joint_blendshape_weights_array_handle")
+                stat = 0
+                return stat
+            
+            out_joint_handle.setClean()
+            
+        #---------------------------------------------------------------------------------------
+        try:
+            output_joint_array_handle.set(output_joint_builder)
+        except:
+            logging.error("mde_py.poseblends_driver.output_from_node_data setting the output_joint_builder")
+            stat = 0
+            return stat
+            
+        try:
+            output_joint_array_handle.setAllClean()
+        except:
+            logging.error("mde_py.poseblends_driver.output_from_node_data cleaning output_joint_array_handle")
+            stat = 0
+            return stat
+        
+        if set_layout:
+            node.set_output_layout()
+            
+        if mtrace.TRACE:
+            mtrace.debug("mde_py.poseblends_driver.output_from_node_data:  END!!!")
+    
+        return stat
+        
+
+    def output_packed_weights_from_node_data(
+        self,
+        block
+    ):
+        # Write all the weights to outputPackedWeights as one doubleArray
+        # (see node_data.get_packed_weights() for the layout):
+        THIS_T = mde_py_poseblends_driver
+        
+        stat = 1
+        
+        values = self.internal_node_data.get_packed_weights()
+        num_values = len(values)
+        
+        maya_values = oM.MDoubleArray(num_values, 0.0)
+        for ii in range(0, num_values):
+            maya_values.set(values[ii], ii)
+        
+        try:
+            packed_weights_data = oM.MFnDoubleArrayData().create(maya_values)
+            packed_weights_handle = block.outputValue( THIS_T.output_packed_weights_ )
+        except:
+            logging.error("mde_py.poseblends_driver.output_packed_weights_from_node_data setting outputPackedWeights")
+            stat = 0
+            return stat
+        
+        packed_weights_handle.setMObject(packed_weights_data)
+        packed_weights_handle.setClean()
+        
+        return stat
+    
+    def output_weight_from_node_data(
+        self,
+        block
+    ):
+        # Write the weights to the flat outputWeight elements.  Like
+        # output_from_node_data():  the elements are only rebuilt when
+        # their indices change, otherwise only the changed values are
+        # written:
+        THIS_T = mde_py_poseblends_driver
+        
+        stat = 1
+        
+        node = self.internal_node_data
+        indices = node.get_packed_weight_indices()
+        values = node.get_packed_weight_values()
+        
+        try:
+            output_weight_array_handle = block.outputArrayValue( THIS_T.output_weight_ )
+        except:
+            logging.error("mde_py.poseblends_driver.output_weight_from_node_data getting output_weight_array_handle")
+            stat = 0
+            return stat
+        
+        # like output_from_node_data():  only the normal context uses and
+        # updates the written values(packed_output_weights):
+        is_normal_context = block.context().isNormal()
+        if is_normal_context and not node.packed_layout_changed(indices):
+            stat = self.update_output_weight(
+                output_weight_array_handle,
+                indices,
+                values
+            )
+            if stat:
+                return stat
+            
+            # if the evaluation is here:  an element isn't there 
+            # anymore, so rebuild:
+            stat = 1
+        
+        if mtrace.PROFILE:
+            mtrace.add_count('output_weight_rebuilds')
+        
+        try:
+            output_weight_builder = oM.MArrayDataBuilder(block, THIS_T.output_weight_, len(indices))
+            for ii in range(0, len(indices)):
+                output_weight_builder.addElement(indices[ii]).setDouble(values[ii])
+            
+            output_weight_array_handle.set(output_weight_builder)
+            output_weight_array_handle.setAllClean()
+        except:
+            logging.error("mde_py.poseblends_driver.output_weight_from_node_data building outputWeight")
+            stat = 0
+            return stat
+        
+        if is_normal_context:
+            node.set_packed_layout(
+                indices,
+                values
+            )
+        
+        return stat
+    
+    def update_output_weight(
+        self,
+        output_weight_array_handle,
+        indices,
+        values
+    ):
+        # write the values that changed by more than tol since they were
+        # last written to their existing outputWeight elements:
+        # \return an int:  0:  fail(ie the elements need rebuilding), 1:  success
+        stat = 1
+        
+        node = self.internal_node_data
+        tol = node.non_maya_data.tol
+        output_weights = node.packed_output_weights
+        
+        num_values_written = 0
+        for ii in range(0, len(indices)):
+            current_value = values[ii]
+            if abs(current_value - output_weights[ii]) <= tol:
+                continue
+            
+            try:
+                output_weight_array_handle.jumpToElement(indices[ii])
+            except:
+                stat = 0
+                return stat
+            
+            output_weight_array_handle.outputValue().setDouble(current_value)
+            output_weights[ii] = current_value
+            num_values_written += 1
+        
+        output_weight_array_handle.setAllClean()
+        
+        if mtrace.PROFILE:
+            mtrace.add_count('output_values_written', num_values_written)
+        
+        return stat
+    
+    @staticmethod
+    def get_requested_output(
+        plug
+    ):
+        # \return which of the outputs plug is(part of):
+        # 'packed':  outputPackedWeights
+        # 'weight':  outputWeight
+        # 'joint':  outputJoint
+        THIS_T = mde_py_poseblends_driver
+        
+        if plug == THIS_T.output_packed_weights_:
+            return 'packed'
+        
+        if (plug == THIS_T.output_weight_) or (plug.isElement() and (plug.array() == THIS_T.output_weight_)):
+            return 'weight'
+        
+        return 'joint'
+    
+    def output_requested_from_node_data(
+        self,
+        output,
+        block
+    ):
+        # \param[in] output:  see get_requested_output().
+        if output == 'packed':
+            self.output_packed_weights_from_node_data(
+                block
+            )
+        elif output == 'weight':
+            self.output_weight_from_node_data(
+                block
+            )
+        else:
+            self.output_from_node_data(
+                block
+            )
+    
+    def compute_disabled(
+        self,
+        plug,
+        block
+    ):
+        # The whole node is disabled(see node_data.is_disabled()), so 
+        # every weight is zero:  the input joints aren't read(only their
+        # logical indices, off the plug) or solved.  The requested output
+        # is written as all zeros the first time.  After that, it's only
+        # set clean until the envelope or the output layout(the model 
+        # type or the inputJoint elements, eg one added with setAttr)
+        # changes.  That's only for the normal context:  any other 
+        # context's datablock is written every time:
+        node = self.internal_node_data
+        output = mde_py_poseblends_driver.get_requested_output(plug)
+        
+        input_joint_indices = oM.MIntArray()
+        self.get_input_joint_plug().getExistingArrayAttributeIndices(input_joint_indices)
+        logical_indices = [input_joint_indices[ii] for ii in range(0, input_joint_indices.length())]
+        
+        is_normal_context = block.context().isNormal()
+        if is_normal_context and node.is_zero_output_written(output, logical_indices):
+            block.setClean(plug)
+            if mtrace.PROFILE:
+                mtrace.add_count('disabled_computes_skipped')
+            return
+        
+        node.set_zero_weights(
+            logical_indices
+        )
+        
+        self.output_requested_from_node_data(
+            output,
+            block
+        )
+        if is_normal_context:
+            node.set_zero_output_written(output, logical_indices)
         
-        logging.debug("mde_poseblends_driver.input_to_node_data:  END!!!")
-        return stat    
-        
-    def output_from_node_data(
+        if mtrace.PROFILE:
+            mtrace.add_count('disabled_outputs_written')
+    
+    def compute_joint(
         self,
-        block
+        plug,
+        block,
+        logical_index
     ):
-        # internal_node_data will have the outputs stored as:
-        # data.joints_data[0...num_joints].blendshape_weights
-        # Only the first 9 elements of blendshape_weights should
-        # be used(ie one for each element of 3x3 rotation matrix):
-    
-        logging.debug("mde_py.poseblends_driver.output_from_node_data:  BEGIN!!!")
-        
+        # Read, solve and output only the joint at logical_index.  Like
+        # compute(), the input, calculate and output stage times go to
+        # this node's stats.
+        # \return an int:  0:  this can't be done for just the one joint
+        # (ie everything has to be computed), 1:  success
         THIS_T = mde_py_poseblends_driver
         
-        stat = 1
+        stat = 0
         
-        logging.debug("mde_py.poseblends_driver.output_from_node_data output results:  ")
+        # update_output_joint() writes through the output cache, which is
+        # only for the normal context(see output_from_node_data()):
+        if not block.context().isNormal():
+            return stat
+        
+        stats = self.stats
+        stage_start = mtrace.clock()
         
-        #-------------------------------------------------------------------
-        #    output results... 
-        out_handle = oM.MDataHandle()
-    
         node = self.internal_node_data
-        data = node.non_maya_data
-        joint_data = data.joints_data
-        joint_logical_indices = node.joint_logical_indices
-        num_joints = len(joint_data)
-    
-        #--------------------------------------------------------------------------------
-        output_joint_array_handle = None
-        try:
-            output_joint_array_handle = block.outputArrayValue( THIS_T.output_joint_ )
-        except:
-            logging.error("mde_py.poseblends_driver.output_from_node_data getting output_joint_array_handle")
-            stat = 0
+        joints_data = node.joints_data
+        
+        joint_index = node.get_joint_array_index(logical_index)
+        if joint_index is None:
             return stat
-    
-        output_joint_builder = None
-        try:
-            output_joint_builder = oM.MArrayDataBuilder(block, THIS_T.output_joint_, num_joints)
-        except:
-            logging.error("mde_py.poseblends_driver.output_from_node_data creating output_joint_builder")
-            stat = 0
+        
+        input_joint_plug = self.get_input_joint_plug()
+        if input_joint_plug.numElements() != len(joints_data):
             return stat
-    
-        for ii in range(0, num_joints):
-            logging.debug("mde_py.poseblends_driver.output_from_node_data output boneExtend loop ii:  {0}".format(ii) )
-            current_logical_index = joint_logical_indices[ii]
-            out_joint_handle = output_joint_builder.addElement(current_logical_index)
         
-            
-            out_joint_blendshape_weights_handle = out_joint_handle.child( THIS_T.output_joint_blendshape_weights_ )
-            
-            out_joint_blendshape_weights_array_handle = None
-            try:
-                out_joint_blendshape_weights_array_handle = oM.MArrayDataHandle( out_joint_blendshape_weights_handle )
-            except:
-                logging.error("mde_py.poseblends_driver.output_from_node_data getting out_joint_blendshape_weights_array_handle")
-                stat = 0
-                return stat
-            
-            out_joint_blendshape_weights_array_builder = None
-            try:
-                out_joint_blendshape_weights_array_builder = out_joint_blendshape_weights_array_handle.builder()
-            except:
-                logging.error("mde_py.poseblends_driver.output_from_node_data creating out_joint_blendshape_weights_array_builder")
-                stat = 0
-                return stat
-            
-            current_blendshape_weights = joint_data[ii].blendshape_weights
-            # num_blendshape_weights immediately below should only ever be 9 for SMPL and its flavors,
-            # but we'll just use the size of the array to keep from hardcoding it
-            # in case in changes in the future:
-            # (which it did, to 4, when support for STAR was added)
-            num_blendshape_weights = len(current_blendshape_weights)
-            
-            for jj in range(0, num_blendshape_weights):
-                out_joint_blendshape_weight_handle = out_joint_blendshape_weights_array_builder.addElement(jj)
-                
-                current_value = current_blendshape_weights[jj]
-                
-                logging.debug("mde_py.poseblends_driver.output_from_node_data current_blendshape_weights[jj]:  {0}".format(current_value))
-                out_joint_blendshape_weight_handle.setDouble(current_value)
-                #out_joint_blendshape_weight_handle.setFloat(current_value)
+        if node.output_layout_changed():
+            return stat
+        
+        if not self.input_node_level_to_node_data(block):
+            return stat
+        
+        # a change of model affects every joint(and the number of 
+        # output weights):
+        if node.model_type != node.non_maya_data.solved_model_type:
+            return stat
         
-    
-                logging.debug("mde_py.poseblends_driver.output_from_node_data out_joint_blendshape_weight_handle.asDouble():  {0}".format(out_joint_blendshape_weight_handle.asDouble()))
-                #logging.debug("mde_py.poseblends_driver.output_from_node_data out_joint_blendshape_weight_handle.asFloat():  {0}".format(out_joint_blendshape_weight_handle.asFloat()))
-                
-                out_joint_blendshape_weight_handle.setClean()
-            #---------------------------------------------------------------------------------------
-            try:
-                out_joint_blendshape_weights_array_handle.set(out_joint_blendshape_weights_array_builder)
-            except:
-                logging.error("mde_py.poseblends_driver.output_from_node_data setting the out_joint_blendshape_weights_array_builder")
-                stat = 0
-                return stat
-            
-            try:    
-                out_joint_blendshape_weights_array_handle.setAllClean()
-            except:
-                logging.error("mde_py.poseblends_driver.output_from_node_data cleaning out_joint_blendshape_weights_array_handle")
-                stat = 0
-                return stat
-            
-            out_joint_handle.setClean()
-            
-        #---------------------------------------------------------------------------------------
         try:
-            output_joint_array_handle.set(output_joint_builder)
+            input_joint_handle = block.inputValue(
+                input_joint_plug.elementByLogicalIndex(logical_index)
+            )
         except:
-            logging.error("mde_py.poseblends_driver.output_from_node_data setting the output_joint_builder")
-            stat = 0
             return stat
-            
+        
+        self.input_joint_extractor(
+            joints_data,
+            joint_index,
+            input_joint_handle
+        )
+        stats.add_time('input', stage_start)
+        
+        stage_start = mtrace.clock()
+        node.calculate_joint(
+            joint_index
+        )
+        stats.add_time('calculate', stage_start)
+        
+        stage_start = mtrace.clock()
         try:
-            output_joint_array_handle.setAllClean()
+            output_joint_array_handle = block.outputArrayValue( THIS_T.output_joint_ )
         except:
-            logging.error("mde_py.poseblends_driver.output_from_node_data cleaning output_joint_array_handle")
-            stat = 0
             return stat
-            
-        logging.debug("mde_py.poseblends_driver.output_from_node_data:  END!!!")
-    
-        return stat
         
-
+        stat = self.update_output_joint(
+            output_joint_array_handle,
+            joint_index
+        )
+        stats.add_time('output', stage_start)
+        if not stat:
+            return stat
+        
+        block.setClean(plug)
+        
+        if mtrace.TRACE:
+            mtrace.debug('mde_poseblends_driver.compute_joint:  logical_index:  {0}, joint_index:  {1}', logical_index, joint_index)
+        
+        return stat
+    
     def compute(
         self, 
         plug, 
         block
     ):
-        logging.debug("mde_poseblends_driver.compute:  BEGIN!!!")
+        if mtrace.TRACE:
+            mtrace.debug("mde_poseblends_driver.compute:  BEGIN!!!")
 
         THIS_T = mde_py_poseblends_driver
         
-        logging.debug('mde_poseblends_driver.compute:  before is_output_plug:  ')
+        if mtrace.TRACE:
+            mtrace.debug('mde_poseblends_driver.compute:  before is_output_plug:  ')
         stat = 1
         if not THIS_T.is_output_plug(plug):
             return oM.kUnknownParameter
+        
+        if (plug == THIS_T.output_cache_hits_) or (plug == THIS_T.output_cache_misses_):
+            self.output_cache_statistics(
+                block
+            )
+            return stat
+        
+        if THIS_T.is_stats_plug(plug):
+            self.output_stats(
+                block
+            )
+            return stat
+        
+        # the global envelope(times scale) is zero?  Then nothing is read
+        # or solved(see compute_disabled()):
+        if self.input_node_level_to_node_data(block) and self.internal_node_data.is_disabled():
+            self.compute_disabled(
+                plug,
+                block
+            )
+            return stat
+        
+        self.internal_node_data.clear_zero_outputs()
+        
+        # Only one outputJoint element asked for(eg a blendShape pulling
+        # its weights one plug at a time)?  Then only read and solve
+        # that joint.  The other elements keep their values in the 
+        # datablock until they're dirtied and asked for themselves:
+        logical_index = THIS_T.get_requested_joint_logical_index(plug)
+        if logical_index is not None:
+            if mtrace.PROFILE:
+                compute_start = mtrace.clock()
+            
+            joint_stat = self.compute_joint(
+                plug,
+                block,
+                logical_index
+            )
+            
+            if mtrace.PROFILE:
+                mtrace.add_count('compute_joint', joint_stat)
+                mtrace.add_time('compute_joint', compute_start)
+            
+            if joint_stat:
+                self.stats.num_joint_computes += 1
+                self.output_stats(
+                    block
+                )
+                return stat
+            
+            # if the evaluation is here:  the single joint couldn't be
+            # done on its own(eg the joints changed since they were all
+            # last read), so fall through to computing all of them:
     
+        # (see mde_trace.py and the mde_py_poseblends_trace command
+        # for switching the compute stage timers on/off.  This node's
+        # own stats are always recorded, see mde_node_stats.py):
+        stats = self.stats
+        stats.num_computes += 1
+        profile = mtrace.PROFILE
+        if profile:
+            mtrace.add_count('compute')
+        compute_start = mtrace.clock()
         
-        logging.debug('mde_poseblends_driver.compute:  before input_to_node_data:  ')
+        if mtrace.TRACE:
+            mtrace.debug('mde_poseblends_driver.compute:  before input_to_node_data:  ')
         # STEP 1:  Get data off the Maya node(ie from the MDataBlock block)
         # and put it in internal_node_data:
         self.input_to_node_data(
             block
         )
         
-        logging.debug('mde_poseblends_driver.compute:  before self.internal_node_data.calculate():  ')
-        # STEP 2:  use internal_node_data to calculate the results:
-        self.internal_node_data.calculate()
+        stats.add_time('input', compute_start)
+        stats.num_zero_envelope_joints = self.internal_node_data.count_zero_envelope_joints()
+        if profile:
+            mtrace.add_time('compute.input', compute_start)
+        stage_start = mtrace.clock()
+        
+        if mtrace.TRACE:
+            mtrace.debug('mde_poseblends_driver.compute:  before self.internal_node_data.calculate():  ')
+        # STEP 2:  use internal_node_data to calculate the results(or
+        # get them from its result cache):
+        self.input_cache_settings_to_node_data(
+            block
+        )
+        self.calculate_or_restore(
+            block
+        )
+        
+        stats.add_time('calculate', stage_start)
+        if profile:
+            mtrace.add_time('compute.calculate', stage_start)
+        stage_start = mtrace.clock()
         
-        logging.debug('mde_poseblends_driver.compute:  before output_from_node_data():  ')
+        if mtrace.TRACE:
+            mtrace.debug('mde_poseblends_driver.compute:  before output_from_node_data():  ')
         # STEP 3:  output calculation results from internal_node_data 
-        # to MDataBlock block:
-        self.output_from_node_data(
+        # to MDataBlock block.  Only the output that was asked for is
+        # written:
+        self.output_requested_from_node_data(
+            THIS_T.get_requested_output(plug),
+            block
+        )
+        
+        stats.add_time('output', stage_start)
+        if profile:
+            mtrace.add_time('compute.output', stage_start)
+            mtrace.add_time('compute', compute_start)
+        
+        self.output_stats(
             block
         )
 
-        logging.debug("mde_poseblends_driver.deform:  END!!!")
+        if mtrace.TRACE:
+            mtrace.debug("mde_poseblends_driver.deform:  END!!!")
         return stat
  
+def get_live_instances():
+    # \return a list of the mde_py_poseblends_driver nodes in the scene:
+    result = []
+    for node in list(mde_py_poseblends_driver.instances):
+        node_handle = oM.MObjectHandle(node.thisMObject())
+        if not node_handle.isAlive():
+            continue
+        
+        result.append(node)
+    
+    return result
+ 
+def stats_report(
+    file_path = None
+):
+    # \return(and if file_path isn't None, write to file_path) a CSV 
+    # string of the stats of each mde_py_poseblends_driver node in the
+    # scene(see mde_node_stats.py), eg from the Script Editor:
+    #     import mde_py_poseblends_driver as mpbd
+    #     mpbd.stats_report('/tmp/poseblends_stats.csv')
+    named_stats = [(x.name(), x.stats) for x in get_live_instances()]
+    result = mns.to_csv(named_stats)
+    
+    if file_path is not None:
+        with open(file_path, 'w') as csv_file:
+            csv_file.write(result)
+    
+    return result
+ 
+def reset_stats():
+    for node in get_live_instances():
+        node.stats.reset()
+ 
+def memory_usage_report():
+    # Log, and return as a dictionary keyed on node name, the memory used
+    # by each mde_py_poseblends_driver node in the scene.
+    # eg from the Script Editor:
+    #     import mde_py_poseblends_driver as mpbd
+    #     mpbd.memory_usage_report()
+    result = {}
+    for node in get_live_instances():
+        node_name = node.name()
+        current_usage = node.memory_usage()
+        result.update({node_name:current_usage})
+        logging.info('{0}:  {1} bytes(non_maya:  {2})'.format(
+            node_name, 
+            current_usage['total'],
+            current_usage['non_maya']
+        ))
+    
+    return result
+ 
 def creator():
     return oMPx.asMPxPtr(mde_py_poseblends_driver())
  
+class mde_py_poseblends_trace(oMPx.MPxCommand):
+    # Runtime switch for the trace points and profile counters/timers in
+    # mde_trace.py, eg from MEL:
+    #     mde_py_poseblends_trace -profile on -reset;
+    #     // ...play back/scrub...
+    #     mde_py_poseblends_trace -report;
+    #     mde_py_poseblends_trace -profile off -trace off;
+    # -report returns(and logs) the mde_trace.report() string.
+    kCmdName = 'mde_py_poseblends_trace'
+    
+    kTraceFlag = '-t'
+    kTraceFlagLong = '-trace'
+    kProfileFlag = '-p'
+    kProfileFlagLong = '-profile'
+    kResetFlag = '-rs'
+    kResetFlagLong = '-reset'
+    kReportFlag = '-rp'
+    kReportFlagLong = '-report'
+    
+    def __init__(self):
+        oMPx.MPxCommand.__init__(self)
+    
+    def doIt(
+        self,
+        args
+    ):
+        THIS_T = mde_py_poseblends_trace
+        
+        arg_data = oM.MArgDatabase(self.syntax(), args)
+        
+        if arg_data.isFlagSet(THIS_T.kTraceFlag):
+            mtrace.set_trace(arg_data.flagArgumentBool(THIS_T.kTraceFlag, 0))
+        
+        if arg_data.isFlagSet(THIS_T.kProfileFlag):
+            mtrace.set_profile(arg_data.flagArgumentBool(THIS_T.kProfileFlag, 0))
+        
+        if arg_data.isFlagSet(THIS_T.kResetFlag):
+            mtrace.reset()
+        
+        if arg_data.isFlagSet(THIS_T.kReportFlag):
+            report = mtrace.report()
+            logging.info(report)
+            oMPx.MPxCommand.setResult(report)
+ 
+class mde_py_poseblends_stats(oMPx.MPxCommand):
+    # The per node stats of every mde_py_poseblends_driver in the scene
+    # as CSV(see stats_report()), eg from MEL:
+    #     mde_py_poseblends_stats -reset;
+    #     // ...play back/scrub...
+    #     mde_py_poseblends_stats -file "/tmp/poseblends_stats.csv";
+    # The CSV is always returned.  -reset is done after the report, so
+    # -file and -reset together start a new measurement.
+    kCmdName = 'mde_py_poseblends_stats'
+    
+    kFileFlag = '-f'
+    kFileFlagLong = '-file'
+    kResetFlag = '-rs'
+    kResetFlagLong = '-reset'
+    
+    def __init__(self):
+        oMPx.MPxCommand.__init__(self)
+    
+    def doIt(
+        self,
+        args
+    ):
+        THIS_T = mde_py_poseblends_stats
+        
+        arg_data = oM.MArgDatabase(self.syntax(), args)
+        
+        file_path = None
+        if arg_data.isFlagSet(THIS_T.kFileFlag):
+            file_path = arg_data.flagArgumentString(THIS_T.kFileFlag, 0)
+        
+        report = stats_report(file_path)
+        oMPx.MPxCommand.setResult(report)
+        
+        if arg_data.isFlagSet(THIS_T.kResetFlag):
+            reset_stats()
+ 
+def stats_cmd_creator():
+    return oMPx.asMPxPtr(mde_py_poseblends_stats())
+ 
+def stats_cmd_syntax_creator():
+    THIS_T = mde_py_poseblends_stats
+    
+    syntax = oM.MSyntax()
+    syntax.addFlag(THIS_T.kFileFlag, THIS_T.kFileFlagLong, oM.MSyntax.kString)
+    syntax.addFlag(THIS_T.kResetFlag, THIS_T.kResetFlagLong)
+    
+    return syntax
+ 
+def trace_cmd_creator():
+    return oMPx.asMPxPtr(mde_py_poseblends_trace())
+ 
+def trace_cmd_syntax_creator():
+    THIS_T = mde_py_poseblends_trace
+    
+    syntax = oM.MSyntax()
+    syntax.addFlag(THIS_T.kTraceFlag, THIS_T.kTraceFlagLong, oM.MSyntax.kBoolean)
+    syntax.addFlag(THIS_T.kProfileFlag, THIS_T.kProfileFlagLong, oM.MSyntax.kBoolean)
+    syntax.addFlag(THIS_T.kResetFlag, THIS_T.kResetFlagLong)
+    syntax.addFlag(THIS_T.kReportFlag, THIS_T.kReportFlagLong)
+    
+    return syntax
+ 
 def initialize():
-    logging.debug("mde_poseblends_driver.initialize:  BEGIN!!!")
+    if mtrace.TRACE:
+        mtrace.debug("mde_poseblends_driver.initialize:  BEGIN!!!")
     
     THIS_T = mde_py_poseblends_driver
     # local attribute initialization
@@ -434,6 +1597,7 @@ def initialize():
     eAttr = oM.MFnEnumAttribute()
     mAttr = oM.MFnMatrixAttribute()
     cAttr = oM.MFnCompoundAttribute()
+    tAttr = oM.MFnTypedAttribute()
     
     # input_attrs:
     #----------------------------------------------------inputEnvelope:
@@ -677,12 +1841,153 @@ def initialize():
     cAttr.setArray(True)
     cAttr.setUsesArrayDataBuilder(True)
     
+    #----------------------------------------------outputPackedWeights:
+    #output_packed_weights:  every weight of the node in one doubleArray.
+    #  Weight w of inputJoint[j] is at num_weights * j + w(9 for SMPL,
+    #  4 for STAR), ie the same layout as the pose blendShape targets.
+    #  For anything that can read all the weights as a single block.
+    attrLong = "outputPackedWeights"
+    attrShort = "outPackedWeights"
+    
+    # collect the attrLong name for error reporting:
+    THIS_T.output_attr_long_names.append(attrLong)
+    
+    THIS_T.output_packed_weights_ = tAttr.create( 
+        attrLong, 
+        attrShort,
+        oM.MFnData.kDoubleArray
+    )
+    tAttr.setStorable(False)
+    tAttr.setReadable(True)
+    tAttr.setWritable(False)
+    
+    #-----------------------------------------------------outputWeight:
+    #output_weight:  a flat array of doubles, with the same layout as 
+    #  outputPackedWeights.  Each element connects straight to the 
+    #  blendShape weight with the same index(see 
+    #  mde_poseblends_driver_ops.create_and_connect(mode = 2)).
+    attrLong = "outputWeight"
+    attrShort = "outWeight"
+    
+    # collect the attrLong name for error reporting:
+    THIS_T.output_attr_long_names.append(attrLong)
+    
+    THIS_T.output_weight_ = nAttr.create( 
+        attrLong, 
+        attrShort, 
+        oM.MFnNumericData.kDouble, 
+        0.0
+    )
+    nAttr.setArray(True)
+    nAttr.setStorable(False)
+    nAttr.setReadable(True)
+    nAttr.setWritable(False)
+    nAttr.setUsesArrayDataBuilder(True)
+    
+    #-----------------------------------------------inputCacheCapacity:
+    #input_cache_capacity:  the maximum number of computes whose results
+    #  are kept, keyed on the evaluation time and the inputs(see 
+    #  mde_result_cache.py).  0(the default):  no cache.
+    attrLong = "inputCacheCapacity"
+    attrShort = "inCacheCapacity"
+    
+    # collect the attrLong name for error reporting:
+    THIS_T.input_attr_long_names.append(attrLong)
+    
+    THIS_T.input_cache_capacity_ = nAttr.create( 
+        attrLong, 
+        attrShort, 
+        oM.MFnNumericData.kInt, 
+        0
+    )
+    nAttr.setMin(0)
+    nAttr.setStorable(True)
+    
+    #-----------------------------------------------inputCacheEviction:
+    attrLong = "inputCacheEviction"
+    attrShort = "inCacheEviction"
+    
+    # collect the attrLong name for error reporting:
+    THIS_T.input_attr_long_names.append(attrLong)
+    
+    THIS_T.input_cache_eviction_ = eAttr.create( 
+        attrLong, 
+        attrShort, 
+        0
+    )
+    eAttr.addField("LRU", 0)
+    eAttr.addField("FIFO", 1)
+    eAttr.setStorable(True)
+    
+    #-----------------------------------------outputCacheHits/Misses:
+    #output_cache_hits/output_cache_misses:  the result cache's 
+    #  statistics, since the node was created:
+    cache_statistics_attr_names = (
+        ("outputCacheHits", "outCacheHits"),
+        ("outputCacheMisses", "outCacheMisses"),
+    )
+    cache_statistics_attrs = []
+    for attrLong, attrShort in cache_statistics_attr_names:
+        # collect the attrLong name for error reporting:
+        THIS_T.output_attr_long_names.append(attrLong)
+        
+        current_attr = nAttr.create( 
+            attrLong, 
+            attrShort, 
+            oM.MFnNumericData.kInt, 
+            0
+        )
+        nAttr.setStorable(False)
+        nAttr.setReadable(True)
+        nAttr.setWritable(False)
+        cache_statistics_attrs.append(current_attr)
+    
+    THIS_T.output_cache_hits_ = cache_statistics_attrs[0]
+    THIS_T.output_cache_misses_ = cache_statistics_attrs[1]
+    
+    #---------------------------------------------------outputStat*:
+    #output_stats:  this node's compute counts and stage times(in 
+    #  seconds), one attribute per mde_node_stats.node_stats.FIELDS value:
+    stats_attr_names = (
+        ("outputStatComputes", "outStatComputes", oM.MFnNumericData.kInt),
+        ("outputStatJointComputes", "outStatJointComputes", oM.MFnNumericData.kInt),
+        ("outputStatInputTime", "outStatInputTime", oM.MFnNumericData.kDouble),
+        ("outputStatInputLastTime", "outStatInputLastTime", oM.MFnNumericData.kDouble),
+        ("outputStatCalculateTime", "outStatCalculateTime", oM.MFnNumericData.kDouble),
+        ("outputStatCalculateLastTime", "outStatCalculateLastTime", oM.MFnNumericData.kDouble),
+        ("outputStatOutputTime", "outStatOutputTime", oM.MFnNumericData.kDouble),
+        ("outputStatOutputLastTime", "outStatOutputLastTime", oM.MFnNumericData.kDouble),
+        ("outputStatZeroEnvelopeJoints", "outStatZeroEnvelopeJoints", oM.MFnNumericData.kInt),
+    )
+    for attrLong, attrShort, attrType in stats_attr_names:
+        # collect the attrLong name for error reporting:
+        THIS_T.output_attr_long_names.append(attrLong)
+        
+        current_attr = nAttr.create( 
+            attrLong, 
+            attrShort, 
+            attrType, 
+            0
+        )
+        nAttr.setStorable(False)
+        nAttr.setReadable(True)
+        nAttr.setWritable(False)
+        THIS_T.output_stats_.append(current_attr)
+    
     #----------------------------------------------------addAttributes:
     # addAttributes:
     THIS_T.addAttribute( THIS_T.input_envelope_)
     THIS_T.addAttribute( THIS_T.input_model_type_)
     THIS_T.addAttribute( THIS_T.input_joint_)
     THIS_T.addAttribute( THIS_T.output_joint_)
+    THIS_T.addAttribute( THIS_T.output_packed_weights_)
+    THIS_T.addAttribute( THIS_T.output_weight_)
+    THIS_T.addAttribute( THIS_T.input_cache_capacity_)
+    THIS_T.addAttribute( THIS_T.input_cache_eviction_)
+    THIS_T.addAttribute( THIS_T.output_cache_hits_)
+    THIS_T.addAttribute( THIS_T.output_cache_misses_)
+    for current_attr in THIS_T.output_stats_:
+        THIS_T.addAttribute( current_attr)
     
     #-------------------------------------------------attributeAffects:
     # attributeAffects:
@@ -690,18 +1995,27 @@ def initialize():
     # outer loop.  It makes it easier to add more attributes in the 
     # future, and is way better than the explosion of boilerplate code
     # that results by writing out every attributeAffects by hand:
+    #
+    # inputJoint and its children are only included if 
+    # fine_grained_dirty is off.  Otherwise:  their dirtying of only 
+    # the matching outputJoint element is done by setDependentsDirty():
+    THIS_T.fine_grained_dirty = (os.environ.get(THIS_T.FINE_GRAINED_DIRTY_ENV_VAR, '0') not in ('', '0'))
+    
     THIS_T.input_attrs.append( THIS_T.input_envelope_ )
     THIS_T.input_attrs.append( THIS_T.input_model_type_ )
-    THIS_T.input_attrs.append( THIS_T.input_joint_ )
-    THIS_T.input_attrs.append( THIS_T.input_joint_envelope_ )
-    THIS_T.input_attrs.append( THIS_T.input_joint_matrix_mode_ )
-    THIS_T.input_attrs.append( THIS_T.input_joint_matrix_ )
-    THIS_T.input_attrs.append( THIS_T.input_joint_world_matrix_ )
-    THIS_T.input_attrs.append( THIS_T.input_joint_world_parent_matrix_ )
-    THIS_T.input_attrs.append( THIS_T.input_joint_world_parent_inverse_matrix_ )
+    if not THIS_T.fine_grained_dirty:
+        THIS_T.input_attrs.append( THIS_T.input_joint_ )
+        THIS_T.input_attrs.append( THIS_T.input_joint_envelope_ )
+        THIS_T.input_attrs.append( THIS_T.input_joint_matrix_mode_ )
+        THIS_T.input_attrs.append( THIS_T.input_joint_matrix_ )
+        THIS_T.input_attrs.append( THIS_T.input_joint_world_matrix_ )
+        THIS_T.input_attrs.append( THIS_T.input_joint_world_parent_matrix_ )
+        THIS_T.input_attrs.append( THIS_T.input_joint_world_parent_inverse_matrix_ )
     
     THIS_T.output_attrs.append( THIS_T.output_joint_ )
     THIS_T.output_attrs.append( THIS_T.output_joint_blendshape_weights_ )
+    THIS_T.output_attrs.append( THIS_T.output_packed_weights_ )
+    THIS_T.output_attrs.append( THIS_T.output_weight_ )
   
     num_input_attrs = len(THIS_T.input_attrs)
     num_output_attrs = len(THIS_T.output_attrs)
@@ -720,7 +2034,8 @@ def initialize():
                 stat = 0
                 return stat
                 
-    logging.debug("mde_poseblends_driver.initialize:  END!!!")
+    if mtrace.TRACE:
+        mtrace.debug("mde_poseblends_driver.initialize:  END!!!")
 
     return stat
     
@@ -736,6 +2051,24 @@ def initializePlugin(obj):
         )
     except:
         raise RuntimeError('Failed to register node')
+    
+    try:
+        plugin.registerCommand(
+            mde_py_poseblends_trace.kCmdName,
+            trace_cmd_creator,
+            trace_cmd_syntax_creator
+        )
+    except:
+        raise RuntimeError('Failed to register command:  {0}'.format(mde_py_poseblends_trace.kCmdName))
+    
+    try:
+        plugin.registerCommand(
+            mde_py_poseblends_stats.kCmdName,
+            stats_cmd_creator,
+            stats_cmd_syntax_creator
+        )
+    except:
+        raise RuntimeError('Failed to register command:  {0}'.format(mde_py_poseblends_stats.kCmdName))
  
     mde_py_poseblends_driver.plugin_path = plugin.loadPath()
     
@@ -747,3 +2080,17 @@ def uninitializePlugin(obj):
         )
     except:
         raise RuntimeError('Failed to register node')
+    
+    try:
+        plugin.deregisterCommand(
+            mde_py_poseblends_trace.kCmdName
+        )
+    except:
+        raise RuntimeError('Failed to deregister command:  {0}'.format(mde_py_poseblends_trace.kCmdName))
+    
+    try:
+        plugin.deregisterCommand(
+            mde_py_poseblends_stats.kCmdName
+        )
+    except:
+        raise RuntimeError('Failed to deregister command:  {0}'.format(mde_py_poseblends_stats.kCmdName))
@@ -0,0 +1,142 @@
+import collections
+import enum
+import sys
+
+# mde_result_cache:
+# A small, bounded cache of compute results for mde_py_poseblends_driver.
+# When animators scrub back and forth over the same frames, the node
+# sees the same inputs at the same times again and again.  With the
+# cache on, node_data keys each compute on:
+#     (evaluation time, the inputs it read)
+# and a hit restores the stored weights instead of solving
+# (see node_data.restore_cached_result()/store_cached_result()).
+#
+# It has no Maya dependencies, like lib_mde_poseblends_driver.py.
+
+@enum.unique
+class eviction_policy_t(enum.IntEnum):
+    # kLRU:  evict the least recently USED entry(a hit refreshes it).
+    # kFIFO:  evict the oldest entry, hits or not.
+    kLRU = 0
+    kFIFO = 1
+
+
+class result_cache(object):
+    EVICTION_POLICY_T = eviction_policy_t
+
+    __slots__ = (
+        'capacity',
+        'eviction_policy',
+        'entries',
+        'num_hits',
+        'num_misses',
+        'num_evictions',
+    )
+
+    def __init__(
+        self,
+        capacity = 0,
+        eviction_policy = eviction_policy_t.kLRU
+    ):
+        # capacity:  the maximum number of entries.  0:  the cache is off.
+        self.capacity = capacity
+        self.eviction_policy = eviction_policy
+
+        # entries:  key -> value, oldest(or least recently used) first:
+        self.entries = collections.OrderedDict()
+
+        # STATISTICS:
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_evictions = 0
+
+    def is_enabled(
+        self
+    ):
+        return self.capacity > 0
+
+    def set_capacity(
+        self,
+        capacity
+    ):
+        # no-op unless capacity changed.  Shrinking evicts the extra entries:
+        capacity = max(0, capacity)
+        if capacity == self.capacity:
+            return
+
+        self.capacity = capacity
+        self.evict()
+
+    def set_eviction_policy(
+        self,
+        eviction_policy
+    ):
+        self.eviction_policy = result_cache.EVICTION_POLICY_T(eviction_policy)
+
+    def get(
+        self,
+        key
+    ):
+        # \return the value stored for key, or None(a miss):
+        value = self.entries.get(key)
+        if value is None:
+            self.num_misses += 1
+            return None
+
+        self.num_hits += 1
+        if self.eviction_policy == eviction_policy_t.kLRU:
+            self.entries.move_to_end(key)
+
+        return value
+
+    def put(
+        self,
+        key,
+        value
+    ):
+        if self.capacity <= 0:
+            return
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def evict(
+        self
+    ):
+        # drop the oldest entries until there's at most capacity of them:
+        entries = self.entries
+        while len(entries) > self.capacity:
+            entries.popitem(last = False)
+            self.num_evictions += 1
+
+    def clear(
+        self
+    ):
+        # drop every entry(eg when the inputs' layout changed), keeping
+        # the statistics:
+        self.entries.clear()
+
+    def reset_statistics(
+        self
+    ):
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_evictions = 0
+
+    def memory_usage(
+        self,
+        value_size
+    ):
+        # \param[in] value_size:  a function returning the approximate
+        # number of bytes of one value.
+        # \return the approximate number of bytes used by the entries,
+        # including the items of tuple keys(eg node_data's input bytes):
+        result = sys.getsizeof(self.entries)
+        for key, value in self.entries.items():
+            result += sys.getsizeof(key)
+            if isinstance(key, tuple):
+                result += sum([sys.getsizeof(x) for x in key])
+            result += value_size(value)
+
+        return result
@@ -0,0 +1,119 @@
+import logging
+import os
+import time
+
+# mde_trace:
+# Tracing and profiling for mde_py_poseblends_driver that costs(next to)
+# nothing while it is switched off.
+#
+# Trace points in the hot paths look like:
+#     if mtrace.TRACE:
+#         mtrace.debug('joint_io.calculate_SMPL():  combined_scale:  {0}', combined_scale)
+# and profile points like:
+#     if mtrace.PROFILE:
+#         start = mtrace.clock()
+#     ...
+#     if mtrace.PROFILE:
+#         mtrace.add_time('node_data.calculate', start)
+#         mtrace.add_count('joints_solved', num_dirty_joints)
+# So:  when they're switched off, each point is a single module attribute
+# lookup and a branch.  The message is never formatted, and its
+# arguments(which can be whole lists of matrix values) are never built.
+#
+# TRACE/PROFILE can be switched at runtime with set_trace()/set_profile(),
+# from inside Maya with the mde_py_poseblends_trace command(see
+# mde_py_poseblends_driver.py), or at startup with the
+# MDE_PY_POSEBLENDS_TRACE/MDE_PY_POSEBLENDS_PROFILE environment variables.
+TRACE_ENV_VAR = 'MDE_PY_POSEBLENDS_TRACE'
+PROFILE_ENV_VAR = 'MDE_PY_POSEBLENDS_PROFILE'
+
+TRACE = os.environ.get(TRACE_ENV_VAR, '0') not in ('', '0')
+PROFILE = os.environ.get(PROFILE_ENV_VAR, '0') not in ('', '0')
+
+clock = time.perf_counter
+
+# counters:  name -> count
+counters = {}
+
+# timers:  name -> [number of calls, total seconds, last call seconds]
+timers = {}
+
+
+def set_trace(
+    on = True
+):
+    # TRACE:  send the trace point messages to logging.debug():
+    global TRACE
+    TRACE = bool(on)
+
+
+def set_profile(
+    on = True
+):
+    # PROFILE:  record the named counters and timers:
+    global PROFILE
+    PROFILE = bool(on)
+
+
+def debug(
+    message,
+    *args
+):
+    # only called from behind an "if mtrace.TRACE:" guard, so this is
+    # where the formatting happens:
+    logging.debug(message.format(*args))
+
+
+def add_count(
+    name,
+    num = 1
+):
+    counters[name] = counters.get(name, 0) + num
+
+
+def add_time(
+    name,
+    start
+):
+    # add the time since start(a clock() value) to the name timer:
+    elapsed = clock() - start
+
+    timer = timers.get(name)
+    if timer is None:
+        timer = [0, 0.0, 0.0]
+        timers[name] = timer
+
+    timer[0] += 1
+    timer[1] += elapsed
+    timer[2] = elapsed
+
+    return elapsed
+
+
+def reset():
+    counters.clear()
+    timers.clear()
+
+
+def report():
+    # \return a human readable, multi-line string of all counters and timers.
+    lines = []
+    lines.append('mde_trace:  TRACE:  {0}, PROFILE:  {1}'.format(TRACE, PROFILE))
+
+    for name in sorted(timers.keys()):
+        num_calls, total, last = timers[name]
+        average = total / num_calls if num_calls else 0.0
+        lines.append('timer {0}:  calls:  {1}, total:  {2:.6f}s, average:  {3:.6f}s, last:  {4:.6f}s'.format(
+            name,
+            num_calls,
+            total,
+            average,
+            last
+        ))
+
+    for name in sorted(counters.keys()):
+        lines.append('counter {0}:  {1}'.format(name, counters[name]))
+
+    result = '\n'.join(lines)
+
+    return result
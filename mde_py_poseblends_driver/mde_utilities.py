@@ -18,10 +18,8 @@ def resize(
 	if(num_list == new_size):
 		return
 	elif(num_list < new_size):
-		for ii in range(num_list, new_size):
-			arg_list.append(None)
+		# grow in one step rather than one append() per new element:
+		arg_list.extend([None] * (new_size - num_list))
 	else:
 		# num_list > new_size
-		for ii in range(new_size, num_list):
-			arg_list.pop()
-		
+		del arg_list[new_size:]
@@ -1,9 +1,9 @@
-import enum
-import logging
-
-import maya.OpenMaya as oM
+import array
+import sys
 
 import lib_mde_poseblends_driver as mlpbd
+import mde_result_cache as mrc
+import mde_trace as mtrace
 import mde_utilities as utils
 
 # node_data:
@@ -17,170 +17,56 @@ import mde_utilities as utils
 # Hopefully in the future:  lib_mde_poseblends_driver.py can be 
 # replaced by a PyBind wrapper around 
 # the existing C++ lib_mde_poseblends_driver.h
-class from_Maya_to_Non_Maya(object):
-    NON_MAYA_DATA_T = mlpbd.poseblends_driver_data
-    NON_MAYA_JOINT_DATA_T = NON_MAYA_DATA_T.JOINT_IO_DATA_T
-    XFORM_MATRIX_T = NON_MAYA_JOINT_DATA_T.XFORM_MATRIX_T 
-    
-    # Convert from Maya MMatrix to whatever is being used for Non-Maya representation
-    # (currently:  the Non-Maya representation is also MMatrix, so the conversion is just assignment):
-    # \param[in] source:  the Maya MMatrix(4x4 homogeneous transform matrix) to convert.
-    # \param[out] dest:  the Maya MMatrix(4x4 homogeneous transform matrix) to convert.
-    # \return an int:  0:  fail, 1:  success
-    
-    @staticmethod
-    def do_it(
-        source,
-        dest
-    ):
-        stat = 1
-        
-        # assume dest is a list so the result can be passed back by reference:
-        utils.resize(dest, 1)
-        
-        # they're(ie both Maya and Non-Maya) currently both MMatrix, so just use assignment:
-        dest[0] = source
-        
-        return stat
-        
-
-class maya_per_joint_data(object):
+class maya_joint_data_ops(object):
+    # The mde_py_poseblends_driver node reads its input_joint_ elements
+    # straight into the per-joint storage the solver uses(ie the 
+    # joint_io_data of node_data.non_maya_data, whose matrices live in
+    # one flat array('d') buffer, see lib_mde_poseblends_driver.py).
+    # So:  there's no separate Maya-centric copy of the joint data to
+    # convert every compute.  The only per-compute work is copying the
+    # 16 values of each MMatrix read into that buffer, which also tells
+    # the joint whether it needs to be re-solved.
     NON_MAYA_DATA_T = mlpbd.poseblends_driver_data
     JOINT_IO_DATA_T = NON_MAYA_DATA_T.JOINT_IO_DATA_T 
     JOINT_MATRIX_MODE_T = JOINT_IO_DATA_T.JOINT_MATRIX_MODE_T
-    #XFORM_MATRIX_T = oM.MFloatMatrix
-    XFORM_MATRIX_T = oM.MMatrix
-    
-    def __init__(self):
-        THIS_T = maya_per_joint_data
-        
-        self.envelope = 1.0
-        self.matrix_mode = THIS_T.JOINT_MATRIX_MODE_T.LOCAL
-        
-        MATRIX_T = THIS_T.XFORM_MATRIX_T
-        self.matrix = MATRIX_T()
-        self.world_matrix = MATRIX_T()
-        self.world_parent_matrix = MATRIX_T()
-        self.world_parent_inverse_matrix = MATRIX_T()
-        
-        self.matrix.setToIdentity()
-        self.world_matrix.setToIdentity()
-        self.world_parent_matrix.setToIdentity()
-        self.world_parent_inverse_matrix.setToIdentity()
-
-
-class convert_per_joint_from_maya_to_non_maya(object):
-    # convert_per_joint_from_maya_to_non_maya:  what does this mean?
-    # This class contains procedure that have to do with operations
-    # that involve Maya-centric and non-Maya-centric versions
-    # of per-joint storage.  For example:  converting from one 
-    # format to the other.
-    NODE_T = mlpbd.poseblends_driver
-    JOINT_IO_DATA_T = NODE_T.JOINT_IO_DATA_T
-    NON_MAYA_JOINT_DATA_T = JOINT_IO_DATA_T 
-    # ^ NON_MAYA_JOINT_DATA_T because it is (potentially) non-Maya-centric
     
-    MAYA_JOINT_DATA_T = maya_per_joint_data
-    # ^ MAYA_JOINT_DATA because it is Maya-centric
+    # scratch storage for set_matrix_slot_from_MMatrix():
+    scratch_values = array.array('d', [0.0]) * JOINT_IO_DATA_T.MATRIX_SIZE
     
-    DATA_T = MAYA_JOINT_DATA_T 
-    # ^ DATA_T because it is the data associated with this operations class.
-    
-    JOINT_MATRIX_MODE_T = MAYA_JOINT_DATA_T.JOINT_MATRIX_MODE_T 
-    
-    # Depending on the value of source.matrix_mode:
-    # convert only the matrices of source that need to be converted
-    # to fill the appropriate, matching matrices of dest.
-    # \param[in] source:  MAYA_JOINT_DATA_T, the Maya MMatrix-storing version as read in from the mde_poseblends_driver node's input attributes.
-    # \param[out] dest:  NON_MAYA_JOINT_DATA_T:  the non-Maya-centric JOINT_IO_DATA_T defined in mlpbd.
-    # \return an int:  0:  fail, 1:  success
+    # Copy a Maya MMatrix into one of the matrix slots of joint_data.
+    # \param[in,out] joint_data:  the JOINT_IO_DATA_T to write to.
+    # \param[in] slot:  JOINT_IO_DATA_T.*_MATRIX_SLOT
+    # \param[in] maya_matrix:  the MMatrix, eg from MDataHandle.asMatrix().
+    # \return True if the stored value changed(and so joint_data was 
+    # marked dirty), False otherwise.
     
     @staticmethod
-    def __call__(
-        source,
-        dest
+    def set_matrix_slot_from_MMatrix(
+        joint_data,
+        slot,
+        maya_matrix
     ):
-        logging.debug('convert_per_joint_from_maya_to_non_maya.__call__():  source:  {0}'.format(source))
-        logging.debug('convert_per_joint_from_maya_to_non_maya.__call__():  dest:  {0}'.format(dest))
-        stat = 1
-        
-        source_members_exhaustive = dir(source)
-        dest_members_exhaustive = dir(dest)
-        source_members = [attr for attr in source_members_exhaustive if not callable(getattr(source, attr)) and not attr.startswith("__")]
-        dest_members = [attr for attr in dest_members_exhaustive if not callable(getattr(dest, attr)) and not attr.startswith("__")]
-        
-        logging.debug('convert_per_joint_from_maya_to_non_maya.__call__():  source_members_exhaustive:  {0}'.format(source_members_exhaustive))
-        logging.debug('convert_per_joint_from_maya_to_non_maya.__call__():  dest_members_exhaustive:  {0}'.format(dest_members_exhaustive))
-        logging.debug('convert_per_joint_from_maya_to_non_maya.__call__():  source_members:  {0}'.format(source_members))
-        logging.debug('convert_per_joint_from_maya_to_non_maya.__call__():  dest_members:  {0}'.format(dest_members))
-        
-        # envelope:
-        dest.envelope = source.envelope
-        
-        # matrix_mode:
-        matrix_mode_value = source.matrix_mode
-        dest.matrix_mode = matrix_mode_value
-        
-        m2nm_convert = lambda x, y:  from_Maya_to_Non_Maya.do_it(x, y)
-        
-        MATRIX_MODE_T = convert_per_joint_from_maya_to_non_maya.JOINT_MATRIX_MODE_T
-        # only convert the data that will be used in the actual calculation
-        # based on the matrix_mode_value:
-        conversion_result = [None]
-        if(matrix_mode_value == MATRIX_MODE_T.LOCAL):
-            # only convert the LOCAL-space:
-            # source.matrix -> dest.matrix
-            # because we assume by the choice of matrix_mode_value
-            # that the user has set this to exactly what they want.
-            m2nm_convert(
-                source.matrix,
-                conversion_result
-            )
-            dest.matrix = conversion_result[0]
-        elif (matrix_mode_value == MATRIX_MODE_T.WORLD):
-            # This will create a LOCAL matrix internally by
-            # taking the inverse of world_parent_matrix and multiplying
-            # with world_matrix.
-            # So:  those are the two matrices to convert.
-            m2nm_convert(
-                source.world_matrix,
-                conversion_result
-            )
-            dest.world_matrix = conversion_result[0]
-            
-            m2nm_convert(
-                source.world_parent_matrix, 
-                conversion_result
-            )
-            dest.world_parent_matrix = conversion_result[0]
-            
-        else: # (matrix_mode_value == MATRIX_MODE_T.WORLDwInv)
-            # This will create a LOCAL matrix internally by
-            # multiplying world_parent_inverse_matrix
-            # with world_matrix.
-            # So:  those are the two matrices to convert.
-            m2nm_convert(
-                source.world_matrix, 
-                conversion_result
-            )
-            dest.world_matrix = conversion_result[0]
-            
-            m2nm_convert(
-                source.world_parent_inverse_matrix, 
-                conversion_result
-            )
-            dest.world_parent_inverse_matrix = conversion_result[0]
+        values = maya_joint_data_ops.scratch_values
+        for ii in range(0, 4):
+            for jj in range(0, 4):
+                values[4 * ii + jj] = maya_matrix(ii, jj)
+        
+        result = joint_data.update_matrix_slot_values(
+            slot,
+            values
+        )
         
-        return stat
+        return result
+
 
 class node_data(object):
     NON_MAYA_DATA_T = mlpbd.poseblends_driver_data 
     JOINT_IO_DATA_T = NON_MAYA_DATA_T.JOINT_IO_DATA_T 
     JOINT_MATRIX_MODE_T = JOINT_IO_DATA_T.JOINT_MATRIX_MODE_T 
     NON_MAYA_OPS_T = mlpbd.poseblends_driver 
-    MAYA_PER_JOINT_DATA_T = maya_per_joint_data 
-    CONVERTOR_T = convert_per_joint_from_maya_to_non_maya 
+    MAYA_JOINT_DATA_OPS_T = maya_joint_data_ops 
     MODEL_T = NON_MAYA_DATA_T.MODEL_T 
+    RESULT_CACHE_T = mrc.result_cache
     
     def __init__(
         self, 
@@ -190,88 +76,315 @@ class node_data(object):
         self.model_type = node_data.MODEL_T.kSMPL
         
         # read-in info from input attributes:
-        self.maya_joint_data = list()
         self.joint_logical_indices = list()
         
-        # WIP Data:  This data should be completely independent of 
-        # Maya-centric types:
+        # joint_array_indices:  logical index -> index in joints_data.
+        # The inverse of joint_logical_indices, as of the last read of 
+        # all the input joints(see update_joint_array_indices()):
+        self.joint_array_indices = dict()
+        
+        # OUTPUT CACHE:  what was last written to the output attributes,
+        # so only the values that changed get written(see 
+        # output_layout_changed() and mde_py_poseblends_driver.output_from_node_data()):
+        # output_logical_indices:  the outputJoint logical indices.
+        # output_num_weights:  the number of weights of each of those.
+        # output_weights:  the weight values, MAX_NUM_WEIGHTS per joint.
+        self.output_logical_indices = list()
+        self.output_num_weights = list()
+        self.output_weights = array.array('d')
+        
+        # PACKED OUTPUT CACHE:  the same, for the flat outputWeight 
+        # attribute(see get_packed_weight_indices()):
+        # packed_output_indices:  the outputWeight logical indices.
+        # packed_output_weights:  the weight values written to them.
+        self.packed_output_indices = list()
+        self.packed_output_weights = array.array('d')
+        
+        # RESULT CACHE:  the weights of earlier computes, keyed on 
+        # get_cache_key().  Off(ie capacity 0) unless the node's 
+        # cacheCapacity is set:
+        self.result_cache = node_data.RESULT_CACHE_T()
+        
+        # ZERO OUTPUTS:  while the node is disabled(see is_disabled()),
+        # the outputs(eg 'joint', 'packed', 'weight') already written as 
+        # all zeros, for the output layout they were written with:  
+        # zero_output_model_type(ie the number of weights per joint) and
+        # zero_output_logical_indices(the inputJoint elements).  Cleared
+        # by the next compute that isn't disabled(see clear_zero_outputs()):
+        self.zero_outputs = set()
+        self.zero_output_model_type = None
+        self.zero_output_logical_indices = None
+        
+        # The per-joint inputs are read directly into non_maya_data's
+        # joints_data(see maya_joint_data_ops).  This data should be
+        # completely independent of Maya-centric types:
         self.non_maya_data = node_data.NON_MAYA_DATA_T()
     
+    @property
+    def joints_data(
+        self
+    ):
+        # the per-joint data the input attributes are read into:
+        return self.non_maya_data.joints_data
+    
     def resize_inputs(
         self,
         num_joints
     ):
+        # Size the per-joint storage for num_joints input joints.
+        # Call this before reading the input joints into joints_data:
+        # it's a no-op unless the number of joints changed.
         stat = 1
         
-        utils.resize(self.maya_joint_data, num_joints)
+        self.non_maya_data.init_joints_data(
+            num_joints
+        )
         utils.resize(self.joint_logical_indices, num_joints)
         
         return stat
     
-    def set_per_joint_data_from_Maya_to_non_Maya(
+    def update_joint_array_indices(
+        self
+    ):
+        # call after all the input joints have been read in:
+        num_joints = len(self.non_maya_data.joints_data)
+        
+        self.joint_array_indices = dict(
+            (self.joint_logical_indices[ii], ii) for ii in range(0, num_joints)
+        )
+    
+    def get_joint_array_index(
         self,
-        joint_index
+        logical_index
     ):
-        # this->maya_joint_data is filled from mde_poseblends_driver's input attributes.
-        # maya_joint_data contains Maya centric storage(ie MMatrix, for example).
-        # 
-        # This method fills this->non_maya_data from the values 
-        # stored in this->maya_joint_data.
-        # 
-        # This method is the version that just operates on a particular
-        # joint, the one at joint_index.
-        stat = 1
+        # \return the index in joints_data of the joint read from the
+        # input_joint_ element at logical_index, or None if that element
+        # wasn't there at the last read of all the input joints:
+        return self.joint_array_indices.get(logical_index)
+    
+    def output_layout_changed(
+        self
+    ):
+        # \return True if the outputs have to be rebuilt, ie the joints
+        # or their number of weights aren't the same as they were at the
+        # last set_output_layout().  False if the existing output 
+        # elements can just be updated.
+        joints_data = self.non_maya_data.joints_data
+        num_joints = len(joints_data)
+        
+        if len(self.output_logical_indices) != num_joints:
+            return True
         
-        logging.debug('len(self.maya_joint_data):  {0}'.format(len(self.maya_joint_data)))
-        logging.debug('len(self.non_maya_data.joints_data):  {0}'.format(len(self.non_maya_data.joints_data)))
-        logging.debug('self.maya_joint_data:  {0}'.format(self.maya_joint_data))
-        logging.debug('self.non_maya_data.joints_data:  {0}'.format(self.non_maya_data.joints_data))
-        maya_source = self.maya_joint_data[joint_index]
+        if self.output_logical_indices != self.joint_logical_indices[0:num_joints]:
+            return True
         
-        if(self.non_maya_data.joints_data[joint_index] is None):
-            self.non_maya_data.joints_data[joint_index] = node_data.JOINT_IO_DATA_T()
+        output_num_weights = self.output_num_weights
+        for ii in range(0, num_joints):
+            if len(joints_data[ii].blendshape_weights) != output_num_weights[ii]:
+                return True
         
-        non_maya_dest = self.non_maya_data.joints_data[joint_index]
+        return False
+    
+    def set_output_layout(
+        self
+    ):
+        # remember the current joints and number of weights as the
+        # output layout, with the current weights as the written values:
+        JOINT_IO_DATA_T = node_data.JOINT_IO_DATA_T
         
-        logging.debug('maya_source:  {0}'.format(maya_source))
-        logging.debug('non_maya_dest:  {0}'.format(non_maya_dest))
+        joints_data = self.non_maya_data.joints_data
+        num_joints = len(joints_data)
         
-        convert = node_data.CONVERTOR_T()
-        convert(
-            maya_source, 
-            non_maya_dest
-        )
+        self.output_logical_indices = self.joint_logical_indices[0:num_joints]
+        self.output_num_weights = [len(x.blendshape_weights) for x in joints_data]
         
-        return stat
+        # joints_data's weights_buffer has the same MAX_NUM_WEIGHTS per
+        # joint layout as output_weights:
+        num_values = num_joints * JOINT_IO_DATA_T.MAX_NUM_WEIGHTS
+        self.output_weights = array.array('d', self.non_maya_data.weights_buffer[0:num_values])
     
+    def get_packed_weight_indices(
+        self
+    ):
+        # \return the packed index of every weight, in joints_data order.
+        # Weight w of the joint read from inputJoint[j] is at 
+        # num_weights * j + w, which is the same layout as the pose
+        # blendShape targets(see outputWeight/outputPackedWeights in 
+        # mde_py_poseblends_driver.py):
+        joints_data = self.non_maya_data.joints_data
+        joint_logical_indices = self.joint_logical_indices
+        
+        result = []
+        for ii in range(0, len(joints_data)):
+            num_weights = len(joints_data[ii].blendshape_weights)
+            start_index = num_weights * joint_logical_indices[ii]
+            result.extend(range(start_index, start_index + num_weights))
+        
+        return result
     
-    def set_data_from_maya_to_non_maya(
+    def get_packed_weight_values(
         self
     ):
-        # this->maya_joint_data is filled from mde_poseblends_driver's input attributes.
-        # maya_joint_data contains Maya centric storage(ie MMatrix, for example).
-        # 
-        # This method fills this->non_maya_data from the values 
-        # stored in this->maya_joint_data:
-        stat = 1
+        # \return the weights in get_packed_weight_indices() order:
+        result = array.array('d')
+        for joint_data in self.non_maya_data.joints_data:
+            result.extend(joint_data.blendshape_weights)
         
-        self.non_maya_data.envelope = self.envelope
-        self.non_maya_data.model_type = self.model_type
+        return result
+    
+    def get_packed_weights(
+        self
+    ):
+        # \return an array('d') with every weight at its packed index(see
+        # get_packed_weight_indices()), and 0.0 where there is no joint:
+        indices = self.get_packed_weight_indices()
+        values = self.get_packed_weight_values()
         
-        num_joints = len(self.maya_joint_data)
-        logging.debug('num_joints:  {0}'.format(num_joints))
+        num_values = 0
+        if len(indices) > 0:
+            num_values = max(indices) + 1
         
-        self.non_maya_data.init_joints_data(
-            num_joints
+        result = array.array('d', [0.0]) * num_values
+        for ii in range(0, len(indices)):
+            result[indices[ii]] = values[ii]
+        
+        return result
+    
+    def packed_layout_changed(
+        self,
+        indices
+    ):
+        # \return True if the outputWeight elements have to be rebuilt, 
+        # ie indices(see get_packed_weight_indices()) isn't what was 
+        # given to the last set_packed_layout():
+        return indices != self.packed_output_indices
+    
+    def set_packed_layout(
+        self,
+        indices,
+        values
+    ):
+        # remember indices as the outputWeight layout, and values as the
+        # values written to it:
+        self.packed_output_indices = indices
+        self.packed_output_weights = array.array('d', values)
+    
+    def get_cache_key(
+        self,
+        time
+    ):
+        # \param[in] time:  the evaluation time, in seconds.
+        # \return the result_cache key of the inputs that were just read
+        # in:  time, plus everything that's solved from.  The values
+        # themselves are in the key(not a hash of them), so two different
+        # inputs can never share an entry.
+        # Only the matrix slots each joint's matrix mode solves from are
+        # included(see joint_io_data.get_input_matrix_slots()):  the others
+        # hold values derived by the last solve, which would make the key
+        # depend on the previously evaluated frame.  Joints whose 
+        # envelope is zero weren't read in, so none of their slots are:
+        data = self.non_maya_data
+        joints_data = data.joints_data
+        num_joints = len(joints_data)
+        JOINT_IO_DATA_T = data.JOINT_IO_DATA_T
+        MATRIX_SIZE = JOINT_IO_DATA_T.MATRIX_SIZE
+        
+        matrix_buffer = data.matrix_buffer
+        matrix_values = []
+        for current_joint_data in joints_data:
+            if abs(current_joint_data.envelope) < current_joint_data.tol:
+                continue
+            
+            for slot in JOINT_IO_DATA_T.get_input_matrix_slots(current_joint_data.matrix_mode):
+                offset = current_joint_data.get_matrix_slot_offset(slot)
+                matrix_values.append(matrix_buffer[offset:offset + MATRIX_SIZE].tobytes())
+        
+        result = (
+            time,
+            int(self.model_type),
+            self.envelope,
+            tuple(self.joint_logical_indices[0:num_joints]),
+            tuple([x.envelope for x in joints_data]),
+            tuple([int(x.matrix_mode) for x in joints_data]),
+            b''.join(matrix_values)
         )
         
-        for ii in range(0, num_joints):
-            self.set_per_joint_data_from_Maya_to_non_Maya(
-                ii
+        return result
+    
+    def restore_cached_result(
+        self,
+        key
+    ):
+        # Put the weights stored for key back into the joints' 
+        # blendshape_weights, in place of calculate().
+        # \return True on a hit, False on a miss:
+        entry = self.result_cache.get(key)
+        if entry is None:
+            return False
+        
+        weights, num_weights = entry
+        
+        data = self.non_maya_data
+        joints_data = data.joints_data
+        if len(num_weights) != len(joints_data):
+            return False
+        
+        # ...and mark them as solved, so the next miss's 
+        # needs_calculate() compares against these inputs:
+        data.weights_buffer[0:len(weights)] = weights
+        for ii in range(0, len(joints_data)):
+            joints_data[ii].resize_weights(num_weights[ii])
+            joints_data[ii].set_calculated()
+        
+        if mtrace.PROFILE:
+            mtrace.add_count('cache_hits')
+        
+        return True
+    
+    def store_cached_result(
+        self,
+        key
+    ):
+        # store the joints' just calculated weights as key's result:
+        JOINT_IO_DATA_T = node_data.JOINT_IO_DATA_T
+        
+        data = self.non_maya_data
+        joints_data = data.joints_data
+        num_values = len(joints_data) * JOINT_IO_DATA_T.MAX_NUM_WEIGHTS
+        
+        self.result_cache.put(
+            key,
+            (
+                array.array('d', data.weights_buffer[0:num_values]),
+                tuple([len(x.blendshape_weights) for x in joints_data])
             )
-        
-        return stat
+        )
     
+    def memory_usage(
+        self
+    ):
+        # \return a dictionary with the approximate number of bytes used by:
+        # 'non_maya':  the per-joint data(see poseblends_driver_data.memory_usage()).
+        # 'total':  the above, plus the logical indices and output cache.
+        non_maya_num_bytes = self.non_maya_data.memory_usage()
+        
+        total_num_bytes = non_maya_num_bytes
+        total_num_bytes += sys.getsizeof(self.joint_logical_indices)
+        total_num_bytes += sys.getsizeof(self.joint_array_indices)
+        total_num_bytes += sys.getsizeof(self.output_logical_indices)
+        total_num_bytes += sys.getsizeof(self.output_num_weights)
+        total_num_bytes += sys.getsizeof(self.output_weights)
+        total_num_bytes += sys.getsizeof(self.packed_output_indices)
+        total_num_bytes += sys.getsizeof(self.packed_output_weights)
+        total_num_bytes += self.result_cache.memory_usage(
+            lambda x: sys.getsizeof(x[0]) + sys.getsizeof(x[1])
+        )
+        
+        result = {}
+        result.update({'non_maya':non_maya_num_bytes})
+        result.update({'total':total_num_bytes})
+        
+        return result
     
     def calculate(
         self
@@ -279,11 +392,13 @@ class node_data(object):
         
         stat = 0
         
-        # put the data:
-        # -from:  maya_joint_data(Maya-centric, MMatrix) 
-        # -> 
-        # -to:  non_maya_data(Maya-independent, also MMatrix):
-        self.set_data_from_maya_to_non_maya()
+        # the per-joint inputs are already in non_maya_data, so only
+        # the node level inputs need setting:
+        self.non_maya_data.envelope = self.envelope
+        self.non_maya_data.model_type = self.model_type
+        
+        if mtrace.TRACE:
+            mtrace.debug('node_data.calculate():  num_joints:  {0}', len(self.non_maya_data.joints_data))
         
         # calculate the blendShape weights for all the input joints:
         non_maya_ops = node_data.NON_MAYA_OPS_T
@@ -293,4 +408,125 @@ class node_data(object):
         )
         
         return stat
+    
+    def is_disabled(
+        self
+    ):
+        # \return True if the global envelope times scale is zero(within
+        # tol), ie every weight is zero whatever the input joints are.
+        # Only the node level inputs have to be read in to know this:
+        data = self.non_maya_data
         
+        result = abs(self.envelope * data.scale) < data.tol
+        
+        return result
+    
+    def set_zero_weights(
+        self,
+        logical_indices
+    ):
+        # In place of reading the input joints and calculate() while the
+        # node is disabled:  size the joints to the inputJoint elements at
+        # logical_indices, and set all their weights to zero.
+        # The joints are left dirty, so they're all solved again once
+        # the node isn't disabled any more:
+        num_joints = len(logical_indices)
+        
+        self.resize_inputs(
+            num_joints
+        )
+        self.joint_logical_indices[0:num_joints] = logical_indices
+        self.update_joint_array_indices()
+        
+        data = self.non_maya_data
+        data.model_type = self.model_type
+        num_weights = data.get_num_weights()
+        for current_joint_data in data.joints_data:
+            current_joint_data.resize_weights(
+                num_weights
+            )
+            blendshape_weights = current_joint_data.blendshape_weights
+            for ii in range(0, num_weights):
+                blendshape_weights[ii] = 0.0
+            current_joint_data.is_dirty = True
+    
+    def zero_output_layout_changed(
+        self,
+        logical_indices
+    ):
+        # \param[in] logical_indices:  the current inputJoint logical indices.
+        # \return True if the zero outputs were written for a different
+        # output layout, ie other joints or another model type(like 
+        # output_layout_changed()):
+        if self.zero_output_model_type != self.model_type:
+            return True
+        
+        if self.zero_output_logical_indices != logical_indices:
+            return True
+        
+        return False
+    
+    def is_zero_output_written(
+        self,
+        output,
+        logical_indices
+    ):
+        # \param[in] logical_indices:  the current inputJoint logical indices.
+        # \return True if output was already written as all zeros since
+        # the node was disabled, with the same output layout:
+        if self.zero_output_layout_changed(logical_indices):
+            return False
+        
+        return output in self.zero_outputs
+    
+    def set_zero_output_written(
+        self,
+        output,
+        logical_indices
+    ):
+        if self.zero_output_layout_changed(logical_indices):
+            self.zero_outputs.clear()
+            self.zero_output_model_type = self.model_type
+            self.zero_output_logical_indices = list(logical_indices)
+        
+        self.zero_outputs.add(output)
+    
+    def clear_zero_outputs(
+        self
+    ):
+        self.zero_outputs.clear()
+        self.zero_output_model_type = None
+        self.zero_output_logical_indices = None
+    
+    def count_zero_envelope_joints(
+        self
+    ):
+        # \return the number of input joints whose envelope is zero, ie
+        # whose matrices weren't read in(see per_joint_data_extract) and
+        # whose weights are just zeros:
+        result = 0
+        for current_joint_data in self.non_maya_data.joints_data:
+            if abs(current_joint_data.envelope) < current_joint_data.tol:
+                result += 1
+        
+        return result
+    
+    def calculate_joint(
+        self,
+        joint_index
+    ):
+        # Like calculate(), but only for the joint at joint_index
+        # (see mde_py_poseblends_driver.compute_joint()):
+        stat = 0
+        
+        self.non_maya_data.envelope = self.envelope
+        self.non_maya_data.model_type = self.model_type
+        
+        non_maya_ops = node_data.NON_MAYA_OPS_T
+        
+        non_maya_ops.calculate_joints(
+            self.non_maya_data,
+            (joint_index,)
+        )
+        
+        return stat
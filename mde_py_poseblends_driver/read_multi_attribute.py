@@ -1,5 +1,6 @@
 import maya.OpenMaya as oM
 import logging
+import mde_trace as mtrace
 import mde_utilities as utils
 from builtins import next
 
@@ -36,7 +37,8 @@ class MArrayDataHandle_ops(object):
         logical_index_array,
         arg_num_input_elements
     ):
-        logging.debug("read_multi_attribute(MArrayDataHandle version) BEGIN!!!:  ")
+        if mtrace.TRACE:
+            mtrace.debug("read_multi_attribute(MArrayDataHandle version) BEGIN!!!:  ")
         stat = 1
         
         utils.resize(arg_num_input_elements, 1)
@@ -44,7 +46,8 @@ class MArrayDataHandle_ops(object):
         #--------------------------------------------------------------------------------------
         # how many elements are currently on the input_array_handle?:
         num_input_elements = input_array_handle.elementCount()
-        logging.debug("read_multi_attribute(MArrayDataHandle version) input_array_handle.elementCount():  {0}".format(num_input_elements))
+        if mtrace.TRACE:
+            mtrace.debug("read_multi_attribute(MArrayDataHandle version) input_array_handle.elementCount():  {0}", num_input_elements)
     
         arg_num_input_elements[0] = num_input_elements
         
@@ -66,7 +69,8 @@ class MArrayDataHandle_ops(object):
         #--------------------------------------------------------------------------------------
         #for array_plug elements:
         if num_input_elements > 0:
-            logging.debug("read_multi_attribute(MArrayDataHandle version):  in if num_input_elements > 0:")
+            if mtrace.TRACE:
+                mtrace.debug("read_multi_attribute(MArrayDataHandle version):  in if num_input_elements > 0:")
             
             # get logical indices:
             array_index = 0
@@ -81,25 +85,30 @@ class MArrayDataHandle_ops(object):
                 # preserve the logical index element_logical_index:
                 logical_index_array[array_index] = element_logical_index
                 
-                logging.debug("read_multi_attribute(MArrayDataHandle version):  input_array_handle:  " + str(input_array_handle))
+                if mtrace.TRACE:
+                    mtrace.debug("read_multi_attribute(MArrayDataHandle version):  input_array_handle:  {0}", input_array_handle)
                 input_handle = input_array_handle.inputValue()
-                logging.debug("read_multi_attribute(MArrayDataHandle version):  input_handle:  " + str(input_handle))
+                if mtrace.TRACE:
+                    mtrace.debug("read_multi_attribute(MArrayDataHandle version):  input_handle:  {0}", input_handle)
                 
                 # read the value of the input_array_handle element:
-                logging.debug("read_multi_attribute(MArrayDataHandle version):  in while loop before element_read:  ")
+                if mtrace.TRACE:
+                    mtrace.debug("read_multi_attribute(MArrayDataHandle version):  in while loop before element_read:  ")
                 # read the input_array_handle[element_logical_index] into element_array[element_logical_index]:
                 element_read(
                     element_array, 
                     array_index, 
                     input_handle
                 )
-                logging.debug("read_multi_attribute(MArrayDataHandle version):  in while loop after element_read:  ")
+                if mtrace.TRACE:
+                    mtrace.debug("read_multi_attribute(MArrayDataHandle version):  in while loop after element_read:  ")
 
                 array_index += 1
                 advance(input_array_handle)
                 continue
 
-        logging.debug("read_multi_attribute(MArrayDataHandle version) END!!!:  ")
+        if mtrace.TRACE:
+            mtrace.debug("read_multi_attribute(MArrayDataHandle version) END!!!:  ")
         return stat
 
 """
@@ -127,7 +136,8 @@ class MDataBlock_ops:
         arg_num_input_elements
     ):
             
-        logging.debug("read_multi_attribute(MDataBlock version) BEGIN!!!:  ")
+        if mtrace.TRACE:
+            mtrace.debug("read_multi_attribute(MDataBlock version) BEGIN!!!:  ")
         
         stat = 1
         
@@ -153,7 +163,8 @@ class MDataBlock_ops:
             arg_num_input_elements
         )
         
-        logging.debug("read_multi_attribute(MDataBlock version) END!!!:  ")
+        if mtrace.TRACE:
+            mtrace.debug("read_multi_attribute(MDataBlock version) END!!!:  ")
         
         return stat
 
@@ -179,7 +190,8 @@ class MDataHandle_ops:
         num_input_elements
     ):
             
-        logging.debug("read_multi_attribute(MDataHandle version) BEGIN!!!:  ")
+        if mtrace.TRACE:
+            mtrace.debug("read_multi_attribute(MDataHandle version) BEGIN!!!:  ")
         
         stat = 1
         
@@ -205,10 +217,197 @@ class MDataHandle_ops:
             arg_num_input_elements
         )
         
-        logging.debug("read_multi_attribute(MDataHandle version) END!!!:  ")
+        if mtrace.TRACE:
+            mtrace.debug("read_multi_attribute(MDataHandle version) END!!!:  ")
         return stat
         
 
+"""
+    A read_multi_attribute() that remembers the layout(ie the logical 
+    index of each physical element) of the multi attr it reads, so that
+    once that's known the elements are read by jumping straight to them
+    with MArrayDataHandle.jumpToArrayElement(), without walking the array 
+    with next()/elementIndex() and their try/excepts.
+    The layout is only rescanned when:
+    -invalidate() was called, eg from the node's connectionMade()/
+     connectionBroken() when the multi attr's connections changed, or
+    -the multi attr's elementCount() changed, or
+    -one of the remembered elements couldn't be read.
+    An element can also be removed and another one set without any
+    connection or the elementCount() changing(eg removeMultiInstance,
+    then setAttr):  the node's setDependentsDirty() catches that, by
+    invalidate()ing when an element that isn't in the layout is dirtied
+    (see has_logical_index()).  So the steady state reads each element
+    with just a jumpToArrayElement() and an inputValue().
+    num_rebuilds counts the rescans(and, with mde_trace.PROFILE on, so 
+    does the '<name>_layout_rebuilds' counter), so it's easy to check 
+    that steady-state playback never rescans.
+    One of these is kept per node, per multi attr.
+"""
+class cached_layout_multi_attribute_reader(object):
+    __slots__ = (
+        'name',
+        'logical_indices',
+        'known_logical_indices',
+        'is_layout_valid',
+        'num_rebuilds',
+    )
+    
+    def __init__(
+        self,
+        name = 'multi_attribute'
+    ):
+        self.name = name
+        self.logical_indices = list()
+        self.known_logical_indices = set()
+        self.is_layout_valid = False
+        self.num_rebuilds = 0
+    
+    def invalidate(
+        self
+    ):
+        self.is_layout_valid = False
+    
+    def has_logical_index(
+        self,
+        logical_index
+    ):
+        # \return True if the layout is valid and has an element at
+        # logical_index:
+        return self.is_layout_valid and (logical_index in self.known_logical_indices)
+    
+    def rebuild_layout(
+        self,
+        input_array_handle,
+        num_input_elements
+    ):
+        # record the logical index of each of the num_input_elements 
+        # physical elements of input_array_handle:
+        # \return an int:  0:  fail, 1:  success
+        stat = 1
+        
+        logical_indices = self.logical_indices
+        utils.resize(logical_indices, num_input_elements)
+        
+        try:
+            for ii in range(0, num_input_elements):
+                input_array_handle.jumpToArrayElement(ii)
+                logical_indices[ii] = input_array_handle.elementIndex()
+        except:
+            logging.error("cached_layout_multi_attribute_reader({0}):  rebuilding the layout".format(self.name))
+            utils.resize(logical_indices, 0)
+            self.known_logical_indices = set()
+            stat = 0
+            return stat
+        
+        self.known_logical_indices = set(logical_indices)
+        self.is_layout_valid = True
+        self.num_rebuilds += 1
+        
+        if mtrace.PROFILE:
+            mtrace.add_count('{0}_layout_rebuilds'.format(self.name))
+        if mtrace.TRACE:
+            mtrace.debug("cached_layout_multi_attribute_reader({0}):  layout rebuilt:  {1}", self.name, logical_indices)
+        
+        return stat
+    
+    def read_multi_attribute(
+        self,
+        input_array_handle,
+        element_read,
+        element_array,
+        logical_index_array,
+        arg_num_input_elements
+    ):
+        # Same parameters and result as MArrayDataHandle_ops.read_multi_attribute().
+        # element_array and logical_index_array are expected to be sized
+        # to input_array_handle.elementCount() already(otherwise:  they're
+        # resized here).
+        stat = 1
+        
+        utils.resize(arg_num_input_elements, 1)
+        
+        num_input_elements = input_array_handle.elementCount()
+        arg_num_input_elements[0] = num_input_elements
+        
+        utils.resize(element_array, num_input_elements)
+        utils.resize(logical_index_array, num_input_elements)
+        
+        if num_input_elements <= 0:
+            # an empty multi attr is fine, there's just nothing to read:
+            utils.resize(self.logical_indices, 0)
+            self.known_logical_indices = set()
+            self.is_layout_valid = True
+            
+            return stat
+        
+        if(
+            (not self.is_layout_valid) or 
+            (len(self.logical_indices) != num_input_elements)
+        ):
+            stat = self.rebuild_layout(
+                input_array_handle,
+                num_input_elements
+            )
+            if not stat:
+                return stat
+        
+        stat = self.read_elements(
+            input_array_handle,
+            element_read,
+            element_array,
+            logical_index_array
+        )
+        if not stat:
+            # the layout is stale, so rescan it and try once more:
+            stat = self.rebuild_layout(
+                input_array_handle,
+                num_input_elements
+            )
+            if not stat:
+                return stat
+            
+            stat = self.read_elements(
+                input_array_handle,
+                element_read,
+                element_array,
+                logical_index_array
+            )
+        
+        return stat
+    
+    def read_elements(
+        self,
+        input_array_handle,
+        element_read,
+        element_array,
+        logical_index_array
+    ):
+        # read every element of the current layout:
+        # \return an int:  0:  fail(ie the layout is stale), 1:  success
+        stat = 1
+        
+        logical_indices = self.logical_indices
+        for ii in range(0, len(logical_indices)):
+            try:
+                input_array_handle.jumpToArrayElement(ii)
+                input_handle = input_array_handle.inputValue()
+            except:
+                self.is_layout_valid = False
+                stat = 0
+                return stat
+            
+            logical_index_array[ii] = logical_indices[ii]
+            
+            element_read(
+                element_array, 
+                ii, 
+                input_handle
+            )
+        
+        return stat
+
+
 """
     Let's say the user is inputting multiple multi(ie array) attributes
     from the same node.  For example:  maybe several lists of matrices
@@ -242,7 +441,8 @@ def fill_missing_array_elements(
     array,
     logical_index_array
 ):
-    logging.debug("fill_missing_array_elements begin:  ")
+    if mtrace.TRACE:
+        mtrace.debug("fill_missing_array_elements begin:  ")
     num_existing_elements = len(array)
 
     if(num_input_elements >= num_desired_elements):
@@ -274,6 +474,7 @@ def fill_missing_array_elements(
             current_logical_index = logical_index_array[ii - 1] + 1 
         logical_index_array[ii] = current_logical_index
         
-    logging.debug("fill_missing_array_elements end:  ")
+    if mtrace.TRACE:
+        mtrace.debug("fill_missing_array_elements end:  ")
     
     